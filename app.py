@@ -1,7 +1,16 @@
 import customtkinter as ctk
 import tkinter as tk
 
-from pdf_cleaner import PDFCleaner
+from pdf_cleaner import (
+    DEFAULT_SAVE_PROFILE,
+    SAVE_PROFILES,
+    CleaningPlan,
+    OperationCancelled,
+    PageSelection,
+    PageSet,
+    PDFCleaner,
+    export_format,
+)
 from gui import (
     RemoveTextFrame,
     RemoveImageFrame,
@@ -9,10 +18,13 @@ from gui import (
     RemovePageFrame,
     RemoveLastPageFrame,
     GetContentFrame,
+    ResultsViewer,
 )
 import json
 from lang import LanguageManager
 import os
+import queue
+import threading
 
 
 class App(ctk.CTk):
@@ -46,6 +58,10 @@ class App(ctk.CTk):
         self.grid_columnconfigure((0, 1), weight=1)
         self.file_path = None
         self.cleaner = None
+        self.worker = None
+        self.worker_cleaner = None
+        self.results_viewer = None
+        self.messages = queue.Queue()
 
         # ===== Widgets: Select PDF =====
         self.file_label = ctk.CTkLabel(self, text=self.lang_mgr.get("no_file_selected"))
@@ -106,6 +122,16 @@ class App(ctk.CTk):
         )
         self.clean_btn.grid(row=8, column=0, sticky="e", padx=20, pady=5)
 
+        self.preview_btn = ctk.CTkButton(
+            self,
+            text=self.lang_mgr.get("preview"),
+            command=self.preview_callback,
+            text_color="#ffffff",
+            width=110,
+            state=ctk.DISABLED,
+        )
+        self.preview_btn.grid(row=8, column=0, sticky="w", padx=20, pady=5)
+
         self.save_btn = ctk.CTkButton(
             self,
             text=self.lang_mgr.get("save_pdf"),
@@ -114,6 +140,24 @@ class App(ctk.CTk):
             state=ctk.DISABLED,
         )
         self.save_btn.grid(row=8, column=1, sticky="w", padx=20, pady=5)
+        self.save_profile_option = ctk.CTkOptionMenu(
+            self, values=list(SAVE_PROFILES), width=110, text_color="#ffffff"
+        )
+        self.save_profile_option.set(DEFAULT_SAVE_PROFILE)
+        self.save_profile_option.grid(row=8, column=1, sticky="e", padx=20, pady=5)
+
+        # ===== Widgets: Progress =====
+        self.progress_bar = ctk.CTkProgressBar(self)
+        self.progress_bar.set(0)
+        self.progress_bar.grid(row=9, column=0, sticky="ew", padx=20, pady=5)
+        self.cancel_btn = ctk.CTkButton(
+            self,
+            text=self.lang_mgr.get("cancel"),
+            command=self.cancel_callback,
+            text_color="#ffffff",
+            state=ctk.DISABLED,
+        )
+        self.cancel_btn.grid(row=9, column=1, sticky="w", padx=20, pady=5)
 
         # ===== Widgets: Logs Area =====
         self.logs_txtbox = ctk.CTkTextbox(
@@ -126,7 +170,7 @@ class App(ctk.CTk):
         )
         self.logs_txtbox.insert("0.0", "Logs go here.")
         self.logs_txtbox.configure(state=ctk.DISABLED)
-        self.logs_txtbox.grid(row=9, column=0, columnspan=2, padx=20, pady=10)
+        self.logs_txtbox.grid(row=10, column=0, columnspan=2, padx=20, pady=10)
 
     def insert_log(self, *args, **kwargs):
         self.logs_txtbox.configure(state=ctk.NORMAL)
@@ -134,7 +178,94 @@ class App(ctk.CTk):
         self.logs_txtbox.see(ctk.END)
         self.logs_txtbox.configure(state=ctk.DISABLED)
 
-    def clean_callback(self):
+    def start_worker(self, target, *args):
+        """
+        Run target(*args) on a background thread.
+
+        The worker reports back through self.messages, which the Tk event
+        loop polls with after(), so widgets are only touched on the UI thread.
+        """
+        self.set_busy(True)
+        self.progress_bar.set(0)
+        self.worker = threading.Thread(target=target, args=args, daemon=True)
+        self.worker.start()
+        self.after(50, self.poll_messages)
+
+    def post(self, kind, *payload):
+        self.messages.put((kind, *payload))
+
+    def report_progress(self, operation, done, total):
+        self.post("progress", operation, done, total)
+
+    def report_metrics(self, record):
+        line = f"  {record.format()}\n"
+        if threading.current_thread() is threading.main_thread():
+            self.insert_log(ctk.END, line)
+        else:
+            self.post("log", line)
+
+    def poll_messages(self):
+        try:
+            while True:
+                kind, *payload = self.messages.get_nowait()
+                if kind == "log":
+                    self.insert_log(ctk.END, payload[0])
+                elif kind == "progress":
+                    _, done, total = payload
+                    self.progress_bar.set(done / total if total else 1)
+                elif kind == "done":
+                    self.finish_worker(*payload)
+                    return
+        except queue.Empty:
+            pass
+        self.after(50, self.poll_messages)
+
+    def finish_worker(self, status, result=None):
+        self.worker = None
+        self.worker_cleaner = None
+        self.set_busy(False)
+        if status == "cleaned":
+            self.cleaner = result
+            self.save_btn.configure(state=ctk.NORMAL)
+        elif status == "preview":
+            self.show_preview(result)
+        elif status == "contents":
+            self.show_results(*result)
+        elif status in ("exported", "export_cancelled", "export_error"):
+            self.finish_export(status, result)
+        elif status == "cancelled":
+            self.insert_log(ctk.END, "Cancelled. \n")
+        elif status == "error":
+            self.insert_log(ctk.END, f"Error: {result} \n")
+
+    def set_busy(self, busy):
+        state = ctk.DISABLED if busy else ctk.NORMAL
+        self.select_pdf_btn.configure(state=state)
+        self.clean_btn.configure(state=state)
+        self.preview_btn.configure(state=state)
+        self.page_content_frame.btn.configure(state=state)
+        if busy:
+            self.save_btn.configure(state=ctk.DISABLED)
+        elif self.cleaner:
+            self.save_btn.configure(state=ctk.NORMAL)
+        self.cancel_btn.configure(state=ctk.NORMAL if busy else ctk.DISABLED)
+        if self.results_viewer is not None and self.results_viewer.winfo_exists():
+            self.results_viewer.set_busy(busy)
+
+    def cancel_callback(self):
+        # Once the worker has returned, a cancel() would only be left on the
+        # cleaner that Run reuses.
+        if self.worker_cleaner and self.worker is not None and self.worker.is_alive():
+            self.insert_log(ctk.END, "Cancelling... \n")
+            self.worker_cleaner.cancel()
+
+    def build_plan(self):
+        """
+        Read the checked operations from the widgets into a CleaningPlan.
+
+        Returns:
+            CleaningPlan or None: The plan, or None if a field is invalid (the error is logged).
+        """
         is_remove_text = self.remove_text_frame.is_checked()
         is_remove_image = self.remove_img_frame.is_checked()
         is_rotate_page = self.rotate_frame.is_checked()
@@ -152,90 +283,218 @@ class App(ctk.CTk):
         )
         self.insert_log(ctk.END, "Check Complate! \n")
 
-        self.cleaner = PDFCleaner(self.file_path)
+        # Widgets are read here, on the UI thread; the worker only gets the plan.
+        plan = CleaningPlan()
+        try:
+            if is_remove_text:
+                rs = self.remove_text_frame.get_value()
+                if rs:
+                    plan.remove_texts(*[str(i) for i in rs.split(",")])
+                else:
+                    plan.remove_texts()
+            if is_remove_image:
+                rs = self.remove_img_frame.get_value()
+                if rs:
+                    plan.remove_images(*[str(i) for i in rs.split(",")])
+            if is_rotate_page:
+                rs = self.rotate_frame.get_value()
+                angle = int(self.rotate_frame.get_angle())
+                if rs:
+                    plan.rotate_pages(rs, angle=angle)
+            if is_remove_page:
+                rs = self.remove_page_frame.get_value()
+                if rs:
+                    plan.remove_pages(rs)
+            if is_remove_last_page:
+                plan.remove_last_page()
+        except ValueError as e:
+            self.insert_log(ctk.END, f"Error: {e} \n")
+            return None
+        return plan
 
-        self.insert_log(ctk.END, "Start cleaning process... \n")
-        if is_remove_text:
-            self.insert_log(ctk.END, "Removing text... \n")
-            rs = self.remove_text_frame.get_value()
-            if rs:
-                value = [str(i) for i in rs.split(",")]
-                self.cleaner.remove_texts(*value)
-            else:
-                self.cleaner.remove_texts()
-            self.insert_log(ctk.END, "Remove texts complete. \n")
-        if is_remove_image:
-            self.insert_log(ctk.END, "Removing images... \n")
-            rs = self.remove_img_frame.get_value()
-            if rs:
-                value = [str(i) for i in rs.split(",")]
-                self.cleaner.remove_images(*value)
-            else:
-                pass
-            self.insert_log(ctk.END, "Remove images complete. \n")
-        if is_rotate_page:
-            self.insert_log(ctk.END, "Rotating pages... \n")
-            rs = self.rotate_frame.get_value()
-            angle = int(self.rotate_frame.get_angle())
-            if rs:
-                value = [int(i) for i in rs.split(",")]
-                self.cleaner.rotate_pages(*value, angle=angle)
-            else:
-                pass
-            self.insert_log(ctk.END, "Rotate pages complete. \n")
-        if is_remove_page:
-            self.insert_log(ctk.END, "Removing pages... \n")
-            rs = self.remove_page_frame.get_value()
-            if rs:
-                value = [int(i) for i in rs.split(",")]
-                self.cleaner.remove_pages(*value)
+    def clean_callback(self):
+        plan = self.build_plan()
+        if plan is None:
+            return
+
+        if self.cleaner:
+            self.close_results()
+            self.cleaner.close()
+            self.cleaner = None
+        self.worker_cleaner = PDFCleaner(
+            self.file_path,
+            progress_callback=self.report_progress,
+            metrics_callback=self.report_metrics,
+        )
+        self.start_worker(self.clean_worker, self.worker_cleaner, plan)
+
+    def clean_worker(self, cleaner, plan):
+        try:
+            self.post("log", "Start cleaning process... \n")
+            cleaner.apply_plan(plan)
+            self.post("log", "Cleaning process finished. \n")
+        except OperationCancelled:
+            cleaner.close()
+            self.post("done", "cancelled")
+        except Exception as e:
+            cleaner.close()
+            self.post("done", "error", e)
+        else:
+            self.post("done", "cleaned", cleaner)
+
+    def preview_callback(self):
+        plan = self.build_plan()
+        if plan is None:
+            return
+
+        # Preview the original file, not the cleaned document waiting to be saved.
+        self.worker_cleaner = PDFCleaner(
+            self.file_path,
+            progress_callback=self.report_progress,
+            metrics_callback=self.report_metrics,
+        )
+        self.start_worker(self.preview_worker, self.worker_cleaner, plan)
+
+    def preview_worker(self, cleaner, plan):
+        try:
+            preview = cleaner.preview_plan(plan)
+        except OperationCancelled:
+            self.post("done", "cancelled")
+        except Exception as e:
+            self.post("done", "error", e)
+        else:
+            self.post("done", "preview", preview)
+        finally:
+            cleaner.close()
+
+    def show_preview(self, preview, max_pages=50):
+        totals = preview["totals"]
+        self.insert_log(
+            ctk.END,
+            f"Preview: {totals['pages_affected']} pages affected, "
+            f"{totals['texts']} texts in {totals['streams']} streams, "
+            f"{totals['images']} images, {totals['pages_rotated']} pages rotated, "
+            f"{totals['pages_removed']} pages removed \n",
+        )
+        for page in preview["pages"][:max_pages]:
+            if page["removed"]:
+                line = "removed"
             else:
-                pass
-            self.insert_log(ctk.END, "Remove page complete. \n")
-        if is_remove_last_page:
-            self.insert_log(ctk.END, "Removing last page... \n")
-            self.cleaner.remove_last_page()
-            self.insert_log(ctk.END, "Remove last page complete. \n")
-        self.insert_log(ctk.END, "Cleaning process finished. \n")
-        self.save_btn.configure(state=ctk.NORMAL)
+                line = f"{page['texts']} texts, {page['images']} images"
+                if page["rotation"] is not None:
+                    line += f", rotated to {page['rotation']}"
+            self.insert_log(ctk.END, f"  Page {page['page_number']}: {line}\n")
+        if len(preview["pages"]) > max_pages:
+            self.insert_log(
+                ctk.END, f"  ... {len(preview['pages']) - max_pages} more pages\n"
+            )
 
     def run_callback(self):
         if not self.cleaner:
             self.cleaner = PDFCleaner(self.file_path)
+        self.cleaner.progress_callback = self.report_progress
+        self.cleaner.metrics.callback = self.report_metrics
+        self.worker_cleaner = self.cleaner
 
-        self.logs_txtbox.configure(state=ctk.NORMAL)
         rs = self.page_content_frame.get_value()
         is_show_img = self.page_content_frame.is_show_image()
         is_show_text = self.page_content_frame.is_show_text()
-        if rs:
-            value = [int(i) for i in rs.split(",")]
-            page_contents = self.cleaner.get_page_contents(
-                *value, show_images=is_show_img, show_texts=is_show_text
+        try:
+            value = [PageSelection(rs)] if rs else []
+        except ValueError as e:
+            self.insert_log(ctk.END, f"Error: {e} \n")
+            return
+        self.start_worker(self.run_worker, self.cleaner, value, is_show_img, is_show_text)
+
+    def run_worker(self, cleaner, pages, is_show_img, is_show_text):
+        try:
+            # Only the page numbers are kept: the results viewer reads the
+            # records it shows back from the cleaner, which caches them.
+            page_set = PageSet.from_indexes(
+                record["page_number"] - 1
+                for record in cleaner.iter_page_contents(
+                    *pages, show_images=is_show_img, show_texts=is_show_text
+                )
             )
+        except OperationCancelled:
+            self.post("done", "cancelled")
+        except Exception as e:
+            self.post("done", "error", e)
+        else:
+            self.post("done", "contents", (cleaner, page_set, is_show_text, is_show_img))
+
+    def show_results(self, cleaner, pages, show_texts, show_images):
+        # Page records go to a paged viewer; serializing them all into the
+        # log would freeze Tk on large documents.
+        self.insert_log(ctk.END, f"Loaded contents of {len(pages)} pages. \n")
+        if self.results_viewer is not None and self.results_viewer.winfo_exists():
+            self.results_viewer.set_source(cleaner, pages, show_texts, show_images)
+            self.results_viewer.focus()
         else:
-            page_contents = self.cleaner.get_page_contents(
-                show_images=is_show_img, show_texts=is_show_text
+            self.results_viewer = ResultsViewer(
+                self, self.lang_mgr, cleaner, pages, show_texts, show_images,
+                on_export=self.export_results,
             )
 
-        json_str = json.dumps(page_contents, indent=4)
-        self.logs_txtbox.insert(ctk.END, f"{json_str}\n")
-        self.logs_txtbox.see(ctk.END)
-        self.logs_txtbox.configure(state=ctk.DISABLED)
+    def close_results(self):
+        # The viewer reads from the cleaner, so it can't outlive it.
+        if self.results_viewer is not None and self.results_viewer.winfo_exists():
+            self.results_viewer.destroy()
+        self.results_viewer = None
+
+    def export_results(self, cleaner, pages, output_path, show_texts, show_images):
+        self.worker_cleaner = cleaner
+        self.start_worker(
+            self.export_worker, cleaner, pages, output_path, show_texts, show_images
+        )
+
+    def export_worker(self, cleaner, pages, output_path, show_texts, show_images):
+        # Records are streamed from the cleaner to the file one page at a time.
+        try:
+            count = cleaner.write_page_contents(
+                output_path,
+                pages,
+                show_texts=show_texts,
+                show_images=show_images,
+                format=export_format(output_path, default="json"),
+            )
+        except OperationCancelled:
+            self.post("done", "export_cancelled")
+        except Exception as e:
+            self.post("done", "export_error", e)
+        else:
+            self.post("done", "exported", count)
+
+    def finish_export(self, status, result):
+        if status == "exported":
+            self.insert_log(ctk.END, f"Exported {result} pages. \n")
+        elif status == "export_cancelled":
+            self.insert_log(ctk.END, "Cancelled. \n")
+        else:
+            self.insert_log(ctk.END, f"Error: {result} \n")
+        if self.results_viewer is not None and self.results_viewer.winfo_exists():
+            self.results_viewer.export_finished(status, result)
 
     def save_callback(self):
         output_path = ctk.filedialog.asksaveasfilename(
             defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")]
         )
-        self.logs_txtbox.insert(ctk.END, "Saving...\n")
-        self.cleaner.save(output_path)
-        self.logs_txtbox.insert(ctk.END, "Save Complete!\n")
-        self.logs_txtbox.see(ctk.END)
+        if not output_path:
+            return
+        self.insert_log(ctk.END, "Saving...\n")
+        report = self.cleaner.save(output_path, profile=self.save_profile_option.get())
+        self.insert_log(
+            ctk.END,
+            f"Save Complete! ({report['profile']}: {report['size']:,} bytes "
+            f"in {report['seconds']:.2f}s)\n",
+        )
 
     def import_file(self):
         self.file_path = ctk.filedialog.askopenfilename(
             title="Select a file", filetypes=[("PDF files", "*.pdf")]
         )
         if self.cleaner:
+            self.close_results()
             self.cleaner.close()
             self.cleaner = None
         if self.file_path:
@@ -244,6 +503,7 @@ class App(ctk.CTk):
             )
             self.page_content_frame.btn.configure(state=ctk.NORMAL)
             self.clean_btn.configure(state=ctk.NORMAL)
+            self.preview_btn.configure(state=ctk.NORMAL)
 
     def switch_language(self, lang_code):
         self.lang_mgr.load_language(lang_code)
@@ -253,6 +513,8 @@ class App(ctk.CTk):
         self.remove_last_page_frame.update_text()
         self.rotate_frame.update_text()
         self.page_content_frame.update_text()
+        if self.results_viewer is not None and self.results_viewer.winfo_exists():
+            self.results_viewer.update_text()
         if self.file_path:
             self.file_label.configure(
                 text=f"{self.lang_mgr.get('select')}: {self.file_path}"
@@ -261,7 +523,9 @@ class App(ctk.CTk):
             self.file_label.configure(text=self.lang_mgr.get("no_file_selected"))
         self.select_pdf_btn.configure(text=self.lang_mgr.get("select_pdf"))
         self.clean_btn.configure(text=self.lang_mgr.get("clean_pdf"))
+        self.preview_btn.configure(text=self.lang_mgr.get("preview"))
         self.save_btn.configure(text=self.lang_mgr.get("save_pdf"))
+        self.cancel_btn.configure(text=self.lang_mgr.get("cancel"))
 
     def show_about(self):
         tk.messagebox.showinfo(
@@ -274,5 +538,10 @@ class App(ctk.CTk):
         )
 
 
-app = App()
-app.mainloop()
+def main():
+    app = App()
+    app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
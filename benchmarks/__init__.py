@@ -0,0 +1,3 @@
+"""
+Benchmarks for pdf_cleaner. Run with `python -m benchmarks --help`.
+"""
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+
+# This module imports nothing heavy: a child process inherits the peak RSS of
+# its parent on Linux, so the process launching the interpreter must stay small.
+
+# Run in a new interpreter, so nothing is imported yet. Prints the timing as JSON.
+_COLD_START_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+started = time.perf_counter()
+import pdf_cleaner
+imported = time.perf_counter()
+if sys.argv[2]:
+    cleaner = pdf_cleaner.PDFCleaner(sys.argv[2])
+    cleaner.remove_texts("Confidential")
+    cleaner.save(profile="fast")
+    cleaner.close()
+finished = time.perf_counter()
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+except ImportError:
+    peak = None
+json.dump(
+    {"import": imported - started, "total": finished - started, "peak_rss_mb": peak},
+    sys.stdout,
+)
+"""
+
+
+def run_cold_start(pdf_path=None):
+    """
+    Time importing pdf_cleaner in a new interpreter and, if pdf_path is given,
+    one small cleaning job right after, as a short-lived batch worker would.
+
+    Returns:
+        dict: {"seconds": ..., "peak_rss_mb": ...} of the child interpreter.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", _COLD_START_SCRIPT, root, pdf_path or ""],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    timings = json.loads(output)
+    return {
+        "seconds": timings["total"] if pdf_path else timings["import"],
+        "peak_rss_mb": timings["peak_rss_mb"],
+    }
@@ -0,0 +1,187 @@
+import argparse
+import random
+
+import fitz
+
+# Words the body text is made of. The first ones double as redaction terms.
+VOCABULARY = (
+    "Confidential Draft Internal Invoice Customer Account Payment Total Amount "
+    "Reference Contract Agreement Delivery Address Signature Approved Pending "
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam"
+).split()
+
+LOGO_SIZE = (120, 40)
+PHOTO_SIZE = (300, 200)
+INLINE_IMAGE_SIZE = (256, 256)
+
+
+def make_terms(count, seed=0):
+    """
+    Build a list of redaction terms, some of which occur in generated PDFs.
+
+    Args:
+        count (int): Number of terms.
+        seed (int): Seed for the random generator.
+    Returns:
+        list: The terms. Roughly one in ten is a vocabulary word or phrase.
+    """
+    rng = random.Random(seed)
+    terms = []
+    for i in range(count):
+        if i % 10 == 0:
+            terms.append(" ".join(rng.sample(VOCABULARY, rng.randint(1, 2))))
+        else:
+            terms.append(f"TERM-{i:05d}-{rng.randrange(16**6):06x}")
+    return terms
+
+
+def _pixmap(width, height, seed):
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), 0)
+    pixmap.clear_with(seed % 256)
+    return pixmap
+
+
+def _text_stream(rng, page_number, lines, font):
+    parts = [f"BT /{font} 10 Tf 72 770 Td 12 TL".encode()]
+    parts.append(f"(Confidential page {page_number}) Tj T*".encode())
+    for _ in range(lines):
+        words = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(6, 12)))
+        parts.append(f"({words}) Tj T*".encode())
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+
+def _drawing_stream(rng, shapes):
+    parts = [b"q 0.5 w"]
+    for _ in range(shapes):
+        x, y = rng.randint(0, 500), rng.randint(0, 700)
+        parts.append(f"{x} {y} {rng.randint(5, 80)} {rng.randint(5, 80)} re S".encode())
+    parts.append(b"Q")
+    return b"\n".join(parts)
+
+
+def _inline_image_stream(width, height):
+    # Every sample byte is >= 0x80, so the data never looks like an EI operator.
+    row = bytes(0x80 + (x * 3 + c) % 0x80 for x in range(width) for c in range(3))
+    return (
+        f"q {width} 0 0 {height} 300 300 cm "
+        f"BI /W {width} /H {height} /BPC 8 /CS /RGB ID ".encode()
+        + row * height
+        + b"\nEI Q"
+    )
+
+
+def generate_pdf(
+    path,
+    pages=2000,
+    streams_per_page=4,
+    lines_per_stream=8,
+    photo_every=5,
+    inline_image_every=10,
+    seed=0,
+):
+    """
+    Write a synthetic PDF that exercises the expensive paths of PDFCleaner.
+
+    Every page shows a logo image shared by all pages and several separate
+    content streams with text and vector drawings. Some pages also get a
+    page-specific photo or a large inline image.
+
+    Args:
+        path (str): Where to write the PDF.
+        pages (int): Number of pages.
+        streams_per_page (int): Extra content streams on each page.
+        lines_per_stream (int): Text lines in each text stream.
+        photo_every (int): Put a photo on every n-th page (0 to disable).
+        inline_image_every (int): Put an inline image on every n-th page (0 to disable).
+        seed (int): Seed for the random generator, so runs are reproducible.
+    Returns:
+        str: path.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    logo = _pixmap(*LOGO_SIZE, seed=200)
+    logo_xref = 0
+    inline_image = _inline_image_stream(*INLINE_IMAGE_SIZE)
+
+    for number in range(1, pages + 1):
+        page = doc.new_page(width=595, height=842)
+        page.insert_font(fontname="helv")
+        if logo_xref:
+            page.insert_image(fitz.Rect(450, 20, 570, 60), xref=logo_xref)
+        else:
+            logo_xref = page.insert_image(fitz.Rect(450, 20, 570, 60), pixmap=logo)
+        if photo_every and number % photo_every == 0:
+            page.insert_image(
+                fitz.Rect(72, 400, 372, 600), pixmap=_pixmap(*PHOTO_SIZE, seed=number)
+            )
+
+        streams = []
+        for index in range(streams_per_page):
+            if index % 2 == 0:
+                streams.append(_text_stream(rng, number, lines_per_stream, "helv"))
+            else:
+                streams.append(_drawing_stream(rng, 20))
+        if inline_image_every and number % inline_image_every == 0:
+            streams.append(inline_image)
+
+        contents = list(page.get_contents())
+        for stream in streams:
+            xref = doc.get_new_xref()
+            doc.update_object(xref, "<<>>")
+            doc.update_stream(xref, stream)
+            contents.append(xref)
+        doc.xref_set_key(
+            page.xref, "Contents", "[" + " ".join(f"{x} 0 R" for x in contents) + "]"
+        )
+
+    doc.save(path, garbage=1, deflate=True)
+    doc.close()
+    return path
+
+
+def generate_logo_sample(path):
+    """
+    Write a one-page PDF holding the logo of generate_pdf(), as a sample for
+    PDFCleaner.remove_images_by_fingerprint().
+
+    Args:
+        path (str): Where to write the PDF.
+    Returns:
+        str: path.
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_image(fitz.Rect(450, 20, 570, 60), pixmap=_pixmap(*LOGO_SIZE, seed=200))
+    doc.save(path, garbage=1, deflate=True)
+    doc.close()
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.generate", description="Generate a synthetic PDF."
+    )
+    parser.add_argument("output", help="Path of the PDF to write.")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--streams-per-page", type=int, default=4)
+    parser.add_argument("--lines-per-stream", type=int, default=8)
+    parser.add_argument("--photo-every", type=int, default=5)
+    parser.add_argument("--inline-image-every", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generate_pdf(
+        args.output,
+        pages=args.pages,
+        streams_per_page=args.streams_per_page,
+        lines_per_stream=args.lines_per_stream,
+        photo_every=args.photo_every,
+        inline_image_every=args.inline_image_every,
+        seed=args.seed,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,392 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not recorded.
+    resource = None
+
+from .coldstart import run_cold_start
+from .generate import LOGO_SIZE, PHOTO_SIZE, generate_logo_sample, generate_pdf, make_terms
+
+DEFAULT_THRESHOLD = 0.2
+
+
+# Each case gets an open PDFCleaner and the case context, and does the timed work.
+# Setup that should not be measured goes in SETUP under the same name.
+def _iter_page_contents(cleaner, context):
+    for _ in cleaner.iter_page_contents():
+        pass
+
+
+def _get_page_contents(cleaner, context):
+    cleaner.get_page_contents()
+
+
+def _write_page_contents(cleaner, context):
+    with open(os.devnull, "w", encoding="utf-8") as f:
+        cleaner.write_page_contents(f)
+
+
+def _image_catalog(cleaner, context):
+    cleaner.image_catalog
+
+
+def _remove_images(cleaner, context):
+    cleaner.remove_images(LOGO_SIZE, PHOTO_SIZE, tolerance=2)
+
+
+def _prepare_fingerprint(cleaner, context):
+    context["samples"] = [
+        generate_logo_sample(os.path.join(context["workdir"], "logo_sample.pdf"))
+    ]
+
+
+def _remove_images_by_fingerprint(cleaner, context):
+    cleaner.remove_images_by_fingerprint(samples=context["samples"])
+
+
+def _remove_images_by_fingerprint_perceptual(cleaner, context):
+    cleaner.remove_images_by_fingerprint(samples=context["samples"], perceptual=True)
+
+
+def _recompress_images(cleaner, context):
+    # The generated images are drawn at 72 dpi, so this downsamples all of them.
+    cleaner.recompress_images(target_dpi=36)
+
+
+def _detect_watermarks(cleaner, context):
+    cleaner.detect_watermarks()
+
+
+def _detect_watermarks_all(cleaner, context):
+    cleaner.detect_watermarks(sample_pages=0)
+
+
+def _remove_texts(cleaner, context):
+    cleaner.remove_texts("Confidential", "Draft")
+
+
+def _remove_texts_terms(cleaner, context):
+    cleaner.remove_texts(*context["terms"])
+
+
+def _remove_texts_all(cleaner, context):
+    cleaner.remove_texts()
+
+
+def _redact_texts(cleaner, context):
+    cleaner.redact_texts("Confidential", "Draft", patterns=[r"page \d+"])
+
+
+def _redact_texts_terms(cleaner, context):
+    cleaner.redact_texts(*context["terms"])
+
+
+def _rotate_pages(cleaner, context):
+    cleaner.rotate_pages(*range(1, len(cleaner.doc) + 1), angle=90)
+
+
+def _remove_pages(cleaner, context):
+    cleaner.remove_pages(*range(1, len(cleaner.doc) + 1, 2))
+
+
+def _remove_last_page(cleaner, context):
+    cleaner.remove_last_page()
+
+
+def _plan(cleaner, context):
+    from pdf_cleaner import CleaningPlan
+
+    return (
+        CleaningPlan()
+        .remove_texts(*context["terms"])
+        .remove_images(LOGO_SIZE)
+        .rotate_pages(1, 2, 3, angle=90)
+        .remove_pages(*range(2, len(cleaner.doc) + 1, 10))
+    )
+
+
+def _apply_plan(cleaner, context):
+    cleaner.apply_plan(_plan(cleaner, context))
+
+
+def _preview_plan(cleaner, context):
+    cleaner.preview_plan(_plan(cleaner, context))
+
+
+def _prepare_save(cleaner, context):
+    cleaner.remove_texts("Confidential")
+    cleaner.remove_images(LOGO_SIZE)
+
+
+def _prune_resources(cleaner, context):
+    cleaner.prune_resources()
+
+
+def _save(profile):
+    def run(cleaner, context):
+        cleaner.save(os.path.join(context["workdir"], f"save_{profile}.pdf"), profile=profile)
+
+    return run
+
+
+CASES = {
+    "iter_page_contents": _iter_page_contents,
+    "get_page_contents": _get_page_contents,
+    "write_page_contents": _write_page_contents,
+    "image_catalog": _image_catalog,
+    "remove_images": _remove_images,
+    "remove_images_by_fingerprint": _remove_images_by_fingerprint,
+    "remove_images_by_fingerprint_perceptual": _remove_images_by_fingerprint_perceptual,
+    "recompress_images": _recompress_images,
+    "remove_texts": _remove_texts,
+    "remove_texts_terms": _remove_texts_terms,
+    "remove_texts_all": _remove_texts_all,
+    "redact_texts": _redact_texts,
+    "redact_texts_terms": _redact_texts_terms,
+    "detect_watermarks": _detect_watermarks,
+    "detect_watermarks_all": _detect_watermarks_all,
+    "rotate_pages": _rotate_pages,
+    "remove_pages": _remove_pages,
+    "remove_last_page": _remove_last_page,
+    "apply_plan": _apply_plan,
+    "preview_plan": _preview_plan,
+    "prune_resources": _prune_resources,
+    "save_fast": _save("fast"),
+    "save_balanced": _save("balanced"),
+    "save_smallest": _save("smallest"),
+}
+
+# Cases that time startup rather than a PDFCleaner method.
+COLD_CASES = ("import", "cold_start", "open")
+
+_NAME_WIDTH = max(len(name) for name in (*COLD_CASES, *CASES))
+
+SETUP = {
+    "remove_images_by_fingerprint": _prepare_fingerprint,
+    "remove_images_by_fingerprint_perceptual": _prepare_fingerprint,
+    # Something to prune: fonts and images whose only uses were removed.
+    "prune_resources": _prepare_save,
+    "save_fast": _prepare_save,
+    "save_balanced": _prepare_save,
+    "save_smallest": _prepare_save,
+}
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(name, pdf_path, context):
+    """
+    Run one benchmark case. Meant to run in a fresh process, so that the peak
+    RSS belongs to this case alone.
+
+    Args:
+        name (str): Key of CASES.
+        pdf_path (str): The PDF to open.
+        context (dict): Case context: "terms" and "workdir".
+    Returns:
+        dict: {"seconds": wall time of the case, "peak_rss_mb": peak RSS of the process}.
+    """
+    from pdf_cleaner import PDFCleaner
+
+    cleaner = PDFCleaner(pdf_path)
+    try:
+        if name in SETUP:
+            SETUP[name](cleaner, context)
+        started = time.perf_counter()
+        CASES[name](cleaner, context)
+        seconds = time.perf_counter() - started
+    finally:
+        cleaner.close()
+    return {"seconds": seconds, "peak_rss_mb": _peak_rss_mb()}
+
+
+def run_open(pdf_path):
+    """
+    Time opening and closing the PDF.
+    """
+    from pdf_cleaner import PDFCleaner
+
+    started = time.perf_counter()
+    PDFCleaner(pdf_path).close()
+    return {"seconds": time.perf_counter() - started, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _in_fresh_process(func, *args):
+    # "spawn" so the child doesn't inherit the parent's memory or imports.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(func, *args).result()
+
+
+def run_benchmarks(pdf_path, cases=None, repeat=3, terms=None, workdir=None, log=None):
+    """
+    Run benchmark cases, each repetition in a fresh process.
+
+    Args:
+        pdf_path (str): The PDF to benchmark on.
+        cases (list): Case names to run (default: all, plus "import", "cold_start" and "open").
+        repeat (int): Runs per case. The fastest time and the lowest peak RSS are kept.
+        terms (list): Redaction terms for the *_terms, apply_plan and preview_plan cases.
+        workdir (str): Directory for saved outputs.
+        log (callable): Optional log(message) called after each case.
+    Returns:
+        dict: {case: {"seconds": ..., "peak_rss_mb": ...}}.
+    """
+    cases = cases or [*COLD_CASES, *CASES]
+    context = {"terms": terms or make_terms(500), "workdir": workdir or tempfile.gettempdir()}
+    results = {}
+
+    for name in cases:
+        runs = []
+        for _ in range(repeat):
+            if name == "import":
+                runs.append(_in_fresh_process(run_cold_start))
+            elif name == "cold_start":
+                runs.append(_in_fresh_process(run_cold_start, pdf_path))
+            elif name == "open":
+                runs.append(_in_fresh_process(run_open, pdf_path))
+            else:
+                runs.append(_in_fresh_process(run_case, name, pdf_path, context))
+        rss = [r["peak_rss_mb"] for r in runs if r["peak_rss_mb"] is not None]
+        results[name] = {
+            "seconds": min(r["seconds"] for r in runs),
+            "peak_rss_mb": min(rss) if rss else None,
+        }
+        if log:
+            log(_format_result(name, results[name]))
+
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results against a baseline.
+
+    Args:
+        results (dict): Output of run_benchmarks().
+        baseline (dict): An earlier output of run_benchmarks().
+        threshold (float): Allowed relative increase, e.g. 0.2 for 20%.
+    Returns:
+        list: (case, metric, baseline value, current value) for every regression.
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            old, new = before.get(metric), current.get(metric)
+            if old and new is not None and new > old * (1 + threshold):
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def _format_result(name, result):
+    rss = result["peak_rss_mb"]
+    rss = f"{rss:8.1f} MB" if rss is not None else "       n/a"
+    return f"{name:<{_NAME_WIDTH}} {result['seconds']:9.3f} s {rss}"
+
+
+def _metadata(pages):
+    import fitz
+
+    return {
+        "pages": pages,
+        "pymupdf": fitz.VersionBind,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Time PDFCleaner operations on a synthetic PDF and compare with a baseline.",
+    )
+    parser.add_argument("--pages", type=int, default=2000, help="Default: %(default)s.")
+    parser.add_argument(
+        "--terms", type=int, default=500, help="Number of redaction terms (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--pdf", help="Benchmark this PDF instead of generating one. --pages is then ignored."
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=[*COLD_CASES, *CASES],
+        help="Cases to run (default: all).",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per case; the best is kept (default: %(default)s)."
+    )
+    parser.add_argument("-o", "--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against this results JSON file.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed relative slowdown or memory growth before a case counts as "
+        "a regression (default: %(default)s).",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="pdf_cleaner_bench_") as workdir:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(workdir, "input.pdf")
+            print(f"Generating a {args.pages}-page PDF...", file=sys.stderr)
+            generate_pdf(pdf_path, pages=args.pages)
+
+        results = run_benchmarks(
+            pdf_path,
+            cases=args.cases,
+            repeat=args.repeat,
+            terms=make_terms(args.terms),
+            workdir=workdir,
+            log=print,
+        )
+
+    import fitz
+
+    pages = fitz.open(pdf_path).page_count if args.pdf else args.pages
+    report = {"metadata": _metadata(pages), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("metadata", {}).get("pages") != pages:
+        print("warning: the baseline was recorded on a different page count", file=sys.stderr)
+
+    regressions = compare(results, baseline.get("results", {}), args.threshold)
+    for name, metric, old, new in regressions:
+        print(
+            f"REGRESSION  {name} {metric}: {old:.3f} -> {new:.3f} (+{(new / old - 1):.0%})",
+            file=sys.stderr,
+        )
+    if not regressions:
+        print(f"No regressions above {args.threshold:.0%}.", file=sys.stderr)
+    return 1 if regressions else 0
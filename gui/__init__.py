@@ -6,3 +6,4 @@ from .frames import (
     RemoveLastPageFrame as RemoveLastPageFrame,
     GetContentFrame as GetContentFrame,
 )
+from .results import ResultsViewer as ResultsViewer
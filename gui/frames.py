@@ -102,7 +102,7 @@ class RotatePdfFrame(BaseFrame):
             master,
             lang_mgr,
             checkbox_text_key="rotate_pages",
-            entry_placeholder_key="placeholder_texts",
+            entry_placeholder_key="placeholder_pages",
             entry_label_key="info_required",
         )
         self.angle_label = ctk.CTkLabel(self, text=self.lang_mgr.get("angle"))
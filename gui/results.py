@@ -0,0 +1,225 @@
+import itertools
+import json
+
+import customtkinter as ctk
+
+from pdf_cleaner import PageSet
+
+FILTER_KEYS = ("filter_all", "filter_texts", "filter_images")
+
+
+class ResultsViewer(ctk.CTkToplevel):
+    """
+    Window that shows page records (see PDFCleaner.iter_page_contents()) a few at a time.
+
+    The window keeps only the numbers of the pages it lists and reads the
+    records of the current view back from the cleaner, which caches them per
+    page, so its memory doesn't grow with the size of the document. Search
+    and filters narrow the pages, and Export hands the narrowed pages to
+    on_export, which streams them to a JSON, NDJSON or CSV file.
+    """
+
+    def __init__(
+        self, master, lang_mgr, cleaner, pages, show_texts=True, show_images=True,
+        on_export=None, page_size=20,
+    ):
+        super().__init__(master)
+        self.lang_mgr = lang_mgr
+        self.on_export = on_export
+        self.page_size = page_size
+        self.cleaner = None
+        self.pages = PageSet()
+        self.filtered = PageSet()
+        self.show_texts = show_texts
+        self.show_images = show_images
+        self.offset = 0
+        self.busy = False
+
+        self.geometry("700x650")
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        # ===== Search and filter =====
+        self.search_bar = ctk.CTkFrame(self)
+        self.search_bar.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 5))
+        self.search_bar.grid_columnconfigure(0, weight=1)
+        self.search_entry = ctk.CTkEntry(self.search_bar)
+        self.search_entry.grid(row=0, column=0, sticky="ew", padx=10, pady=8)
+        self.search_entry.bind("<Return>", lambda event: self.apply_filter())
+        self.filter_option = ctk.CTkOptionMenu(
+            self.search_bar,
+            values=[self.lang_mgr.get(key) for key in FILTER_KEYS],
+            text_color="#ffffff",
+            command=lambda value: self.apply_filter(),
+        )
+        self.filter_option.grid(row=0, column=1, padx=5, pady=8)
+        self.search_btn = ctk.CTkButton(
+            self.search_bar, width=80, text_color="#ffffff", command=self.apply_filter
+        )
+        self.search_btn.grid(row=0, column=2, padx=(5, 10), pady=8)
+
+        # ===== Records =====
+        self.records_txtbox = ctk.CTkTextbox(
+            self, corner_radius=10, text_color="#2c2c2c", fg_color="#D3D3D3"
+        )
+        self.records_txtbox.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
+
+        # ===== Paging and export =====
+        self.nav_bar = ctk.CTkFrame(self, fg_color="transparent")
+        self.nav_bar.grid(row=2, column=0, sticky="ew", padx=10, pady=(5, 10))
+        self.nav_bar.grid_columnconfigure(2, weight=1)
+        self.prev_btn = ctk.CTkButton(
+            self.nav_bar, width=80, text_color="#ffffff", command=self.previous_page
+        )
+        self.prev_btn.grid(row=0, column=0, padx=(0, 5))
+        self.next_btn = ctk.CTkButton(
+            self.nav_bar, width=80, text_color="#ffffff", command=self.next_page
+        )
+        self.next_btn.grid(row=0, column=1, padx=5)
+        self.position_label = ctk.CTkLabel(self.nav_bar, text="")
+        self.position_label.grid(row=0, column=2, sticky="w", padx=10)
+        self.export_btn = ctk.CTkButton(
+            self.nav_bar, width=80, text_color="#ffffff", command=self.export_callback
+        )
+        self.export_btn.grid(row=0, column=3, padx=(5, 0))
+        self.status_label = ctk.CTkLabel(
+            self, text="", font=ctk.CTkFont(size=10), text_color="gray"
+        )
+        self.status_label.grid(row=3, column=0, sticky="w", padx=20, pady=(0, 5))
+
+        self.update_text()
+        self.set_source(cleaner, pages, show_texts, show_images)
+
+    def set_source(self, cleaner, pages, show_texts=True, show_images=True):
+        """
+        Args:
+            cleaner (PDFCleaner): The cleaner the records are read from.
+            pages (PageSet): 0-based indexes of the pages to list.
+            show_texts (bool): Include page text if True.
+            show_images (bool): Include image info if True.
+        """
+        self.cleaner = cleaner
+        self.pages = pages
+        self.show_texts = show_texts
+        self.show_images = show_images
+        self.apply_filter()
+
+    def records(self, pages):
+        return self.cleaner.iter_page_contents(
+            pages, show_texts=self.show_texts, show_images=self.show_images
+        )
+
+    def apply_filter(self):
+        query = self.search_entry.get().strip().lower()
+        kind = FILTER_KEYS[self.filter_option.cget("values").index(self.filter_option.get())]
+        if query or kind != "filter_all":
+            self.filtered = PageSet.from_indexes(
+                record["page_number"] - 1
+                for record in self.records(self.pages)
+                if self._matches(record, query, kind)
+            )
+        else:
+            self.filtered = self.pages
+        self.offset = 0
+        self.render()
+
+    @staticmethod
+    def _matches(record, query, kind):
+        if kind == "filter_texts" and not record.get("texts"):
+            return False
+        if kind == "filter_images" and not record.get("images"):
+            return False
+        if not query:
+            return True
+        if query == str(record["page_number"]):
+            return True
+        return any(query in text.lower() for text in record.get("texts", ()))
+
+    def render(self):
+        visible = PageSet.from_indexes(
+            itertools.islice(self.filtered, self.offset, self.offset + self.page_size)
+        )
+        self.records_txtbox.configure(state=ctk.NORMAL)
+        self.records_txtbox.delete("0.0", ctk.END)
+        for record in self.records(visible):
+            self.records_txtbox.insert(
+                ctk.END, json.dumps(record, indent=4, ensure_ascii=False) + "\n"
+            )
+        self.records_txtbox.configure(state=ctk.DISABLED)
+        self.update_position()
+
+    def update_position(self):
+        end = min(self.offset + self.page_size, len(self.filtered))
+        self.position_label.configure(
+            text=self.lang_mgr.get(
+                "showing",
+                start=self.offset + 1 if end > self.offset else 0,
+                end=end,
+                total=len(self.filtered),
+            )
+        )
+        state = ctk.DISABLED if self.busy else ctk.NORMAL
+        self.search_btn.configure(state=state)
+        self.filter_option.configure(state=state)
+        self.search_entry.configure(state=state)
+        has_previous = self.offset > 0 and not self.busy
+        self.prev_btn.configure(state=ctk.NORMAL if has_previous else ctk.DISABLED)
+        has_next = end < len(self.filtered) and not self.busy
+        self.next_btn.configure(state=ctk.NORMAL if has_next else ctk.DISABLED)
+        can_export = self.on_export is not None and not self.busy
+        self.export_btn.configure(state=ctk.NORMAL if can_export else ctk.DISABLED)
+
+    def set_busy(self, busy):
+        # The cleaner isn't thread-safe, so the window leaves it alone while a
+        # worker (an export included) is using it.
+        self.busy = busy
+        self.update_position()
+
+    def previous_page(self):
+        self.offset = max(0, self.offset - self.page_size)
+        self.render()
+
+    def next_page(self):
+        if self.offset + self.page_size < len(self.filtered):
+            self.offset += self.page_size
+            self.render()
+
+    def export_callback(self):
+        output_path = ctk.filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".json",
+            filetypes=[
+                ("JSON files", "*.json"),
+                ("CSV files", "*.csv"),
+                ("NDJSON files", "*.ndjson"),
+            ],
+        )
+        if not output_path:
+            return
+        self.status_label.configure(text=self.lang_mgr.get("exporting"))
+        self.on_export(
+            self.cleaner, self.filtered, output_path, self.show_texts, self.show_images
+        )
+
+    def export_finished(self, status, result=None):
+        if status == "exported":
+            self.status_label.configure(
+                text=self.lang_mgr.get("export_done", count=result)
+            )
+        elif status == "export_cancelled":
+            self.status_label.configure(text="")
+        else:
+            self.status_label.configure(text=f"Error: {result}")
+
+    def update_text(self):
+        self.title(self.lang_mgr.get("results_title"))
+        self.search_entry.configure(placeholder_text=self.lang_mgr.get("placeholder_search"))
+        selected = self.filter_option.cget("values").index(self.filter_option.get())
+        values = [self.lang_mgr.get(key) for key in FILTER_KEYS]
+        self.filter_option.configure(values=values)
+        self.filter_option.set(values[selected])
+        self.search_btn.configure(text=self.lang_mgr.get("search"))
+        self.prev_btn.configure(text=self.lang_mgr.get("previous"))
+        self.next_btn.configure(text=self.lang_mgr.get("next"))
+        self.export_btn.configure(text=self.lang_mgr.get("export"))
+        self.update_position()
@@ -0,0 +1,29 @@
+from .cache import ResultCache as ResultCache
+from .checkpoint import clean_checkpointed as clean_checkpointed
+from .cleaner import (
+    DEFAULT_SAVE_PROFILE as DEFAULT_SAVE_PROFILE,
+    SAVE_PROFILES as SAVE_PROFILES,
+    OperationCancelled as OperationCancelled,
+    PDFCleaner as PDFCleaner,
+)
+from .export import (
+    export_format as export_format,
+    write_page_records as write_page_records,
+)
+from .images import ImageCatalog as ImageCatalog
+from .matcher import MultiPatternMatcher as MultiPatternMatcher
+from .metrics import (
+    CleaningMetrics as CleaningMetrics,
+    OperationRecord as OperationRecord,
+)
+from .operations import (
+    apply_operations as apply_operations,
+    clean_file as clean_file,
+    preview_operations as preview_operations,
+)
+from .parallel import clean_parallel as clean_parallel
+from .pages import (
+    PageSelection as PageSelection,
+    PageSet as PageSet,
+)
+from .plan import CleaningPlan as CleaningPlan
@@ -0,0 +1,68 @@
+from .pages import PageSet
+
+# Kinds of per-page analysis kept by PageAnalysisCache.
+TEXTS = "texts"
+WORDS = "words"  # get_text("words") tuples, with their boxes
+IMAGES = "images"
+ALL_KINDS = (TEXTS, WORDS, IMAGES)
+
+
+class PageAnalysisCache:
+    """
+    Per-page analysis results (word lists, image records), keyed by page and kind.
+
+    PDFCleaner fills it while inspecting pages and tells it which pages each
+    mutating operation touched, so unchanged pages are never analysed twice.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, page_index, kind):
+        """
+        Returns:
+            list or None: A copy of the cached result, or None if it is not cached.
+        """
+        value = self._entries.get((page_index, kind))
+        return None if value is None else list(value)
+
+    def put(self, page_index, kind, value):
+        self._entries[(page_index, kind)] = list(value)
+
+    def invalidate(self, pages, kinds=ALL_KINDS):
+        """
+        Forget the given kinds of results for some pages.
+
+        Args:
+            pages (iterable): 0-based page indexes.
+            kinds (tuple): Kinds to forget: TEXTS, WORDS and/or IMAGES.
+        """
+        for page_index in pages:
+            for kind in kinds:
+                self._entries.pop((page_index, kind), None)
+
+    def remove_pages(self, deleted):
+        """
+        Drop the results of deleted pages and renumber the pages after them.
+
+        Works on the runs of a PageSet, so the cost depends on the number of
+        cached entries and runs, not on the number of deleted pages.
+
+        Args:
+            deleted (PageSet or iterable): 0-based indexes of the deleted pages, before deletion.
+        """
+        if not isinstance(deleted, PageSet):
+            deleted = PageSet.from_indexes(deleted)
+        if not deleted:
+            return
+        entries = {}
+        for (page_index, kind), value in self._entries.items():
+            if page_index not in deleted:
+                entries[(page_index - deleted.count_before(page_index), kind)] = value
+        self._entries = entries
+
+    def clear(self):
+        self._entries = {}
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction runs unlocked and tolerates races.
+    fcntl = None
+
+from .images import parse_image_sizes, sample_fingerprints
+from .operations import normalize_operations
+from .recompress import RecompressPolicy
+
+# Bump when a change to the cleaning code makes old cached results stale.
+CACHE_FORMAT = 3
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def canonical_operations(operations, save_profile):
+    """
+    Serialize an operation spec so that equivalent specs give the same string.
+
+    Texts, redaction rules, image sizes and page-range terms are deduplicated
+    and sorted, since their order does not change the result, and the
+    recompression worker count is dropped. Sample PDFs are replaced by the
+    fingerprints of their images, so editing a sample changes the key.
+
+    Args:
+        operations (dict): Operation spec, see normalize_operations().
+        save_profile (str): Save profile name.
+    Returns:
+        str: Canonical JSON.
+    """
+    spec = normalize_operations(operations)
+    if "remove_texts" in spec:
+        spec["remove_texts"]["texts"] = sorted(set(spec["remove_texts"]["texts"]))
+    if "redact_texts" in spec:
+        options = spec["redact_texts"]
+        options["terms"] = sorted(set(options["terms"]))
+        options["patterns"] = sorted(set(options["patterns"]))
+        options["regions"] = sorted(
+            {tuple(float(value) for value in region) for region in options["regions"]}
+        )
+    if "remove_images" in spec:
+        sizes = sorted(set(parse_image_sizes(*spec["remove_images"]["sizes"])))
+        spec["remove_images"]["sizes"] = [list(size) for size in sizes]
+    if "remove_images_by_fingerprint" in spec:
+        options = spec["remove_images_by_fingerprint"]
+        fingerprints, hashes = sample_fingerprints(
+            *options.pop("samples"), perceptual=options["perceptual"]
+        )
+        fingerprints.update(fp.lower() for fp in options["fingerprints"])
+        options["fingerprints"] = sorted(fingerprints)
+        options["perceptual_hashes"] = sorted(hashes)
+    if "recompress_images" in spec:
+        # The worker count doesn't change the result; the default max_dpi does.
+        options = spec["recompress_images"]
+        options.pop("workers")
+        options["max_dpi"] = float(
+            RecompressPolicy(options["target_dpi"], options["max_dpi"]).max_dpi
+        )
+    for name in ("rotate_pages", "remove_pages"):
+        if name in spec:
+            terms = set(spec[name]["pages"].split(","))
+            spec[name]["pages"] = ",".join(sorted(terms))
+    return json.dumps(
+        {"format": CACHE_FORMAT, "operations": spec, "profile": save_profile},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+
+
+def job_key(source, operations, save_profile):
+    """
+    Compute a key that identifies the result of a cleaning job.
+
+    Args:
+        source (str, bytes, bytearray or memoryview): Path of the input PDF, or the PDF itself.
+        operations (dict): Operation spec.
+        save_profile (str): Save profile name.
+    Returns:
+        str: Hex digest of the input bytes and the canonical operations.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    else:
+        digest.update(source)
+    digest.update(b"\0")
+    digest.update(canonical_operations(operations, save_profile).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of cleaned PDFs, keyed by the input bytes and the operations.
+
+    Entries are written to a temporary file and moved into place with
+    os.replace(), so readers never see a partial file and several processes
+    can share one cache directory. Reading an entry refreshes its mtime, and
+    once the cache grows past max_bytes the least recently used entries are
+    evicted under an exclusive file lock.
+
+    Args:
+        directory (str): Cache directory, created if needed.
+        max_bytes (int): Size cap of the cached files, in bytes.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, source, operations, save_profile):
+        """
+        Compute the cache key of a cleaning job, see job_key().
+        """
+        return job_key(source, operations, save_profile)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def get(self, key):
+        """
+        Look up an entry and mark it as recently used.
+
+        Returns:
+            str or None: Path of the cached PDF, or None on a miss.
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_bytes(self, key):
+        """
+        Returns:
+            bytes or None: The cached PDF, or None on a miss.
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted by another process in between.
+            return None
+
+    def put(self, key, source):
+        """
+        Store a cleaned PDF.
+
+        Args:
+            key (str): Key from key().
+            source (str or bytes): Path of the cleaned PDF, or the PDF itself.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(source, (str, os.PathLike)):
+                    with open(source, "rb") as src:
+                        shutil.copyfileobj(src, f)
+                else:
+                    f.write(source)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def entries(self):
+        """
+        Returns:
+            list: (mtime, size, path) of every entry, oldest first.
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        with self._lock():
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock():
+            for _, _, path in self.entries():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    @contextmanager
+    def _lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
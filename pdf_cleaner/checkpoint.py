@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent import futures
+
+from .cache import job_key
+from .metrics import OperationRecord
+from .operations import normalize_operations
+from .parallel import (
+    clean_shard,
+    finish_stitched,
+    read_source_info,
+    split_pages,
+    stitch_shards,
+)
+
+# Bump when the journal layout changes, so old journals are started over.
+# Format 2: chunks keep the form fields of their pages.
+# Format 3: images are no longer recompressed per chunk.
+JOURNAL_FORMAT = 3
+DEFAULT_CHUNK_PAGES = 500
+JOURNAL_NAME = "journal.ndjson"
+
+
+class CheckpointJournal:
+    """
+    Directory holding the finished chunks of one checkpointed cleaning job.
+
+    The journal file starts with a header line describing the job (input
+    digest, operations, chunk ranges), followed by one line per finished
+    chunk. Each chunk PDF is saved to a temporary file, synced and moved into
+    place before its line is appended and synced, so after a crash every
+    journaled chunk is complete, and a torn last line is simply ignored.
+
+    Args:
+        directory (str): Journal directory, created if needed.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, JOURNAL_NAME)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def chunk_path(self, index):
+        return os.path.join(self.directory, f"chunk-{index:05d}.pdf")
+
+    def temp_path(self, index):
+        # Where a worker saves the chunk before add_chunk() moves it into place.
+        return self.chunk_path(index) + ".tmp"
+
+    def open(self, header):
+        """
+        Resume the journal if it belongs to the same job, or start it over.
+
+        Args:
+            header (dict): Description of the job; a journal with a different
+                           header is discarded.
+        Returns:
+            dict: The entries of the chunks finished earlier, keyed by chunk index.
+        """
+        header = dict(header, format=JOURNAL_FORMAT)
+        done = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+        if lines and _parse_line(lines[0]) == header:
+            for line in lines[1:]:
+                entry = _parse_line(line)
+                if entry is not None and os.path.exists(self.chunk_path(entry["chunk"])):
+                    done[entry["chunk"]] = entry
+            if len(lines) - 1 != len(done):
+                # Drop the torn line, so the next entry starts on a line of its own.
+                self._rewrite(header, done.values())
+            return done
+
+        self.clear()
+        self._rewrite(header, ())
+        return done
+
+    def add_chunk(self, index, records=(), seconds=0.0):
+        """
+        Move a finished chunk from temp_path() into place and record it in the journal.
+
+        Args:
+            index (int): Chunk index.
+            records (list): OperationRecord dicts of the chunk.
+            seconds (float): Time spent cleaning the chunk.
+        """
+        temp_path = self.temp_path(index)
+        fd = os.open(temp_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(temp_path, self.chunk_path(index))
+        entry = {"chunk": index, "records": list(records), "seconds": seconds}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self):
+        """
+        Remove the journal and every chunk; the directory itself is kept.
+        """
+        for name in os.listdir(self.directory):
+            if name == JOURNAL_NAME or name.endswith(".tmp") or (
+                name.startswith("chunk-") and name.endswith(".pdf")
+            ):
+                os.remove(os.path.join(self.directory, name))
+
+    def _rewrite(self, header, entries):
+        lines = [json.dumps(header)] + [json.dumps(entry) for entry in entries]
+        _write_atomic(self.path, ("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def journal_directory(root, input_pdf_path):
+    """
+    Pick a journal directory for an input file under a shared root.
+
+    Args:
+        root (str): Directory holding the journals of many jobs.
+        input_pdf_path (str): Path of the PDF being cleaned.
+    Returns:
+        str: A subdirectory named after the file and its absolute path.
+    """
+    absolute = os.path.abspath(input_pdf_path)
+    digest = hashlib.sha256(absolute.encode("utf-8")).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(absolute))[0]
+    return os.path.join(root, f"{name}-{digest}")
+
+
+def clean_checkpointed(
+    input_pdf_path,
+    operations,
+    journal_dir,
+    chunk_pages=DEFAULT_CHUNK_PAGES,
+    workers=1,
+    progress_callback=None,
+):
+    """
+    Clean a PDF in page chunks, keeping every finished chunk on disk.
+
+    Each chunk gets the text and image operations (see
+    pdf_cleaner.parallel.clean_shard()) and is written to the journal as soon
+    as it is done. If the job dies, running it again with the same input,
+    operations and chunk size skips the journaled chunks, so only the
+    remaining pages are cleaned. The chunks are then stitched together, and
+    image recompression and the page rotations and removals run on the
+    result. As with clean_parallel(), page labels and form fields are
+    carried over and resources shared by several chunks are stored once,
+    whether the chunks were cleaned now or resumed.
+
+    Args:
+        input_pdf_path (str): Path of the PDF to clean.
+        operations (dict): Operation spec, see normalize_operations().
+        journal_dir (str): Journal directory of this job. Remove it with
+                           CheckpointJournal(journal_dir).clear() once the result is saved.
+        chunk_pages (int): Largest number of pages per chunk.
+        workers (int): Number of worker processes; 1 cleans the chunks in this process.
+        progress_callback (callable): Optional callback("checkpoint", done, total),
+                                      called as chunks finish.
+    Returns:
+        PDFCleaner: A cleaner holding the result, ready to save(). Its metrics
+                    start with the chunk records, finished earlier or now, and a
+                    "checkpoint" record counting the resumed and cleaned chunks.
+    Raises:
+        ValueError: If chunk_pages is less than 1.
+    """
+    if chunk_pages < 1:
+        raise ValueError("chunk_pages must be at least 1.")
+    spec = normalize_operations(operations)
+    page_count, metadata, toc, page_labels = read_source_info(input_pdf_path)
+    ranges = split_pages(page_count, -(-page_count // chunk_pages))
+
+    journal = CheckpointJournal(journal_dir)
+    done = journal.open(
+        {
+            "key": job_key(input_pdf_path, spec, None),
+            "page_count": page_count,
+            "chunks": [list(chunk) for chunk in ranges],
+        }
+    )
+    checkpoint = OperationRecord("checkpoint")
+    checkpoint.add("chunks_resumed", len(done))
+    checkpoint.add("pages_resumed", sum(ranges[i][1] - ranges[i][0] for i in done))
+    pending = [i for i in range(len(ranges)) if i not in done]
+
+    def report(count):
+        if progress_callback is not None:
+            progress_callback("checkpoint", count, len(ranges))
+
+    report(len(done))
+    started = time.perf_counter()
+    for index, records, seconds in _clean_chunks(
+        input_pdf_path, spec, ranges, pending, workers, journal
+    ):
+        journal.add_chunk(index, records, seconds)
+        done[index] = {"chunk": index, "records": records, "seconds": seconds}
+        checkpoint.add("chunks_cleaned")
+        checkpoint.add("pages_cleaned", ranges[index][1] - ranges[index][0])
+        report(len(done))
+    checkpoint.seconds = time.perf_counter() - started
+
+    doc = stitch_shards(
+        (journal.chunk_path(i) for i in range(len(ranges))), metadata, toc, page_labels
+    )
+    records = [record for i in sorted(done) for record in done[i]["records"]]
+    records.append(checkpoint.to_dict())
+    return finish_stitched(doc, input_pdf_path, spec, records)
+
+
+def _clean_chunks(input_pdf_path, spec, ranges, pending, workers, journal):
+    # Save every pending chunk to its temp_path() and yield (index, records,
+    # seconds) as it finishes.
+    # With a pool, a failed chunk doesn't stop the others from being journaled;
+    # the first error is raised once they are done.
+    if workers <= 1:
+        for index in pending:
+            started = time.perf_counter()
+            _, records = clean_shard(
+                input_pdf_path, *ranges[index], spec, True, journal.temp_path(index)
+            )
+            yield index, records, time.perf_counter() - started
+        return
+
+    with futures.ProcessPoolExecutor(max_workers=min(workers, len(pending) or 1)) as pool:
+        jobs = {
+            pool.submit(
+                clean_shard,
+                input_pdf_path,
+                *ranges[index],
+                spec,
+                True,
+                journal.temp_path(index),
+            ): index
+            for index in pending
+        }
+        error = None
+        for future in futures.as_completed(jobs):
+            try:
+                _, records = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            # Workers run concurrently, so report the work they did, not the wait.
+            seconds = sum(record["seconds"] for record in records)
+            yield jobs[future], records, seconds
+        if error is not None:
+            raise error
+
+
+def _parse_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def _write_atomic(path, data):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,966 @@
+import io
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .analysis import IMAGES, TEXTS, WORDS, PageAnalysisCache
+from .content import remove_text_runs, strip_text_objects
+from .export import write_page_records
+from .images import (
+    DEFAULT_MAX_DISTANCE,
+    FingerprintMatcher,
+    ImageCatalog,
+    blank_image,
+    page_image_records,
+    parse_image_sizes,
+    size_matches,
+)
+from .matcher import MultiPatternMatcher
+from .lazy import lazy_import
+from .metrics import CleaningMetrics, OperationRecord
+from .pages import delete_page_set, select_pages
+from .redact import RedactionRules, WordIndex
+from .recompress import (
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_TARGET_DPI,
+    RecompressPolicy,
+    recompress_images,
+)
+from .resources import prune_unused_resources
+from .watermarks import (
+    DEFAULT_MIN_FRACTION,
+    DEFAULT_MIN_LENGTH,
+    DEFAULT_SAMPLE_PAGES,
+    WatermarkIndex,
+    sample_page_indexes,
+)
+
+# PyMuPDF is only loaded when the first document is opened.
+fitz = lazy_import("fitz")
+
+# Keyword arguments for fitz.Document.save(), by profile name.
+SAVE_PROFILES = {
+    # Write as-is; saves incrementally when writing back to the input file.
+    "fast": {},
+    # Drop unreferenced objects and compress rewritten streams.
+    "balanced": {"garbage": 1, "deflate": True},
+    # Also merge duplicate objects, compress images and fonts, and use object streams.
+    "smallest": {
+        "garbage": 4,
+        "deflate": True,
+        "deflate_images": True,
+        "deflate_fonts": True,
+        "use_objstms": 1,
+    },
+}
+DEFAULT_SAVE_PROFILE = "balanced"
+
+
+def open_pdf(source):
+    """
+    Open a PDF from a path, an in-memory buffer or a binary file object.
+
+    Buffers are handed to PyMuPDF as memoryviews, so they are not copied.
+    File objects backed by a real file are memory-mapped instead of read.
+
+    Args:
+        source (str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap or file):
+            The PDF to open.
+    Returns:
+        tuple: (doc, closers), where closers are objects to release() or
+               close() once the document has been closed.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source), []
+
+    closers = []
+    if isinstance(source, io.BytesIO):
+        source = source.getbuffer()
+        closers.append(source)
+    elif hasattr(source, "read"):
+        try:
+            fileno = source.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            source = source.read()
+        else:
+            source = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            closers.append(source)
+
+    if isinstance(source, (bytearray, mmap.mmap)):
+        source = memoryview(source)
+        closers.insert(0, source)
+    elif not isinstance(source, (bytes, memoryview)):
+        raise TypeError(f"Cannot open a PDF from {type(source).__name__}.")
+
+    return fitz.open(stream=source, filetype="pdf"), closers
+
+
+class OperationCancelled(Exception):
+    """
+    Raised by a PDFCleaner operation that was stopped through PDFCleaner.cancel().
+    """
+
+
+class PDFCleaner:
+    def __init__(self, input_pdf_path, progress_callback=None, metrics_callback=None):
+        """
+        Args:
+            input_pdf_path (str, bytes, bytearray, memoryview, mmap.mmap or file): Path of the PDF
+                to open, or the PDF itself as an in-memory buffer or binary file object.
+                Buffers are used in place without copying; see open_pdf().
+            progress_callback (callable): Optional callback(operation, done, total), called
+                                          between pages by the page-by-page operations.
+            metrics_callback (callable): Optional callback(record), called with the
+                                         OperationRecord of each completed operation.
+                                         All records are also kept in self.metrics.
+        """
+        doc, closers = open_pdf(input_pdf_path)
+        self.input_pdf_path = (
+            input_pdf_path if isinstance(input_pdf_path, (str, os.PathLike)) else None
+        )
+        self._attach(doc, progress_callback, metrics_callback)
+        self._closers = closers
+
+    @classmethod
+    def from_document(
+        cls, doc, input_pdf_path=None, progress_callback=None, metrics_callback=None
+    ):
+        """
+        Wrap an already open fitz.Document.
+
+        Args:
+            doc (fitz.Document): The document to clean. The cleaner takes ownership of it.
+            input_pdf_path (str): Path the document came from, if any.
+            progress_callback (callable): Optional callback(operation, done, total).
+            metrics_callback (callable): Optional callback(record).
+        Returns:
+            PDFCleaner: A cleaner working on doc.
+        """
+        cleaner = cls.__new__(cls)
+        cleaner.input_pdf_path = input_pdf_path
+        cleaner._attach(doc, progress_callback, metrics_callback)
+        return cleaner
+
+    def _attach(self, doc, progress_callback=None, metrics_callback=None):
+        self.doc = doc
+        self.progress_callback = progress_callback
+        self.metrics = CleaningMetrics(metrics_callback)
+        self._page_analysis = PageAnalysisCache()
+        self._cancel_event = threading.Event()
+        self._running_operations = 0
+        self._image_catalog = None
+        self.last_save_report = None
+        self.last_recompress_report = None
+        self._closers = []
+
+    def cancel(self):
+        """
+        Ask the running operation to stop. Safe to call from another thread.
+
+        The operation stops cleanly between two pages and raises OperationCancelled.
+        A cancel() made before the operation reaches its first page still stops
+        it; one left unused when the operation finishes is dropped, so it
+        doesn't stop the next one instead.
+        """
+        self._cancel_event.set()
+
+    def clear_page_cache(self):
+        """
+        Forget all cached page analysis.
+
+        The cleaner's own methods keep the cache up to date. Call this after
+        changing self.doc directly.
+        """
+        self._page_analysis.clear()
+
+    @contextmanager
+    def _operation(self, operation):
+        # Time an operation, and forget any unused cancel() once the outermost
+        # one finishes.
+        self._running_operations += 1
+        try:
+            with self.metrics.measure(operation) as record:
+                yield record
+        finally:
+            self._running_operations -= 1
+            if not self._running_operations:
+                self._cancel_event.clear()
+
+    def _progress(self, operation, done, total):
+        if self._cancel_event.is_set():
+            self._cancel_event.clear()
+            raise OperationCancelled(operation)
+        if self.progress_callback is not None:
+            self.progress_callback(operation, done, total)
+
+    def _iter_progress(self, operation, items, total):
+        # Yield items, reporting progress (and honoring cancel()) before each one.
+        for done, item in enumerate(items):
+            self._progress(operation, done, total)
+            yield item
+        self._progress(operation, total, total)
+
+    @property
+    def image_catalog(self):
+        """
+        Image catalog of the document, built on first use in a single pass.
+
+        Returns:
+            ImageCatalog: Header-only image records shared across pages.
+        """
+        if self._image_catalog is None:
+            self._image_catalog = ImageCatalog(
+                self.doc,
+                self._iter_progress("image_catalog", self.doc, len(self.doc)),
+            )
+        return self._image_catalog
+
+    def iter_page_contents(self, *pages, show_texts=True, show_images=True):
+        """
+        Yield the selected contents of specific pages or all pages, one page at a time.
+
+        Word lists and image records are cached per page. The cleaner's own
+        operations forget the results of the pages they change, so repeated
+        calls only analyse pages that changed in between.
+
+        Args:
+            *pages (int, str or PageSelection): 1-based page numbers or page-range
+                expressions, e.g. iter_page_contents(1, 3, 5) or iter_page_contents("1-20,last 5").
+                Pages are visited in document order, once each, whatever order
+                and repeats they are given in (before page-range expressions,
+                they were visited as given). Negative numbers count from the
+                end, see remove_pages(). If none are given, the content of all
+                pages will be retrieved.
+            show_texts (bool): Include page text if True.
+            show_images (bool): Include image info if True.
+        Yields:
+            dict: One record per page, e.g. {"page_number": 1, "texts": [...], "images": [...]}
+        """
+
+        if pages:
+            target_pages = select_pages(pages, len(self.doc))
+        else:
+            target_pages = range(len(self.doc))
+
+        with self._operation("get_page_contents") as record:
+            for page_index in self._iter_progress(
+                "get_page_contents", target_pages, len(target_pages)
+            ):
+                record.add("pages_visited")
+                yield self._page_record(page_index, show_texts, show_images, record)
+
+    def _page_record(self, page_index, show_texts, show_images, record):
+        # Word lists and image records are cached per page until an operation changes the page.
+        analysis = self._page_analysis
+        page_dict = {"page_number": page_index + 1}
+        page = None
+
+        if show_texts:
+            texts = analysis.get(page_index, TEXTS)
+            if texts is None:
+                words = analysis.get(page_index, WORDS)
+                if words is None:
+                    page = self.doc[page_index]
+                    words = page.get_text("words")
+                texts = [txt[4] for txt in words]
+                analysis.put(page_index, TEXTS, texts)
+            else:
+                record.add("cache_hits")
+            page_dict["texts"] = texts
+
+        if show_images:
+            images = analysis.get(page_index, IMAGES)
+            if images is None:
+                if self._image_catalog is not None:
+                    images = [
+                        info.to_dict()
+                        for info in self._image_catalog.images_on_page(page_index)
+                    ]
+                else:
+                    # Don't build the whole catalog just to stream the first page.
+                    images = page_image_records(page or self.doc[page_index])
+                analysis.put(page_index, IMAGES, images)
+            else:
+                record.add("cache_hits")
+            page_dict["images"] = images
+
+        return page_dict
+
+    def get_page_contents(self, *pages, show_texts=True, show_images=True):
+        """
+        Print selected contents of specific pages or all pages in the PDF.
+
+        Args:
+            *pages (int, str or PageSelection): 1-based page numbers or page-range
+                expressions, as in iter_page_contents(). If none are given, the
+                content of all pages will be retrieved.
+            show_texts (bool): Show page text if True.
+            show_images (bool): Show image info if True.
+        Returns:
+            dict: A dictionary containing page contents
+        """
+        pages_data = list(
+            self.iter_page_contents(
+                *pages, show_texts=show_texts, show_images=show_images
+            )
+        )
+        return {"data": pages_data}
+
+    def write_page_contents(
+        self, output, *pages, show_texts=True, show_images=True, format="ndjson"
+    ):
+        """
+        Stream page contents to a file, one page record at a time.
+
+        Args:
+            output (str or file): Output file path, or a text file object opened for writing.
+            *pages (int, str or PageSelection): Pages, as in iter_page_contents().
+            show_texts (bool): Include page text if True.
+            show_images (bool): Include image info if True.
+            format (str): "ndjson" (one JSON record per line), "json" or "csv",
+                          see pdf_cleaner.export.write_page_records().
+        Returns:
+            int: Number of page records written.
+        """
+        return write_page_records(
+            self.iter_page_contents(
+                *pages, show_texts=show_texts, show_images=show_images
+            ),
+            output,
+            format,
+        )
+
+    def remove_images(self, *image_sizes, tolerance=0):
+        """
+        Remove images that match any of the specified (width, height) pairs across all pages.
+        A tolerance value can be set to allow for slight size differences.
+
+        Images are looked up in the image catalog, so each matching xref is
+        deleted once no matter how many pages share it.
+
+        Args:
+            *image_sizes (str, list or tuple): Variable number of "WxH" strings or (width, height) pairs,
+                                               e.g. "100x200", (100, 200), [50, 50].
+            tolerance (int): Acceptable pixel deviation (e.g., 3 = ±3 pixels).
+        """
+
+        if not image_sizes:
+            raise ValueError("You must specify at least one image size to remove.")
+
+        rules = parse_image_sizes(*image_sizes)
+        with self._operation("remove_images") as record:
+            matches = self.image_catalog.find_by_size(rules, tolerance)
+            record.add("images_inspected", len(self.image_catalog.images))
+
+            for info in matches:
+                # The image object itself is blanked, which removes it from every page using it.
+                blank_image(self.doc, info.xref)
+                self._page_analysis.invalidate(info.pages, (IMAGES,))
+            record.add("images_removed", len(matches))
+
+        if matches:
+            self._image_catalog = None
+
+    def remove_images_by_fingerprint(
+        self,
+        *fingerprints,
+        samples=(),
+        perceptual=False,
+        max_distance=DEFAULT_MAX_DISTANCE,
+    ):
+        """
+        Remove images by content rather than by size.
+
+        Each image is fingerprinted once from its raw, still-compressed stream
+        bytes, so images are not decoded and innocent images of the same size
+        are left alone. Fingerprints can be given directly (see
+        get_image_fingerprints()) or taken from sample PDFs containing the
+        unwanted images.
+
+        Args:
+            *fingerprints (str): Image fingerprints to remove.
+            samples (list): Paths of sample PDFs (or the PDFs as bytes); every image in them is removed.
+            perceptual (bool): Also remove re-encoded or resized copies of the sample images,
+                               found by decoding images and comparing perceptual hashes.
+            max_distance (int): Perceptual hash tolerance, in bits out of 64.
+        Raises:
+            ValueError: If no fingerprint or sample is given.
+        """
+        matcher = FingerprintMatcher(fingerprints, samples, perceptual, max_distance)
+        with self._operation("remove_images_by_fingerprint") as record:
+            matches = self.image_catalog.find_by_fingerprint(matcher)
+            record.add("images_inspected", len(self.image_catalog.images))
+
+            for info in matches:
+                blank_image(self.doc, info.xref)
+                self._page_analysis.invalidate(info.pages, (IMAGES,))
+            record.add("images_removed", len(matches))
+
+        if matches:
+            self._image_catalog = None
+
+    def recompress_images(
+        self,
+        target_dpi=DEFAULT_TARGET_DPI,
+        max_dpi=None,
+        min_bytes=None,
+        format="jpeg",
+        quality=DEFAULT_JPEG_QUALITY,
+        workers=1,
+    ):
+        """
+        Downsample oversized images and re-encode large ones to shrink the file.
+
+        An image's effective resolution is the lowest it is drawn at on any
+        page. Images above max_dpi are resampled to target_dpi, and images
+        whose stream is at least min_bytes long are re-encoded at their own
+        size. Each image xref is processed once, however many pages share it,
+        and the new stream only replaces the old one if it is smaller. Images
+        with masks, soft masks, Decode arrays or unusual colour spaces are
+        left alone.
+
+        Args:
+            target_dpi (int): Resolution to downsample to.
+            max_dpi (int): Downsample images above this resolution; defaults to 1.5 x target_dpi.
+            min_bytes (int): Also re-encode images of at least this many bytes.
+            format (str): "jpeg", "flate" (lossless) or "auto" (JPEG for JPEG images, Flate otherwise).
+            quality (int): JPEG quality, 1-100.
+            workers (int): Number of worker processes encoding images; 1 encodes in this process.
+        Returns:
+            dict: {"images": [...], "totals": {...}}, with the bytes saved per
+                  rewritten image and overall; also kept in self.last_recompress_report.
+        Raises:
+            ValueError: If a setting is out of range.
+        """
+        policy = RecompressPolicy(target_dpi, max_dpi, min_bytes, format, quality)
+        with self._operation("recompress_images") as record:
+            self._recompress_images(policy, range(len(self.doc)), workers, record)
+        return self.last_recompress_report
+
+    def _recompress_images(self, policy, page_indexes, workers, record):
+        report, changed_pages = recompress_images(
+            self.doc, policy, page_indexes, workers, record
+        )
+        if changed_pages:
+            self._page_analysis.invalidate(changed_pages, (IMAGES,))
+        if report["images"]:
+            self._image_catalog = None
+        self.last_recompress_report = report
+
+    def prune_resources(self):
+        """
+        Drop the fonts, images, forms and graphics states no page draws any more.
+
+        After remove_texts() or other content changes, the page resources
+        still list fonts and XObjects that nothing uses, and saving can't
+        reclaim them. This scans the content streams of every page and of
+        the Form XObjects they draw, each shared stream and resource
+        dictionary once, and removes the unused entries, so the next save
+        with the "balanced" or "smallest" profile drops the objects.
+
+        Returns:
+            dict: Number of entries removed per resource category,
+                  e.g. {"Font": 12, "XObject": 0, "ExtGState": 3}.
+        """
+        with self._operation("prune_resources") as record:
+            return self._prune_resources(record)
+
+    def _prune_resources(self, record):
+        removed = prune_unused_resources(self.doc, record)
+        if removed["XObject"]:
+            # Image records list the images in the page resources.
+            self._image_catalog = None
+            self._page_analysis.invalidate(range(len(self.doc)), (IMAGES,))
+        return removed
+
+    def get_image_fingerprints(self):
+        """
+        List every image in the document with its fingerprint.
+
+        Returns:
+            list: {"xref", "width", "height", "fingerprint", "pages"} dicts, one per
+                  image xref, where pages are 1-based page numbers.
+        """
+        catalog = self.image_catalog
+        return [
+            dict(
+                info.to_dict(),
+                fingerprint=info.get_fingerprint(self.doc),
+                pages=[p + 1 for p in info.pages],
+            )
+            for info in catalog
+        ]
+
+    def detect_watermarks(
+        self,
+        min_fraction=DEFAULT_MIN_FRACTION,
+        sample_pages=DEFAULT_SAMPLE_PAGES,
+        min_length=DEFAULT_MIN_LENGTH,
+    ):
+        """
+        Find images and text runs that recur on many pages, such as logos and watermarks.
+
+        On large documents only a stratified random sample (seeded,
+        reproducible) of pages is read, see watermarks.sample_page_indexes().
+        Images are grouped by fingerprint and text by the runs remove_texts()
+        matches, so the suggested operations can be passed straight to
+        apply_operations() or saved as a spec for the command line.
+
+        Args:
+            min_fraction (float): Flag what appears on at least this fraction of the sampled pages.
+            sample_pages (int): Largest number of pages to read; 0 reads every page.
+            min_length (int): Ignore text runs shorter than this many characters.
+        Returns:
+            dict: {"pages", "sampled_pages", "images", "texts", "operations"}; see
+                  WatermarkIndex.report().
+        """
+        index = WatermarkIndex(self.doc, min_length)
+        sampled = sample_page_indexes(len(self.doc), sample_pages)
+
+        with self._operation("detect_watermarks") as record:
+            for page_index in self._iter_progress("detect_watermarks", sampled, len(sampled)):
+                index.add_page(self.doc[page_index])
+                record.add("pages_visited")
+            report = index.report(min_fraction)
+            record.add("candidates", len(report["images"]) + len(report["texts"]))
+
+        return dict(report, pages=len(self.doc), sampled_pages=len(sampled))
+
+    def remove_texts(self, *texts):
+        """
+        Remove all occurrences of multiple strings from the text shown by PDF content streams.
+
+        Content streams are tokenized, so only string operands of text-showing
+        operators are touched, and a run split across TJ kerning segments still
+        matches. Each content stream is visited once, even when several pages
+        share it, all terms are matched in a single pass, and only streams that
+        actually changed are written back.
+
+        Args:
+            *texts (str): Text strings to remove, e.g. remove_texts("Confidential", "Draft", "Sample").
+                          If none are given, all text is removed.
+        """
+
+        matcher = MultiPatternMatcher(*texts) if texts else None
+        seen = {}
+
+        with self._operation("remove_texts") as record:
+            for page in self._iter_progress("remove_texts", self.doc, len(self.doc)):
+                record.add("pages_visited")
+                self._clean_page_texts(page, matcher, seen, record)
+
+    def _clean_page_texts(self, page, matcher, seen, record):
+        # Text removal for one page. seen maps the content streams already
+        # visited to whether they were rewritten; those are not scanned again.
+        changed = False
+        for xref in page.get_contents():
+            if xref in seen:
+                changed = changed or seen[xref]
+                continue
+
+            stream = self.doc.xref_stream(xref)
+            if matcher is not None:
+                new_stream, count = remove_text_runs(stream, matcher)
+            else:
+                new_stream, count = strip_text_objects(stream)
+            record.add("streams_scanned")
+            seen[xref] = bool(count)
+            if count:
+                self.doc.update_stream(xref, new_stream)
+                record.add("streams_rewritten")
+                record.add("texts_removed", count)
+                record.add("bytes_removed", len(stream) - len(new_stream))
+                changed = True
+
+        if changed:
+            self._page_analysis.invalidate([page.number], (TEXTS, WORDS))
+
+    def redact_texts(
+        self, *terms, patterns=(), regions=(), ignore_case=False, fill=None
+    ):
+        """
+        Remove text by what PyMuPDF extracts, rather than by content stream bytes.
+
+        Unlike remove_texts(), this finds text however it is encoded (hex
+        strings, subset or custom-encoded fonts) and can target areas of the
+        page such as a header or footer band. Each page's word index is built
+        once with get_text("words") and shared by every term, pattern and
+        region (and by get_page_contents()); the words found are then removed
+        with one batch of redactions per page. Only text is removed; images
+        and vector graphics under the words are kept.
+
+        Args:
+            *terms (str): Texts to remove. Every word a match touches is
+                          removed; a term can span the words of one line.
+            patterns (list): Regular expressions to remove, e.g. [r"INV-\d+"].
+            regions (list): (x0, y0, x1, y1) rectangles in page coordinates;
+                            every word they touch is removed.
+            ignore_case (bool): Match terms and patterns regardless of case.
+            fill (tuple): RGB colour, 0-1, to paint over removed words; None leaves them blank.
+        Raises:
+            ValueError: If nothing is given, a pattern is invalid or a region isn't four numbers.
+        """
+        rules = RedactionRules(terms, patterns, regions, ignore_case)
+        with self._operation("redact_texts") as record:
+            for page in self._iter_progress("redact_texts", self.doc, len(self.doc)):
+                record.add("pages_visited")
+                self._redact_page(page, rules, fill, record)
+
+    def _page_words(self, page, record):
+        words = self._page_analysis.get(page.number, WORDS)
+        if words is None:
+            words = page.get_text("words")
+            self._page_analysis.put(page.number, WORDS, words)
+            record.add("pages_parsed")
+        else:
+            record.add("cache_hits")
+        return WordIndex(words)
+
+    def _redact_page(self, page, rules, fill, record):
+        # All of a page's redactions are applied at once.
+        index = self._page_words(page, record)
+        matches = rules.match(index)
+        if not matches:
+            return 0
+        for i in matches:
+            page.add_redact_annot(index.rect(i), fill=fill)
+        page.apply_redactions(
+            images=fitz.PDF_REDACT_IMAGE_NONE, graphics=fitz.PDF_REDACT_LINE_ART_NONE
+        )
+        self._page_analysis.invalidate([page.number], (TEXTS, WORDS))
+        record.add("pages_redacted")
+        record.add("words_redacted", len(matches))
+        return len(matches)
+
+    def apply_plan(self, plan):
+        """
+        Apply a CleaningPlan in about one pass over the document.
+
+        The pages that survive remove_pages and remove_last_page are resolved
+        first. Text and image work then runs in a single traversal of the
+        surviving pages only, followed by image recompression, the rotations,
+        one bulk deletion and resource pruning.
+        The result matches calling the individual methods one after another.
+
+        Args:
+            plan (CleaningPlan): The operations to apply.
+        """
+        with self._operation("apply_plan") as record:
+            self._apply_plan(plan, record)
+
+    def _apply_plan(self, plan, record):
+        survivors, doomed, rotations = plan.resolve(len(self.doc))
+
+        if plan.has_page_work:
+            texts = plan.texts
+            matcher = MultiPatternMatcher(*texts) if texts else None
+            seen_streams = {}
+            seen_images = set()
+            blanked = set()
+            page_images = {}
+
+            for page_index in self._iter_progress("apply_plan", survivors, len(survivors)):
+                page = self.doc[page_index]
+                record.add("pages_visited")
+                if texts is not None:
+                    self._clean_page_texts(page, matcher, seen_streams, record)
+                if plan.redaction is not None:
+                    self._redact_page(page, *plan.redaction, record)
+                if plan.has_image_work:
+                    xrefs = page_images[page_index] = set()
+                    for img in page.get_images(full=True):
+                        xref, width, height = img[0], img[2], img[3]
+                        xrefs.add(xref)
+                        if xref in seen_images:
+                            continue
+                        seen_images.add(xref)
+                        record.add("images_inspected")
+                        if size_matches(
+                            width, height, plan.image_sizes, plan.tolerance
+                        ) or (
+                            plan.fingerprints is not None
+                            and plan.fingerprints.matches(self.doc, xref)
+                        ):
+                            blank_image(self.doc, xref)
+                            record.add("images_removed")
+                            blanked.add(xref)
+
+            if blanked:
+                self._image_catalog = None
+                self._page_analysis.invalidate(
+                    [index for index, xrefs in page_images.items() if xrefs & blanked],
+                    (IMAGES,),
+                )
+
+        if plan.recompress is not None:
+            policy, workers = plan.recompress
+            self._recompress_images(policy, survivors, workers, record)
+
+        for page_index, angle in rotations.items():
+            self.doc[page_index].set_rotation(angle)
+        self._page_analysis.invalidate(rotations)
+        record.add("pages_rotated", len(rotations))
+
+        if doomed:
+            delete_page_set(self.doc, doomed)
+            self._page_analysis.remove_pages(doomed)
+            record.add("pages_removed", len(doomed))
+            self._image_catalog = None
+
+        if plan.prune:
+            self._prune_resources(record)
+
+    def preview_plan(self, plan):
+        """
+        Dry run of a CleaningPlan: report what apply_plan() would change, without changing it.
+
+        Content streams are scanned with the same matching as apply_plan(), but
+        nothing is written back, no image is blanked and no page is rotated or
+        removed. Shared content streams and images are checked once each.
+
+        Args:
+            plan (CleaningPlan): The operations to preview.
+        Returns:
+            dict: {"pages": [...], "totals": {...}}. pages lists only the pages that
+                  would change, e.g. {"page_number": 3, "texts": 2, "streams": 1,
+                  "redactions": 4, "images": 1, "rotation": 90, "removed": False},
+                  where redactions counts the words redact_texts would remove.
+                  totals has pages_affected, texts and redactions (summed over
+                  pages), the distinct streams and images that would change,
+                  pages_rotated and pages_removed.
+        """
+        survivors, doomed, rotations = plan.resolve(len(self.doc))
+        texts = plan.texts
+        matcher = MultiPatternMatcher(*texts) if texts else None
+        stream_matches = {}
+        image_matches = {}
+        pages = {}
+
+        with self._operation("preview_plan") as record:
+            for page_index in self._iter_progress("preview_plan", survivors, len(survivors)):
+                page = self.doc[page_index]
+                record.add("pages_visited")
+                text_count = stream_count = image_count = redaction_count = 0
+
+                if texts is not None:
+                    for xref in page.get_contents():
+                        count = stream_matches.get(xref)
+                        if count is None:
+                            stream = self.doc.xref_stream(xref)
+                            if matcher is not None:
+                                count = remove_text_runs(stream, matcher)[1]
+                            else:
+                                count = strip_text_objects(stream)[1]
+                            stream_matches[xref] = count
+                            record.add("streams_scanned")
+                        if count:
+                            text_count += count
+                            stream_count += 1
+
+                if plan.redaction is not None:
+                    index = self._page_words(page, record)
+                    redaction_count = len(plan.redaction[0].match(index))
+
+                if plan.has_image_work:
+                    for img in page.get_images(full=True):
+                        xref, width, height = img[0], img[2], img[3]
+                        matched = image_matches.get(xref)
+                        if matched is None:
+                            matched = image_matches[xref] = size_matches(
+                                width, height, plan.image_sizes, plan.tolerance
+                            ) or (
+                                plan.fingerprints is not None
+                                and plan.fingerprints.matches(self.doc, xref)
+                            )
+                            record.add("images_inspected")
+                        image_count += matched
+
+                if (
+                    text_count
+                    or redaction_count
+                    or image_count
+                    or page_index in rotations
+                ):
+                    pages[page_index] = {
+                        "page_number": page_index + 1,
+                        "texts": text_count,
+                        "streams": stream_count,
+                        "redactions": redaction_count,
+                        "images": image_count,
+                        "rotation": rotations.get(page_index),
+                        "removed": False,
+                    }
+
+            for page_index in doomed:
+                pages[page_index] = {
+                    "page_number": page_index + 1,
+                    "texts": 0,
+                    "streams": 0,
+                    "redactions": 0,
+                    "images": 0,
+                    "rotation": None,
+                    "removed": True,
+                }
+
+        totals = {
+            "pages_affected": len(pages),
+            "texts": sum(info["texts"] for info in pages.values()),
+            "streams": sum(1 for count in stream_matches.values() if count),
+            "redactions": sum(info["redactions"] for info in pages.values()),
+            "images": sum(1 for matched in image_matches.values() if matched),
+            "pages_rotated": len(rotations),
+            "pages_removed": len(doomed),
+        }
+        return {"pages": [pages[i] for i in sorted(pages)], "totals": totals}
+
+    def remove_last_page(self):
+        """
+        Remove the last page from the PDF.
+        """
+        with self._operation("remove_last_page") as record:
+            self._progress("remove_last_page", 0, 1)
+            last_page_index = len(self.doc) - 1
+            self.doc.delete_page(last_page_index)
+            self._page_analysis.remove_pages([last_page_index])
+            self._progress("remove_last_page", 1, 1)
+            record.add("pages_removed")
+        self._image_catalog = None
+
+    def remove_pages(self, *pages):
+        """
+        Remove specific pages from the PDF.
+
+        Args:
+            *pages (int, str or PageSelection): 1-based page numbers or page-range
+                expressions, e.g. remove_pages(1, 3, 5) or remove_pages("1001-9000,-1").
+                See pdf_cleaner.pages.PageSelection for the syntax. Negative
+                numbers count from the end, plain ints included: remove_pages(-1)
+                removes the last page (before page-range expressions, numbers
+                below 1 were ignored). Pages past the end are still ignored.
+        Raises:
+            ValueError: If a page-range expression is invalid.
+        """
+        doomed = select_pages(pages, len(self.doc))
+        if doomed:
+            with self._operation("remove_pages") as record:
+                self._progress("remove_pages", 0, 1)
+                delete_page_set(self.doc, doomed)
+                self._page_analysis.remove_pages(doomed)
+                self._image_catalog = None
+                self._progress("remove_pages", 1, 1)
+                record.add("pages_removed", len(doomed))
+
+    def rotate_pages(self, *pages, angle=180):
+        """
+        Rotate specific pages in the PDF by a given angle.
+
+        Args:
+            *pages (int, str or PageSelection): 1-based page numbers or page-range
+                expressions, e.g. rotate_pages(1, 3, 5) or rotate_pages("even").
+                Negative numbers count from the end, as in remove_pages().
+            angle (int): Rotation angle. Must be one of 0, 90, 180, 270.
+        Raises:
+            ValueError: If an invalid angle or page-range expression is provided.
+        """
+        if not pages:
+            raise ValueError("No pages specified for rotation.")
+
+        if angle not in [0, 90, 180, 270]:
+            raise ValueError("Angle must be 0, 90, 180, or 270 degrees.")
+
+        target_pages = select_pages(pages, len(self.doc))
+
+        with self._operation("rotate_pages") as record:
+            for page_index in self._iter_progress(
+                "rotate_pages", target_pages, len(target_pages)
+            ):
+                page = self.doc[page_index]
+                page.set_rotation(angle)
+                self._page_analysis.invalidate([page_index])
+                record.add("pages_rotated")
+
+    def save(self, output_pdf_path=None, profile=DEFAULT_SAVE_PROFILE):
+        """
+        Save the modified PDF document to a new file, a binary stream, or bytes.
+
+        Args:
+            output_pdf_path (str, file or None): Path where the output PDF file will be saved,
+                or a writable binary stream. If None, the PDF is returned as bytes.
+            profile (str): One of SAVE_PROFILES: "fast", "balanced" or "smallest".
+        Returns:
+            dict or bytes: Save report with "profile", "path", "size" (bytes) and "seconds",
+                           or the PDF bytes if output_pdf_path is None. The report is always
+                           kept in self.last_save_report.
+        Raises:
+            ValueError: If the profile is unknown.
+        """
+        if profile not in SAVE_PROFILES:
+            raise ValueError(
+                f"Unknown save profile {profile!r}. Choose from: {', '.join(SAVE_PROFILES)}."
+            )
+
+        started = time.perf_counter()
+        data = None
+        is_path = isinstance(output_pdf_path, (str, os.PathLike))
+
+        if output_pdf_path is None:
+            data = self.doc.tobytes(**SAVE_PROFILES[profile])
+            size = len(data)
+        elif not is_path:
+            start = _tell(output_pdf_path)
+            self.doc.save(output_pdf_path, **SAVE_PROFILES[profile])
+            end = _tell(output_pdf_path)
+            size = end - start if start is not None and end is not None else None
+        else:
+            if (
+                profile == "fast"
+                and self.doc.name
+                and os.path.abspath(output_pdf_path) == os.path.abspath(self.doc.name)
+                and self.doc.can_save_incrementally()
+            ):
+                self.doc.save(
+                    output_pdf_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP
+                )
+            else:
+                self.doc.save(output_pdf_path, **SAVE_PROFILES[profile])
+            size = os.path.getsize(output_pdf_path)
+
+        self.last_save_report = {
+            "profile": profile,
+            "path": output_pdf_path if is_path else None,
+            "size": size,
+            "seconds": time.perf_counter() - started,
+        }
+        self.metrics.add(
+            OperationRecord(
+                "save",
+                self.last_save_report["seconds"],
+                {"bytes_written": size} if size is not None else {},
+                {"profile": profile},
+            )
+        )
+        return self.last_save_report if data is None else data
+
+    def close(self):
+        """
+        Close the PDF document to release file handles and free memory.
+
+        This should be called after all processing is complete,
+        especially if working with large PDFs or in long-running applications.
+        """
+        self.doc.close()
+        for closer in self._closers:
+            if isinstance(closer, memoryview):
+                closer.release()
+            else:
+                closer.close()
+        self._closers = []
+
+
+def _tell(stream):
+    try:
+        return stream.tell()
+    except (AttributeError, OSError):
+        return None
@@ -0,0 +1,637 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent import futures
+
+from .cache import ResultCache
+from .checkpoint import (
+    DEFAULT_CHUNK_PAGES,
+    CheckpointJournal,
+    clean_checkpointed,
+    journal_directory,
+)
+from .cleaner import DEFAULT_SAVE_PROFILE, SAVE_PROFILES, PDFCleaner
+from .images import DEFAULT_MAX_DISTANCE
+from .watermarks import DEFAULT_MIN_FRACTION, DEFAULT_MIN_LENGTH, DEFAULT_SAMPLE_PAGES
+from .operations import (
+    clean_file,
+    copy_cached_result,
+    normalize_operations,
+    preview_file,
+)
+from .parallel import clean_parallel
+from .recompress import DEFAULT_JPEG_QUALITY, DEFAULT_TARGET_DPI, IMAGE_FORMATS
+
+# Added to the name of each input to name its output when there's no -o.
+OUTPUT_SUFFIX = "_cleaned"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m pdf_cleaner",
+        description="Clean PDF files without the GUI.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    clean = commands.add_parser(
+        "clean", help="Clean PDF files or directories of PDF files."
+    )
+    clean.add_argument("inputs", nargs="+", help="PDF files or directories.")
+    clean.add_argument(
+        "-o",
+        "--output-dir",
+        help="Directory for cleaned files. Defaults to <name>_cleaned.pdf next to each input.",
+    )
+    clean.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="Search input directories recursively.",
+    )
+    clean.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+    clean.add_argument(
+        "--page-workers",
+        type=int,
+        help="Split each file's pages across this many worker processes. "
+        "Files are then processed one at a time.",
+    )
+    clean.add_argument(
+        "--journal-dir",
+        metavar="DIR",
+        help="Clean each file in page chunks and keep finished chunks here, so a "
+        "rerun after a crash or kill resumes where it stopped. Files are then "
+        "processed one at a time, using --page-workers processes.",
+    )
+    clean.add_argument(
+        "--chunk-pages",
+        type=int,
+        default=DEFAULT_CHUNK_PAGES,
+        help="Pages per checkpointed chunk (default: %(default)s).",
+    )
+    clean.add_argument(
+        "--save-profile",
+        choices=list(SAVE_PROFILES),
+        default=DEFAULT_SAVE_PROFILE,
+        help="How to write the output: fast, balanced or smallest (default: %(default)s).",
+    )
+    clean.add_argument(
+        "--spec", help="JSON file with an operation spec, combined with the options below."
+    )
+    clean.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what would change, one JSON line per file with per-page "
+        "counts. Nothing is written.",
+    )
+    _add_cache_arguments(clean)
+    clean.add_argument(
+        "--metrics-out",
+        metavar="FILE",
+        help="Write per-operation timings and counters of every file to this JSON file.",
+    )
+
+    ops = clean.add_argument_group("operations")
+    ops.add_argument(
+        "--remove-texts",
+        nargs="*",
+        metavar="TEXT",
+        help="Remove these texts. Give no TEXT to remove all texts.",
+    )
+    ops.add_argument(
+        "--redact",
+        nargs="+",
+        metavar="TEXT",
+        help="Remove the words showing these texts, however they are encoded.",
+    )
+    ops.add_argument(
+        "--redact-pattern",
+        nargs="+",
+        metavar="REGEX",
+        help="Remove the words matching these regular expressions.",
+    )
+    ops.add_argument(
+        "--redact-region",
+        nargs="+",
+        metavar="X0,Y0,X1,Y1",
+        help="Remove the words inside these page areas, in points from the top left, "
+        "e.g. 0,0,595,60 for an A4 header band.",
+    )
+    ops.add_argument(
+        "--ignore-case",
+        action="store_true",
+        help="Match --redact and --redact-pattern regardless of case.",
+    )
+    ops.add_argument(
+        "--remove-images", nargs="+", metavar="WxH", help="Remove images of these sizes."
+    )
+    ops.add_argument(
+        "--tolerance", type=int, default=0, help="Pixel tolerance for --remove-images."
+    )
+    ops.add_argument(
+        "--remove-image-fingerprints",
+        nargs="+",
+        metavar="FINGERPRINT",
+        help="Remove images with these fingerprints (see the fingerprints command).",
+    )
+    ops.add_argument(
+        "--remove-images-like",
+        nargs="+",
+        metavar="SAMPLE_PDF",
+        help="Remove every image found in these sample PDFs.",
+    )
+    ops.add_argument(
+        "--perceptual",
+        action="store_true",
+        help="Also remove re-encoded copies of the sample images (decodes images).",
+    )
+    ops.add_argument(
+        "--max-distance",
+        type=int,
+        default=DEFAULT_MAX_DISTANCE,
+        help="Perceptual hash tolerance in bits, out of 64 (default: %(default)s).",
+    )
+    ops.add_argument(
+        "--recompress-images",
+        action="store_true",
+        help="Downsample images drawn above --max-dpi and re-encode them.",
+    )
+    ops.add_argument(
+        "--target-dpi",
+        type=int,
+        default=DEFAULT_TARGET_DPI,
+        help="Resolution to downsample images to (default: %(default)s).",
+    )
+    ops.add_argument(
+        "--max-dpi",
+        type=int,
+        help="Downsample images above this resolution (default: 1.5 x --target-dpi).",
+    )
+    ops.add_argument(
+        "--min-image-kb",
+        type=int,
+        help="Also re-encode images of at least this many kilobytes, at their own size.",
+    )
+    ops.add_argument(
+        "--image-format",
+        choices=IMAGE_FORMATS,
+        default="jpeg",
+        help="Encoding of recompressed images; auto keeps JPEGs JPEG and the rest "
+        "lossless (default: %(default)s).",
+    )
+    ops.add_argument(
+        "--jpeg-quality",
+        type=int,
+        default=DEFAULT_JPEG_QUALITY,
+        help="JPEG quality of recompressed images, 1-100 (default: %(default)s).",
+    )
+    ops.add_argument(
+        "--image-workers",
+        type=int,
+        default=1,
+        help="Worker processes encoding images within one file (default: %(default)s).",
+    )
+    ops.add_argument(
+        "--rotate-pages",
+        nargs="+",
+        metavar="PAGES",
+        help='Rotate these pages: numbers or ranges such as 1-500,700 10- odd even '
+        '"last 3"; write --rotate-pages=-5--1 for ranges counted from the end.',
+    )
+    ops.add_argument(
+        "--angle",
+        type=int,
+        default=180,
+        choices=[0, 90, 180, 270],
+        help="Rotation angle for --rotate-pages.",
+    )
+    ops.add_argument(
+        "--remove-pages",
+        nargs="+",
+        metavar="PAGES",
+        help="Remove these pages, in the same syntax as --rotate-pages.",
+    )
+    ops.add_argument(
+        "--remove-last-page", action="store_true", help="Remove the last page."
+    )
+    ops.add_argument(
+        "--prune-resources",
+        action="store_true",
+        help="Drop the fonts, images and graphics states no page uses any more.",
+    )
+    clean.set_defaults(func=run_clean)
+
+    fingerprints = commands.add_parser(
+        "fingerprints", help="Print the fingerprint of every image in a PDF, as JSON lines."
+    )
+    fingerprints.add_argument("input", help="PDF file.")
+    fingerprints.set_defaults(func=run_fingerprints)
+
+    detect = commands.add_parser(
+        "detect-watermarks",
+        help="Find images and texts that recur on many pages and write them as an "
+        "operation spec for clean --spec.",
+    )
+    detect.add_argument("input", help="PDF file.")
+    detect.add_argument(
+        "-o", "--output", help="Write the operation spec here instead of to stdout."
+    )
+    detect.add_argument(
+        "--min-fraction",
+        type=float,
+        default=DEFAULT_MIN_FRACTION,
+        help="Flag what appears on at least this fraction of pages (default: %(default)s).",
+    )
+    detect.add_argument(
+        "--sample-pages",
+        type=int,
+        default=DEFAULT_SAMPLE_PAGES,
+        help="Read at most this many pages, as a stratified random sample (seeded, "
+        "reproducible); 0 reads all (default: %(default)s).",
+    )
+    detect.add_argument(
+        "--min-length",
+        type=int,
+        default=DEFAULT_MIN_LENGTH,
+        help="Ignore texts shorter than this (default: %(default)s).",
+    )
+    detect.set_defaults(func=run_detect_watermarks)
+
+    serve = commands.add_parser(
+        "serve", help="Run a local HTTP cleaning service with a warm worker pool."
+    )
+    serve.add_argument("--host", default="127.0.0.1", help="Default: %(default)s.")
+    serve.add_argument("--port", type=int, default=8080, help="Default: %(default)s.")
+    serve.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+    serve.add_argument(
+        "--max-queue",
+        type=int,
+        default=16,
+        help="Requests allowed to wait for a free worker before answering 503 "
+        "(default: %(default)s).",
+    )
+    serve.add_argument(
+        "--max-body-mb",
+        type=float,
+        default=100,
+        help="Largest accepted PDF, in megabytes (default: %(default)s).",
+    )
+    serve.add_argument(
+        "--save-profile",
+        choices=list(SAVE_PROFILES),
+        default=DEFAULT_SAVE_PROFILE,
+        help="Default save profile (default: %(default)s).",
+    )
+    _add_cache_arguments(serve)
+    serve.set_defaults(func=run_serve)
+
+    return parser
+
+
+def _add_cache_arguments(parser):
+    parser.add_argument(
+        "--cache-dir",
+        help="Reuse cleaned results for byte-identical inputs with the same operations, "
+        "stored in this directory.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=1024,
+        help="Size cap of the result cache, in megabytes (default: %(default)s).",
+    )
+
+
+def cache_from_args(args):
+    if not args.cache_dir:
+        return None
+    return ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
+
+def operations_from_args(args):
+    """
+    Build an operation spec from the --spec file and the operation options.
+
+    Returns:
+        dict: The normalized operation spec.
+    """
+    operations = {}
+    if args.spec:
+        with open(args.spec, "r", encoding="utf-8") as f:
+            operations.update(json.load(f))
+
+    if args.remove_texts is not None:
+        operations["remove_texts"] = {"texts": args.remove_texts}
+    if args.redact or args.redact_pattern or args.redact_region:
+        operations["redact_texts"] = {
+            "terms": args.redact or [],
+            "patterns": args.redact_pattern or [],
+            "regions": [region.split(",") for region in args.redact_region or []],
+            "ignore_case": args.ignore_case,
+        }
+    if args.remove_images:
+        operations["remove_images"] = {
+            "sizes": args.remove_images,
+            "tolerance": args.tolerance,
+        }
+    if args.remove_image_fingerprints or args.remove_images_like:
+        operations["remove_images_by_fingerprint"] = {
+            "fingerprints": args.remove_image_fingerprints or [],
+            "samples": args.remove_images_like or [],
+            "perceptual": args.perceptual,
+            "max_distance": args.max_distance,
+        }
+    if args.recompress_images:
+        operations["recompress_images"] = {
+            "target_dpi": args.target_dpi,
+            "max_dpi": args.max_dpi,
+            "min_bytes": args.min_image_kb * 1024 if args.min_image_kb else None,
+            "format": args.image_format,
+            "quality": args.jpeg_quality,
+            "workers": args.image_workers,
+        }
+    if args.rotate_pages:
+        operations["rotate_pages"] = {"pages": args.rotate_pages, "angle": args.angle}
+    if args.remove_pages:
+        operations["remove_pages"] = {"pages": args.remove_pages}
+    if args.remove_last_page:
+        operations["remove_last_page"] = True
+    if args.prune_resources:
+        operations["prune_resources"] = True
+
+    return normalize_operations(operations)
+
+
+def collect_jobs(inputs, output_dir=None, recursive=False):
+    """
+    Expand input files and directories into (input_path, output_path) pairs.
+
+    Files found in a directory keep their path relative to that directory
+    under output_dir. Outputs of earlier runs are left out when expanding a
+    directory: without output_dir, files named like <name>_cleaned.pdf, and
+    with it, anything under output_dir. Files given by name are always kept.
+    """
+    output_root = os.path.realpath(output_dir) if output_dir else None
+    jobs = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                if not recursive:
+                    dirs.clear()
+                elif output_root:
+                    dirs[:] = [
+                        name
+                        for name in dirs
+                        if os.path.realpath(os.path.join(root, name)) != output_root
+                    ]
+                for name in sorted(files):
+                    stem, ext = os.path.splitext(name)
+                    if ext.lower() != ".pdf" or (
+                        not output_dir and stem.endswith(OUTPUT_SUFFIX)
+                    ):
+                        continue
+                    path = os.path.join(root, name)
+                    jobs.append(
+                        (path, _output_path(path, os.path.relpath(path, item), output_dir))
+                    )
+        else:
+            jobs.append((item, _output_path(item, os.path.basename(item), output_dir)))
+    return jobs
+
+
+def _output_path(input_path, relative_path, output_dir):
+    if output_dir:
+        return os.path.join(output_dir, relative_path)
+    root, ext = os.path.splitext(input_path)
+    return f"{root}{OUTPUT_SUFFIX}{ext or '.pdf'}"
+
+
+def run_clean(args):
+    try:
+        operations = operations_from_args(args)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if not operations:
+        print("error: no operations given", file=sys.stderr)
+        return 2
+
+    jobs = collect_jobs(args.inputs, args.output_dir, args.recursive)
+    if not jobs:
+        print("error: no PDF files found", file=sys.stderr)
+        return 2
+    if args.dry_run:
+        return run_preview(jobs, operations, args.workers)
+    for _, output_path in jobs:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    failures = 0
+    metrics = []
+    started = time.perf_counter()
+
+    cache = cache_from_args(args)
+    if args.page_workers or args.journal_dir:
+        results = _run_jobs_by_pages(
+            jobs,
+            operations,
+            args.page_workers or 1,
+            args.save_profile,
+            cache,
+            args.journal_dir,
+            args.chunk_pages,
+        )
+    else:
+        results = _run_jobs(jobs, operations, args.workers, args.save_profile, cache)
+
+    for input_path, output_path, report, error in results:
+        if error is None:
+            how = "from cache" if report["cached"] else "saved"
+            print(
+                f"OK      {input_path} -> {output_path} "
+                f"({report['size']} bytes, {how} in {report['seconds']:.2f}s)"
+            )
+            metrics.append(
+                {"input": input_path, "output": output_path, "metrics": report["metrics"]}
+            )
+        else:
+            failures += 1
+            print(f"FAILED  {input_path}: {error}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"{len(jobs) - failures} cleaned, {failures} failed in {elapsed:.2f}s",
+        file=sys.stderr,
+    )
+
+    if args.metrics_out:
+        with open(args.metrics_out, "w", encoding="utf-8") as f:
+            json.dump({"seconds": elapsed, "files": metrics}, f, indent=2)
+    return 1 if failures else 0
+
+
+def run_preview(jobs, operations, workers):
+    failures = 0
+    inputs = [(input_path,) for input_path, _ in jobs]
+    for (input_path,), preview, error in _map_jobs(preview_file, inputs, workers, operations):
+        if error is not None:
+            failures += 1
+            print(f"FAILED  {input_path}: {error}", file=sys.stderr)
+            continue
+        totals = preview["totals"]
+        print(
+            f"PREVIEW {input_path}: {totals['texts']} texts in {totals['streams']} streams, "
+            f"{totals['redactions']} words redacted, {totals['images']} images, {totals['pages_rotated']} rotated, "
+            f"{totals['pages_removed']} removed ({totals['pages_affected']} pages affected)",
+            file=sys.stderr,
+        )
+        print(json.dumps(dict(preview, input=input_path)))
+    return 1 if failures else 0
+
+
+def _run_jobs(jobs, operations, workers, save_profile, cache=None):
+    for (input_path, output_path), report, error in _map_jobs(
+        clean_file, jobs, workers, operations, save_profile, cache
+    ):
+        yield input_path, output_path, report, error
+
+
+def _map_jobs(func, jobs, workers, *args):
+    # Yield (job, result, error) for func(*job, *args), in a process pool if workers > 1.
+    if workers <= 1:
+        for job in jobs:
+            try:
+                yield job, func(*job, *args), None
+            except Exception as e:
+                yield job, None, e
+        return
+
+    with futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(func, *job, *args): job for job in jobs}
+        for future in futures.as_completed(pending):
+            try:
+                yield pending[future], future.result(), None
+            except Exception as e:
+                yield pending[future], None, e
+
+
+def _run_jobs_by_pages(
+    jobs,
+    operations,
+    workers,
+    save_profile,
+    cache=None,
+    journal_root=None,
+    chunk_pages=DEFAULT_CHUNK_PAGES,
+):
+    for input_path, output_path in jobs:
+        try:
+            key = cache.key(input_path, operations, save_profile) if cache else None
+            report = key and copy_cached_result(cache, key, output_path, save_profile)
+            if not report:
+                if journal_root:
+                    journal_dir = journal_directory(journal_root, input_path)
+                    cleaner = clean_checkpointed(
+                        input_path, operations, journal_dir, chunk_pages, workers
+                    )
+                else:
+                    cleaner = clean_parallel(input_path, operations, workers=workers)
+                try:
+                    report = cleaner.save(output_path, profile=save_profile)
+                    report = dict(report, metrics=cleaner.metrics.to_dict(), cached=False)
+                finally:
+                    cleaner.close()
+                if journal_root:
+                    # The output is saved, so the chunks are no longer needed.
+                    CheckpointJournal(journal_dir).clear()
+                    try:
+                        os.rmdir(journal_dir)
+                    except OSError:
+                        pass
+                if key:
+                    cache.put(key, output_path)
+            yield input_path, output_path, report, None
+        except Exception as e:
+            yield input_path, output_path, None, e
+
+
+def run_fingerprints(args):
+    try:
+        cleaner = PDFCleaner(args.input)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    try:
+        for image in cleaner.get_image_fingerprints():
+            print(json.dumps(image))
+    finally:
+        cleaner.close()
+    return 0
+
+
+def run_detect_watermarks(args):
+    try:
+        cleaner = PDFCleaner(args.input)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    try:
+        report = cleaner.detect_watermarks(
+            args.min_fraction, args.sample_pages, args.min_length
+        )
+    finally:
+        cleaner.close()
+
+    print(
+        f"Sampled {report['sampled_pages']} of {report['pages']} pages.", file=sys.stderr
+    )
+    for image in report["images"]:
+        print(
+            f"image  {image['fingerprint']}  {image['width']}x{image['height']}  "
+            f"on {image['fraction']:.0%} of pages",
+            file=sys.stderr,
+        )
+    for text in report["texts"]:
+        print(f"text   {text['text']!r}  on {text['fraction']:.0%} of pages", file=sys.stderr)
+
+    spec = json.dumps(report["operations"], indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(spec + "\n")
+    else:
+        print(spec)
+    return 0
+
+
+def run_serve(args):
+    from .server import serve
+
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers", file=sys.stderr)
+    serve(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        max_body=int(args.max_body_mb * 1024 * 1024),
+        save_profile=args.save_profile,
+        cache=cache_from_args(args),
+    )
+    return 0
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    return args.func(args)
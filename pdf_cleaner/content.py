@@ -0,0 +1,475 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+WHITESPACE = b"\x00\t\n\x0c\r "
+
+_REGULAR = rb"[^\x00\t\n\x0c\r ()<>\[\]{}/%]"
+_STRING = rb"\((?:[^()\\]|\\.)*\)"
+_HEXSTRING = rb"<[0-9A-Fa-f\x00\t\n\x0c\r ]*>"
+_STRING_SPECIAL_RE = re.compile(rb"[()\\]")
+_INLINE_IMAGE_ID_RE = re.compile(rb"ID|" + _STRING, re.S)
+_INLINE_IMAGE_END_RE = re.compile(rb"[\x00\t\n\x0c\r ]EI(?=[\x00\t\n\x0c\r ]|$)")
+_FULL_TOKEN_RE = re.compile(
+    rb"(?P<string>" + _STRING + rb")"
+    rb"|(?P<nested_string>\()"
+    rb"|(?P<comment>%[^\r\n]*)"
+    rb"|(?P<name>/" + _REGULAR + rb"*)"
+    rb"|(?P<hexstring>" + _HEXSTRING + rb")"
+    rb"|(?P<dict_start><<)"
+    rb"|(?P<dict_end>>>)"
+    rb"|(?P<array_start>\[)"
+    rb"|(?P<array_end>\])"
+    rb"|(?P<number>[+-]?(?:\d+\.?\d*|\.\d+)(?!" + _REGULAR + rb"))"
+    rb"|(?P<keyword>" + _REGULAR + rb"+)"
+    rb"|(?P<other>[^\x00\t\n\x0c\r ])",
+    re.S,
+)
+
+# Bytes that can't border a keyword: regular characters, plus "/" (which would make it a name).
+_NOT_BOUNDARY = frozenset(
+    b for b in range(256) if b not in b"\x00\t\n\x0c\r ()<>[]{}%"
+)
+_SPARSE_KINDS = {
+    ord("("): "string",
+    ord("%"): "comment",
+    ord("<"): "hexstring",
+    ord("["): "array_start",
+    ord("]"): "array_end",
+}
+
+TEXT_SHOWING_OPERATORS = (b"Tj", b"TJ", b"'", b'"')
+
+# Operators naming a resource, and the resource category the name is looked up in.
+RESOURCE_OPERATORS = {b"Tf": "Font", b"Do": "XObject", b"gs": "ExtGState"}
+_NAME_RE = re.compile(rb"/(" + _REGULAR + rb"*)")
+_NAME_ESCAPE_RE = re.compile(rb"#([0-9A-Fa-f]{2})")
+
+Token = namedtuple("Token", "kind start end")
+
+
+@lru_cache(maxsize=None)
+def _sparse_token_re(operators):
+    # Every branch starts with a literal byte so the regex engine can skip
+    # ahead quickly between candidates. BI is always needed to skip over
+    # inline image data.
+    names = sorted(set(operators) | {b"BI"}, key=len, reverse=True)
+    return re.compile(
+        _STRING
+        + rb"|\(|%[^\r\n]*|"
+        + _HEXSTRING
+        + rb"|\[|\]|"
+        + b"|".join(re.escape(op) for op in names),
+        re.S,
+    )
+
+
+def tokenize(data, operators=None):
+    """
+    Yield the tokens of a content stream as Token(kind, start, end) spans, in a single pass.
+
+    String literals (including nested parentheses) and inline images
+    (BI ... ID <data> EI) are single tokens, so bytes inside them are never
+    mistaken for operators.
+
+    Kinds are "string", "hexstring", "name", "number", "keyword" (operators
+    and true/false/null), "array_start", "array_end", "dict_start",
+    "dict_end", "comment", "inline_image" and "other". Whitespace is skipped.
+
+    Args:
+        data (bytes): Decoded content stream.
+        operators (tuple): If given, only strings, hex strings, array brackets,
+                           comments, inline images and these operators are
+                           reported. Everything else is skipped inside the
+                           regex engine, which is much faster.
+    """
+    if operators is None:
+        yield from _tokenize_full(data)
+        return
+
+    finditer = _sparse_token_re(tuple(operators)).finditer
+    size = len(data)
+    pos = 0
+
+    while True:
+        resume = None
+        for m in finditer(data, pos):
+            start, end = m.span()
+            kind = _SPARSE_KINDS.get(data[start])
+            if kind is None:
+                if (start and data[start - 1] in _NOT_BOUNDARY) or (
+                    end < size and data[end] in _NOT_BOUNDARY
+                ):
+                    continue  # part of a longer keyword or a name
+                if data[start:end] == b"BI":
+                    resume = _inline_image_end(data, end)
+                    yield Token("inline_image", start, resume)
+                    break
+                kind = "keyword"
+            elif kind == "string" and end - start == 1:
+                # Nested parentheses need counting; continue scanning after it.
+                resume = _string_end(data, start)
+                yield Token("string", start, resume)
+                break
+            yield Token(kind, start, end)
+        if resume is None:
+            return
+        pos = resume
+
+
+def _tokenize_full(data):
+    pos = 0
+    while True:
+        resume = None
+        for m in _FULL_TOKEN_RE.finditer(data, pos):
+            kind = m.lastgroup
+            start, end = m.span()
+            if kind == "nested_string":
+                resume = _string_end(data, start)
+                yield Token("string", start, resume)
+                break
+            if kind == "keyword" and data[start:end] == b"BI":
+                resume = _inline_image_end(data, end)
+                yield Token("inline_image", start, resume)
+                break
+            yield Token(kind, start, end)
+        if resume is None:
+            return
+        pos = resume
+
+
+def _string_end(data, pos):
+    depth = 0
+    search = _STRING_SPECIAL_RE.search
+    while True:
+        m = search(data, pos)
+        if m is None:
+            # Unterminated string: it runs to the end of the stream.
+            return len(data)
+        char = data[m.start()]
+        pos = m.end()
+        if char == 0x5C:  # backslash: skip the escaped byte
+            pos += 1
+        elif char == 0x28:  # (
+            depth += 1
+        else:  # )
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def _inline_image_end(data, pos):
+    # Skip the image dictionary up to the ID keyword, then the binary data up to EI.
+    for m in _INLINE_IMAGE_ID_RE.finditer(data, pos):
+        if (
+            m.group() == b"ID"
+            and data[m.start() - 1] not in _NOT_BOUNDARY
+            and (m.end() == len(data) or data[m.end()] in WHITESPACE)
+        ):
+            end = _INLINE_IMAGE_END_RE.search(data, m.end() + 1)
+            return end.end() if end else len(data)
+    return len(data)
+
+
+def decode_string(raw):
+    """
+    Decode a string token (literal or hex) into the bytes it represents.
+
+    Args:
+        raw (bytes): The token bytes, including the delimiters.
+    Returns:
+        bytes: The string value.
+    """
+    if raw[:1] == b"<":
+        digits = bytes(b for b in raw[1:-1] if b not in WHITESPACE)
+        if len(digits) % 2:
+            digits += b"0"
+        return bytes.fromhex(digits.decode("ascii"))
+
+    body = raw[1:-1] if raw.endswith(b")") else raw[1:]
+    if b"\\" not in body and b"\r" not in body:
+        return body
+
+    out = bytearray()
+    i = 0
+    size = len(body)
+    while i < size:
+        c = body[i]
+        if c == 0x0D:  # bare CR or CRLF inside a literal reads as LF
+            out.append(0x0A)
+            i += 2 if body[i + 1:i + 2] == b"\n" else 1
+            continue
+        if c != 0x5C:
+            out.append(c)
+            i += 1
+            continue
+        i += 1
+        if i >= size:
+            break
+        c = body[i]
+        if c in _ESCAPES:
+            out.append(_ESCAPES[c])
+            i += 1
+        elif 0x30 <= c <= 0x37:
+            j = i
+            while j < size and j < i + 3 and 0x30 <= body[j] <= 0x37:
+                j += 1
+            out.append(int(body[i:j], 8) & 0xFF)
+            i = j
+        elif c == 0x0D:  # line continuation
+            i += 2 if body[i + 1:i + 2] == b"\n" else 1
+        elif c == 0x0A:
+            i += 1
+        else:
+            out.append(c)
+            i += 1
+    return bytes(out)
+
+
+_ESCAPES = {
+    ord("n"): 0x0A,
+    ord("r"): 0x0D,
+    ord("t"): 0x09,
+    ord("b"): 0x08,
+    ord("f"): 0x0C,
+    ord("("): 0x28,
+    ord(")"): 0x29,
+    ord("\\"): 0x5C,
+}
+
+
+def encode_string(value, hex_form=False):
+    """
+    Encode bytes as a PDF string token.
+
+    Args:
+        value (bytes): The string value.
+        hex_form (bool): Encode as a hex string (<...>) instead of a literal.
+    Returns:
+        bytes: The token bytes, including the delimiters.
+    """
+    if hex_form:
+        return b"<" + value.hex().encode("ascii") + b">"
+    escaped = (
+        value.replace(b"\\", b"\\\\")
+        .replace(b"(", b"\\(")
+        .replace(b")", b"\\)")
+        .replace(b"\r", b"\\r")
+    )
+    return b"(" + escaped + b")"
+
+
+def strip_text_objects(data):
+    """
+    Remove every text object (BT ... ET) from a content stream.
+
+    Args:
+        data (bytes): Decoded content stream.
+    Returns:
+        tuple: (new_data, number_of_text_objects_removed)
+    """
+    if b"BT" not in data:
+        return data, 0
+
+    chunks = []
+    keep_from = 0
+    text_start = None
+    count = 0
+
+    for token in tokenize(data, (b"BT", b"ET")):
+        if token.kind != "keyword":
+            continue
+        if data[token.start:token.end] == b"BT":
+            if text_start is None:
+                text_start = token.start
+        elif text_start is not None:
+            chunks.append(data[keep_from:text_start])
+            keep_from = token.end
+            text_start = None
+            count += 1
+
+    if not count:
+        return data, 0
+    chunks.append(data[keep_from:])
+    return b"".join(chunks), count
+
+
+def used_resource_names(data):
+    """
+    Find the resources a content stream refers to by name.
+
+    Only the operators in RESOURCE_OPERATORS are tokenized. Their name operand
+    is the last name between the previous token and the operator (Tf's size
+    comes after its font name), and strings, comments and inline images are
+    tokens of their own, so a name inside them is never picked up.
+
+    Args:
+        data (bytes): Decoded content stream.
+    Returns:
+        dict: Resource category ("Font", "XObject", "ExtGState") to the set
+              of names used, without the slash and with #xx escapes decoded.
+    """
+    used = {category: set() for category in RESOURCE_OPERATORS.values()}
+    previous_end = 0
+    for token in tokenize(data, tuple(RESOURCE_OPERATORS)):
+        if token.kind == "keyword":
+            names = _NAME_RE.findall(data, previous_end, token.start)
+            if names:
+                used[RESOURCE_OPERATORS[data[token.start:token.end]]].add(
+                    decode_name(names[-1])
+                )
+        previous_end = token.end
+    return used
+
+
+def decode_name(raw):
+    """
+    Decode the #xx escapes of a PDF name.
+
+    Args:
+        raw (bytes or str): The name, without the leading slash.
+    Returns:
+        str: The name, with each byte read as Latin-1.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("latin-1")
+    if b"#" in raw:
+        raw = _NAME_ESCAPE_RE.sub(lambda m: bytes([int(m.group(1), 16)]), raw)
+    return raw.decode("latin-1")
+
+
+def _shown_strings(data):
+    # Yield the string tokens shown by each text-showing operator, as one list
+    # per operator; the segments of a TJ array come together.
+    strings = []
+    array_strings = None
+    last_array = None
+    last = None
+
+    for token in tokenize(data, TEXT_SHOWING_OPERATORS):
+        kind = token.kind
+        if kind in ("string", "hexstring"):
+            if array_strings is not None:
+                array_strings.append(token)
+            else:
+                strings = [token]
+                last = kind
+            continue
+        if kind == "array_start":
+            array_strings = []
+            continue
+        if kind == "array_end":
+            last_array, array_strings = array_strings, None
+            last = kind
+            continue
+        if kind != "keyword":
+            continue
+
+        operator = data[token.start:token.end]
+        if operator == b"TJ" and last == "array_end":
+            segments = last_array
+        elif operator != b"TJ" and last in ("string", "hexstring"):
+            segments = strings
+        else:
+            segments = None
+        last = None
+
+        if segments:
+            yield segments
+
+
+def iter_text_runs(data):
+    """
+    Yield the text shown by each text-showing operator of a content stream.
+
+    These are the runs remove_text_runs() matches against: the decoded string
+    operands, with the segments of a TJ array joined.
+
+    Args:
+        data (bytes): Decoded content stream.
+    Yields:
+        bytes: One run per operator.
+    """
+    if not _shows_text(data):
+        return
+    for segments in _shown_strings(data):
+        yield b"".join(decode_string(data[t.start:t.end]) for t in segments)
+
+
+def remove_text_runs(data, matcher):
+    """
+    Remove every match of a MultiPatternMatcher from the text shown by a content stream.
+
+    Matching runs on the decoded string operands of the text-showing
+    operators (Tj, TJ, ' and "). The segments of a TJ array are joined
+    first, so a run split by kerning adjustments still matches.
+
+    Args:
+        data (bytes): Decoded content stream.
+        matcher (MultiPatternMatcher): Compiled search terms.
+    Returns:
+        tuple: (new_data, number_of_matches_removed)
+    """
+    if not _shows_text(data):
+        return data, 0
+
+    chunks = []
+    keep_from = 0
+    count = 0
+
+    for segments in _shown_strings(data):
+        values = [decode_string(data[t.start:t.end]) for t in segments]
+        spans = list(matcher.finditer(b"".join(values)))
+        if not spans:
+            continue
+
+        edits = _cut_segments(values, spans)
+        for segment, new_value in zip(segments, edits):
+            if new_value is None:
+                continue
+            chunks.append(data[keep_from:segment.start])
+            chunks.append(encode_string(new_value, segment.kind == "hexstring"))
+            keep_from = segment.end
+        count += len(spans)
+
+    if not count:
+        return data, 0
+    chunks.append(data[keep_from:])
+    return b"".join(chunks), count
+
+
+def _shows_text(data):
+    # A page's content may be split across streams at any token boundary, so
+    # a stream can show text without holding the BT that opened it; only the
+    # text-showing operators themselves tell.
+    return any(operator in data for operator in TEXT_SHOWING_OPERATORS)
+
+
+def _cut_segments(values, spans):
+    # Map the (start, end) spans of the joined string back onto each segment.
+    # Returns the new value of every segment, or None where it is unchanged.
+    edits = []
+    offset = 0
+    span_index = 0
+    for value in values:
+        seg_start, seg_end = offset, offset + len(value)
+        offset = seg_end
+        kept = []
+        pos = seg_start
+        while span_index < len(spans):
+            start, end = spans[span_index]
+            if start >= seg_end:
+                break
+            if end > pos:
+                if start > pos:
+                    kept.append(value[pos - seg_start:start - seg_start])
+                pos = min(end, seg_end)
+            if end > seg_end:
+                break
+            span_index += 1
+        if pos != seg_start or kept:
+            kept.append(value[pos - seg_start:])
+            edits.append(b"".join(kept))
+        else:
+            edits.append(None)
+    return edits
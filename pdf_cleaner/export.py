@@ -0,0 +1,82 @@
+import csv
+import json
+import os
+
+EXPORT_FORMATS = ("ndjson", "json", "csv")
+CSV_FIELDS = ("page_number", "kind", "text", "xref", "width", "height")
+
+
+def export_format(path, default="ndjson"):
+    """
+    Guess the export format from a file name.
+
+    Args:
+        path (str): Output file path, e.g. "contents.csv".
+        default (str): Format used when the extension is not a known one.
+    Returns:
+        str: One of EXPORT_FORMATS.
+    """
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension == "jsonl":
+        return "ndjson"
+    return extension if extension in EXPORT_FORMATS else default
+
+
+def write_page_records(records, output, format="ndjson"):
+    """
+    Stream page records (see PDFCleaner.iter_page_contents()) to a file.
+
+    Records are written as they arrive, so exporting a large document never
+    holds its whole serialized output in memory.
+
+    Args:
+        records (iterable): Page records, e.g. {"page_number": 1, "texts": [...], "images": [...]}.
+        output (str or file): Output file path, or a text file object opened for writing.
+        format (str): "ndjson" (one record per line), "json" (the {"data": [...]}
+                      shape of get_page_contents()) or "csv" (one row per word
+                      or image, with the columns in CSV_FIELDS).
+    Returns:
+        int: Number of page records written.
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {format!r} (use one of {', '.join(EXPORT_FORMATS)})")
+    if isinstance(output, str):
+        # The csv module does its own newline handling.
+        newline = "" if format == "csv" else None
+        with open(output, "w", encoding="utf-8", newline=newline) as f:
+            return write_page_records(records, f, format)
+
+    if format == "csv":
+        return _write_csv(records, output)
+
+    count = 0
+    if format == "json":
+        output.write('{"data": [')
+    for page_dict in records:
+        if format == "json" and count:
+            output.write(", ")
+        output.write(json.dumps(page_dict, ensure_ascii=False))
+        if format == "ndjson":
+            output.write("\n")
+        count += 1
+    if format == "json":
+        output.write("]}\n")
+    return count
+
+
+def _write_csv(records, output):
+    writer = csv.writer(output)
+    writer.writerow(CSV_FIELDS)
+    count = 0
+    for page_dict in records:
+        page_number = page_dict["page_number"]
+        for text in page_dict.get("texts", ()):
+            writer.writerow((page_number, "text", text, "", "", ""))
+        for image in page_dict.get("images", ()):
+            writer.writerow(
+                (page_number, "image", "", image["xref"], image["width"], image["height"])
+            )
+        count += 1
+    return count
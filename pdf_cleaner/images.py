@@ -0,0 +1,355 @@
+import hashlib
+import os
+
+from .lazy import lazy_import
+
+fitz = lazy_import("fitz")
+
+# Default Hamming distance under which two perceptual hashes count as the same image.
+DEFAULT_MAX_DISTANCE = 6
+
+
+def parse_image_sizes(*image_sizes):
+    """
+    Parse image size rules once, up front.
+
+    Args:
+        *image_sizes (str, list or tuple): "WxH" strings such as "100x200",
+                                           or (width, height) pairs such as (100, 200).
+    Returns:
+        list: A list of (width, height) integer tuples.
+    Raises:
+        ValueError: If a size cannot be parsed.
+    """
+    rules = []
+    for image_size in image_sizes:
+        try:
+            if isinstance(image_size, str):
+                tw, th = image_size.lower().split("x")
+            else:
+                tw, th = image_size
+            rules.append((int(tw), int(th)))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid image size: {image_size!r}") from None
+    return rules
+
+
+def size_matches(width, height, rules, tolerance=0):
+    """
+    Check whether a width/height pair matches any of the parsed size rules.
+
+    Args:
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        rules (list): (width, height) tuples returned by parse_image_sizes().
+        tolerance (int): Acceptable pixel deviation (e.g., 3 = ±3 pixels).
+    Returns:
+        bool: True if any rule matches.
+    """
+    for tw, th in rules:
+        if abs(width - tw) <= tolerance and abs(height - th) <= tolerance:
+            return True
+    return False
+
+
+def page_image_records(page):
+    """
+    Read the image records of a single page from the image XObject headers.
+
+    Args:
+        page (fitz.Page): The page to inspect.
+    Returns:
+        list: {"xref", "width", "height"} dicts, in the order the page lists them.
+    """
+    return [
+        {"xref": img[0], "width": img[2], "height": img[3]}
+        for img in page.get_images(full=True)
+    ]
+
+
+def image_fingerprint(doc, xref):
+    """
+    Fingerprint an image from its raw, still-compressed stream bytes.
+
+    Nothing is decoded, so this is cheap, but only byte-identical copies of
+    an image share a fingerprint.
+
+    Args:
+        doc (fitz.Document): The document owning the image.
+        xref (int): xref of the image.
+    Returns:
+        str: 32 hex digits.
+    """
+    return hashlib.blake2b(doc.xref_stream_raw(xref), digest_size=16).hexdigest()
+
+
+def perceptual_hash(doc, xref):
+    """
+    Compute a 64-bit difference hash (dHash) of an image.
+
+    The image is decoded, converted to grayscale and scaled down to 9x8
+    pixels; each bit tells whether a pixel is brighter than its right-hand
+    neighbour. Re-encoded or slightly resized copies get close hashes.
+
+    Args:
+        doc (fitz.Document): The document owning the image.
+        xref (int): xref of the image.
+    Returns:
+        int or None: The hash, or None if the image cannot be decoded.
+    """
+    try:
+        pixmap = fitz.Pixmap(doc, xref)
+        if pixmap.alpha:
+            pixmap = fitz.Pixmap(pixmap, 0)
+        if pixmap.colorspace is not None and pixmap.colorspace.n != 1:
+            pixmap = fitz.Pixmap(fitz.csGRAY, pixmap)
+        small = fitz.Pixmap(pixmap, 9, 8, None)
+    except (RuntimeError, ValueError):
+        return None
+
+    samples, n = small.samples, small.n
+    value = 0
+    for y in range(8):
+        row = samples[y * 9 * n : (y + 1) * 9 * n : n]
+        for x in range(8):
+            value = (value << 1) | (row[x] > row[x + 1])
+    return value
+
+
+def sample_fingerprints(*samples, perceptual=False):
+    """
+    Fingerprint every image in sample PDFs, e.g. PDFs containing only unwanted logos.
+
+    Args:
+        *samples (str or bytes): Paths of sample PDFs, or the PDFs themselves.
+        perceptual (bool): Also compute perceptual hashes.
+    Returns:
+        tuple: (fingerprints, perceptual_hashes), two sets.
+    """
+    fingerprints, hashes = set(), set()
+    for sample in samples:
+        if isinstance(sample, (str, os.PathLike)):
+            doc = fitz.open(sample)
+        else:
+            doc = fitz.open(stream=sample, filetype="pdf")
+        with doc:
+            for page in doc:
+                for img in page.get_images(full=True):
+                    xref = img[0]
+                    fingerprints.add(image_fingerprint(doc, xref))
+                    if perceptual:
+                        value = perceptual_hash(doc, xref)
+                        if value is not None:
+                            hashes.add(value)
+    return fingerprints, hashes
+
+
+class FingerprintMatcher:
+    """
+    Decides whether an image is one of a set of unwanted images.
+
+    Images match on their raw-stream fingerprint. With perceptual=True, an
+    image that doesn't match exactly is also decoded and matches when its
+    perceptual hash is within max_distance bits of a sample's.
+
+    Args:
+        fingerprints (iterable): Fingerprints from image_fingerprint().
+        samples (iterable): Sample PDFs, see sample_fingerprints().
+        perceptual (bool): Enable the perceptual-hash fallback.
+        max_distance (int): Largest Hamming distance counted as a perceptual match.
+    Raises:
+        ValueError: If nothing to match against was given.
+    """
+
+    def __init__(
+        self,
+        fingerprints=(),
+        samples=(),
+        perceptual=False,
+        max_distance=DEFAULT_MAX_DISTANCE,
+    ):
+        self.fingerprints = {fp.lower() for fp in fingerprints}
+        self.perceptual_hashes = set()
+        if samples:
+            found, hashes = sample_fingerprints(*samples, perceptual=perceptual)
+            self.fingerprints |= found
+            self.perceptual_hashes |= hashes
+        if not self.fingerprints:
+            raise ValueError("You must specify at least one fingerprint or sample PDF.")
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+
+    def matches(self, doc, xref, info=None):
+        """
+        Args:
+            doc (fitz.Document): The document owning the image.
+            xref (int): xref of the image.
+            info (ImageInfo): The image's catalog record, used to cache its hashes.
+        Returns:
+            bool: True if the image is one of the unwanted images.
+        """
+        fingerprint = info.get_fingerprint(doc) if info else image_fingerprint(doc, xref)
+        if fingerprint in self.fingerprints:
+            return True
+        if not self.perceptual or not self.perceptual_hashes:
+            return False
+
+        value = info.get_perceptual_hash(doc) if info else perceptual_hash(doc, xref)
+        if value is None:
+            return False
+        return any(
+            bin(value ^ other).count("1") <= self.max_distance
+            for other in self.perceptual_hashes
+        )
+
+
+# Image dictionary keys that no longer apply once the image is blanked.
+_BLANK_IMAGE_DROP_KEYS = (
+    "ColorSpace",
+    "Filter",
+    "DecodeParms",
+    "Decode",
+    "SMask",
+    "SMaskInData",
+    "Mask",
+    "Intent",
+    "Interpolate",
+    "Alternates",
+)
+
+
+def blank_image(doc, xref):
+    """
+    Replace an image XObject in place with a 1x1 fully transparent image mask.
+
+    Unlike Page.delete_image(), nothing is added to any page's resources, so
+    every page using the image ends up identical no matter which page the
+    deletion started from.
+
+    Args:
+        doc (fitz.Document): The document owning the image.
+        xref (int): xref of the image to blank.
+    """
+    doc.update_stream(xref, b"\x80", compress=False)
+    present = set(doc.xref_get_keys(xref))
+    for key in _BLANK_IMAGE_DROP_KEYS:
+        if key in present:
+            doc.xref_set_key(xref, key, "null")
+    doc.xref_set_key(xref, "Width", "1")
+    doc.xref_set_key(xref, "Height", "1")
+    doc.xref_set_key(xref, "BitsPerComponent", "1")
+    doc.xref_set_key(xref, "ImageMask", "true")
+
+
+class ImageInfo:
+    """
+    Header information of one image XObject, shared by every page that uses it.
+    """
+
+    __slots__ = ("xref", "width", "height", "pages", "fingerprint", "perceptual_hash")
+
+    def __init__(self, xref, width, height):
+        self.xref = xref
+        self.width = width
+        self.height = height
+        self.pages = []
+        self.fingerprint = None
+        self.perceptual_hash = None
+
+    def to_dict(self):
+        return {"xref": self.xref, "width": self.width, "height": self.height}
+
+    def get_fingerprint(self, doc):
+        # Computed on first use, then kept for the life of the catalog.
+        if self.fingerprint is None:
+            self.fingerprint = image_fingerprint(doc, self.xref)
+        return self.fingerprint
+
+    def get_perceptual_hash(self, doc):
+        if self.perceptual_hash is None:
+            self.perceptual_hash = perceptual_hash(doc, self.xref)
+        return self.perceptual_hash
+
+
+class ImageCatalog:
+    """
+    Per-document image catalog built in a single pass over all pages.
+
+    Image dimensions are taken from the /Width and /Height entries of the
+    image XObject dictionaries, so no image is ever decoded. Every xref is
+    stored once, together with the 0-based indexes of the pages using it.
+
+    Args:
+        doc (fitz.Document): The document to catalog.
+        pages (iterable): The pages of doc, in order. Defaults to iterating doc.
+    """
+
+    def __init__(self, doc, pages=None):
+        self.doc = doc
+        self.images = {}
+        self.page_images = []
+
+        for page in doc if pages is None else pages:
+            xrefs = []
+            for img in page.get_images(full=True):
+                xref, width, height = img[0], img[2], img[3]
+                info = self.images.get(xref)
+                if info is None:
+                    info = self.images[xref] = ImageInfo(xref, width, height)
+                if not info.pages or info.pages[-1] != page.number:
+                    info.pages.append(page.number)
+                xrefs.append(xref)
+            self.page_images.append(xrefs)
+
+    def __len__(self):
+        return len(self.images)
+
+    def __iter__(self):
+        return iter(self.images.values())
+
+    def get(self, xref):
+        return self.images.get(xref)
+
+    def images_on_page(self, page_index):
+        """
+        Return the ImageInfo records of a page, in the order the page lists them.
+
+        Args:
+            page_index (int): 0-based page index.
+        Returns:
+            list: ImageInfo records.
+        """
+        return [self.images[xref] for xref in self.page_images[page_index]]
+
+    def find_by_size(self, rules, tolerance=0):
+        """
+        Return all images whose dimensions match any of the size rules.
+
+        Args:
+            rules (list): (width, height) tuples returned by parse_image_sizes().
+            tolerance (int): Acceptable pixel deviation (e.g., 3 = ±3 pixels).
+        Returns:
+            list: Matching ImageInfo records, one per xref.
+        """
+        return [
+            info
+            for info in self.images.values()
+            if size_matches(info.width, info.height, rules, tolerance)
+        ]
+
+    def find_by_fingerprint(self, matcher):
+        """
+        Return all images matched by a FingerprintMatcher.
+
+        Each xref is hashed once, however many pages use it.
+
+        Args:
+            matcher (FingerprintMatcher): The images to look for.
+        Returns:
+            list: Matching ImageInfo records, one per xref.
+        """
+        return [
+            info
+            for info in self.images.values()
+            if matcher.matches(self.doc, info.xref, info)
+        ]
@@ -0,0 +1,33 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """
+    Import a module on first attribute access instead of right away.
+
+    Keeps heavy dependencies such as PyMuPDF out of the import time of
+    pdf_cleaner, so short-lived processes that never touch them (or touch
+    them late) start faster.
+
+    Args:
+        name (str): Absolute module name, e.g. "fitz".
+    Returns:
+        module: The module if it is already imported, otherwise a lazy module
+                that finishes importing itself when first used.
+    Raises:
+        ModuleNotFoundError: If the module cannot be found.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,82 @@
+import re
+
+
+class MultiPatternMatcher:
+    """
+    Match many byte strings in a single pass over the data.
+
+    The search terms are merged into a trie which is then compiled into one
+    regular expression (Aho–Corasick style: the regex engine walks the trie,
+    so the cost per position does not grow with the number of terms). When
+    several terms match at the same position, the longest one wins.
+    """
+
+    def __init__(self, *terms):
+        self.terms = []
+        trie = {}
+        for term in terms:
+            if isinstance(term, str):
+                term = term.encode("utf-8")
+            if not term or term in self.terms:
+                continue
+            self.terms.append(term)
+            node = trie
+            for byte in term:
+                node = node.setdefault(byte, {})
+            node[None] = True
+
+        self.pattern = re.compile(_trie_to_regex(trie)) if self.terms else None
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def finditer(self, data):
+        """
+        Yield (start, end) spans of non-overlapping matches, left to right.
+
+        Args:
+            data (bytes): The data to search.
+        """
+        if self.pattern is None:
+            return
+        for match in self.pattern.finditer(data):
+            yield match.span()
+
+    def subn(self, data, replacement=b""):
+        """
+        Replace every match in a single pass.
+
+        Args:
+            data (bytes): The data to search.
+            replacement (bytes): Replacement for each match.
+        Returns:
+            tuple: (new_data, number_of_replacements)
+        """
+        if self.pattern is None:
+            return data, 0
+        return self.pattern.subn(replacement, data)
+
+
+def _trie_to_regex(node):
+    prefix = b""
+    # Collapse single-child chains into a literal run to keep the pattern small.
+    while len(node) == 1 and None not in node:
+        (byte, node), = node.items()
+        prefix += re.escape(bytes([byte]))
+
+    branches = [
+        re.escape(bytes([byte])) + _trie_to_regex(child)
+        for byte, child in sorted(
+            (k, v) for k, v in node.items() if k is not None
+        )
+    ]
+    if not branches:
+        return prefix
+
+    body = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+    if None in node:
+        # Greedy optional group: prefer the longer term, fall back to the shorter one.
+        if len(branches) == 1:
+            body = b"(?:" + body + b")"
+        body += b"?"
+    return prefix + body
@@ -0,0 +1,117 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+class OperationRecord:
+    """
+    Timing and counters of one PDFCleaner operation.
+
+    Attributes:
+        operation (str): Operation name, e.g. "remove_texts" or "save".
+        seconds (float): Wall time of the operation.
+        counters (dict): Numeric counters, e.g. {"pages_visited": 10, "streams_rewritten": 3}.
+        details (dict): Other facts about the run, e.g. {"profile": "balanced"}.
+    """
+
+    __slots__ = ("operation", "seconds", "counters", "details")
+
+    def __init__(self, operation, seconds=0.0, counters=None, details=None):
+        self.operation = operation
+        self.seconds = seconds
+        self.counters = dict(counters or {})
+        self.details = dict(details or {})
+
+    def add(self, counter, amount=1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def to_dict(self):
+        record = {"operation": self.operation, "seconds": self.seconds, "counters": self.counters}
+        if self.details:
+            record["details"] = self.details
+        return record
+
+    @classmethod
+    def from_dict(cls, record):
+        return cls(
+            record["operation"], record["seconds"], record["counters"], record.get("details")
+        )
+
+    def format(self):
+        """
+        Returns:
+            str: One line, e.g. "remove_texts: 1.20s (pages_visited=10, streams_rewritten=3)".
+        """
+        facts = [f"{name}={value:,}" for name, value in self.counters.items()]
+        facts.extend(f"{name}={value}" for name, value in self.details.items())
+        suffix = f" ({', '.join(facts)})" if facts else ""
+        return f"{self.operation}: {self.seconds:.2f}s{suffix}"
+
+
+class CleaningMetrics:
+    """
+    Collects an OperationRecord for every completed PDFCleaner operation.
+
+    Args:
+        callback (callable): Optional callback(record), called with each
+                             OperationRecord as soon as its operation completes.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.records = []
+
+    @contextmanager
+    def measure(self, operation, **details):
+        """
+        Time the enclosed block and record it as one operation.
+
+        Yields:
+            OperationRecord: The record, for the block to add counters to.
+                             It is only kept if the block completes.
+        """
+        record = OperationRecord(operation, details=details)
+        started = time.perf_counter()
+        yield record
+        record.seconds = time.perf_counter() - started
+        self.add(record)
+
+    def add(self, record):
+        if isinstance(record, dict):
+            record = OperationRecord.from_dict(record)
+        self.records.append(record)
+        if self.callback:
+            self.callback(record)
+
+    def clear(self):
+        self.records = []
+
+    def totals(self):
+        """
+        Returns:
+            dict: Total seconds and the sum of each counter over all records.
+        """
+        totals = {"seconds": 0.0}
+        for record in self.records:
+            totals["seconds"] += record.seconds
+            for name, value in record.counters.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def to_dict(self):
+        return {
+            "operations": [record.to_dict() for record in self.records],
+            "totals": self.totals(),
+        }
+
+    def dump(self, output):
+        """
+        Write the metrics as JSON.
+
+        Args:
+            output (str or file): Output file path, or a text file object opened for writing.
+        """
+        if isinstance(output, str):
+            with open(output, "w", encoding="utf-8") as f:
+                return self.dump(f)
+        json.dump(self.to_dict(), output, indent=2)
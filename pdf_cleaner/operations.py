@@ -0,0 +1,349 @@
+import os
+import shutil
+import time
+
+from .cleaner import DEFAULT_SAVE_PROFILE, PDFCleaner
+from .images import DEFAULT_MAX_DISTANCE
+from .pages import PageSelection
+from .recompress import DEFAULT_JPEG_QUALITY, DEFAULT_TARGET_DPI, RecompressPolicy
+from .redact import RedactionRules
+from .plan import CleaningPlan
+
+# Operations run in this order, the same order the GUI applies them.
+OPERATION_ORDER = (
+    "remove_texts",
+    "redact_texts",
+    "remove_images",
+    "remove_images_by_fingerprint",
+    "recompress_images",
+    "rotate_pages",
+    "remove_pages",
+    "remove_last_page",
+    "prune_resources",
+)
+
+# Operations that work page by page and can run on any subset of pages.
+PAGE_OPERATIONS = (
+    "remove_texts",
+    "redact_texts",
+    "remove_images",
+    "remove_images_by_fingerprint",
+)
+# Operations that change the page list or its layout, or need every page at
+# once: an image's resolution is the lowest over all the surviving pages
+# showing it, so recompression can't be split by page range.
+DOCUMENT_OPERATIONS = (
+    "recompress_images",
+    "rotate_pages",
+    "remove_pages",
+    "remove_last_page",
+    "prune_resources",
+)
+
+
+def normalize_operations(operations):
+    """
+    Validate an operation spec and fill in defaults.
+
+    An operation spec is a JSON-compatible dict keyed by PDFCleaner method name, e.g.
+
+        {
+            "remove_texts": {"texts": ["Confidential"]},   # empty list removes all text
+            "redact_texts": {
+                "terms": ["Top Secret"],
+                "patterns": ["INV-\\\\d+"],           # regular expressions
+                "regions": [[0, 0, 595, 60]],        # x0, y0, x1, y1: e.g. a header band
+                "ignore_case": true,
+                "fill": null                         # or an RGB colour, e.g. [0, 0, 0]
+            },
+            "remove_images": {"sizes": ["100x100"], "tolerance": 2},
+            "remove_images_by_fingerprint": {
+                "fingerprints": ["9f86d081884c7d659a2feaa0c55ad015"],
+                "samples": ["logo.pdf"],     # every image in these PDFs
+                "perceptual": false,         # also match re-encoded copies
+                "max_distance": 6
+            },
+            "recompress_images": {
+                "target_dpi": 150,
+                "max_dpi": 225,              # downsample above this; 1.5 x target_dpi if omitted
+                "min_bytes": 500000,         # also re-encode images this large; optional
+                "format": "jpeg",            # "jpeg", "flate" or "auto"
+                "quality": 75,
+                "workers": 1
+            },
+            "rotate_pages": {"pages": [1, 3], "angle": 180},
+            "remove_pages": {"pages": "2,4,1001-9000,last 2"},
+            "remove_last_page": true,
+            "prune_resources": true          # drop fonts and XObjects no page uses any more
+        }
+
+    Pages are lists of page numbers and/or page-range expressions, or a
+    single expression (see pdf_cleaner.pages.PageSelection); they are
+    normalized to one expression string.
+
+    Args:
+        operations (dict): The operation spec.
+    Returns:
+        dict: The normalized spec, containing only the requested operations.
+    Raises:
+        ValueError: If the spec isn't an object, or contains an unknown
+                    operation, a missing or out-of-range value, a string
+                    where a list is expected, or an invalid page range.
+    """
+    if not isinstance(operations, dict):
+        raise ValueError("The operation spec must be an object.")
+    unknown = set(operations) - set(OPERATION_ORDER)
+    if unknown:
+        raise ValueError(f"Unknown operation(s): {', '.join(sorted(unknown))}")
+
+    spec = {}
+    for name in OPERATION_ORDER:
+        value = operations.get(name)
+        if value is None or value is False:
+            continue
+
+        if name == "remove_texts":
+            spec[name] = {"texts": _list(name, _options(name, value), "texts")}
+        elif name == "redact_texts":
+            options = _options(name, value)
+            spec[name] = {
+                "terms": _list(name, options, "terms"),
+                "patterns": _list(name, options, "patterns"),
+                "regions": [list(region) for region in _list(name, options, "regions")],
+                "ignore_case": bool(options.get("ignore_case", False)),
+                "fill": _list(name, options, "fill") if options.get("fill") else None,
+            }
+            # Fail here rather than halfway through a batch.
+            RedactionRules(
+                spec[name]["terms"], spec[name]["patterns"], spec[name]["regions"]
+            )
+        elif name == "remove_images":
+            options = _options(name, value)
+            if not options.get("sizes"):
+                raise ValueError("remove_images needs at least one size.")
+            spec[name] = {
+                "sizes": _list(name, options, "sizes"),
+                "tolerance": _non_negative(name, options, "tolerance", 0),
+            }
+        elif name == "remove_images_by_fingerprint":
+            options = _options(name, value)
+            if not options.get("fingerprints") and not options.get("samples"):
+                raise ValueError(
+                    "remove_images_by_fingerprint needs a fingerprint or a sample PDF."
+                )
+            spec[name] = {
+                "fingerprints": _list(name, options, "fingerprints"),
+                "samples": _list(name, options, "samples"),
+                "perceptual": bool(options.get("perceptual", False)),
+                "max_distance": _non_negative(
+                    name, options, "max_distance", DEFAULT_MAX_DISTANCE
+                ),
+            }
+        elif name == "recompress_images":
+            options = _options(name, value)
+            spec[name] = {
+                "target_dpi": int(options.get("target_dpi", DEFAULT_TARGET_DPI)),
+                "max_dpi": _optional_int(options.get("max_dpi")),
+                "min_bytes": _optional_int(options.get("min_bytes")),
+                "format": options.get("format", "jpeg"),
+                "quality": int(options.get("quality", DEFAULT_JPEG_QUALITY)),
+                "workers": int(options.get("workers", 1)),
+            }
+            # Fail here rather than halfway through a batch.
+            RecompressPolicy(
+                *(spec[name][key] for key in RecompressPolicy.__slots__)
+            )
+        elif name == "rotate_pages":
+            options = _options(name, value)
+            if not options.get("pages"):
+                raise ValueError("rotate_pages needs at least one page.")
+            spec[name] = {
+                "pages": _page_expression(options["pages"]),
+                "angle": int(options.get("angle", 180)),
+            }
+            if spec[name]["angle"] not in (0, 90, 180, 270):
+                raise ValueError("rotate_pages angle must be 0, 90, 180 or 270.")
+        elif name == "remove_pages":
+            options = _options(name, value)
+            if not options.get("pages"):
+                raise ValueError("remove_pages needs at least one page.")
+            spec[name] = {"pages": _page_expression(options["pages"])}
+        else:
+            spec[name] = True
+    return spec
+
+
+def _options(name, value):
+    if value is True:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"Options for {name} must be an object.")
+    return value
+
+
+def _list(name, options, key):
+    # list() would split a string into single characters.
+    value = options.get(key, [])
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(f"{name} {key} must be a list.")
+    return list(value)
+
+
+def _non_negative(name, options, key, default):
+    value = int(options.get(key, default))
+    if value < 0:
+        raise ValueError(f"{name} {key} can't be negative.")
+    return value
+
+
+def _optional_int(value):
+    return None if value is None else int(value)
+
+
+def _page_expression(pages):
+    if isinstance(pages, (str, int)):
+        pages = [pages]
+    return str(PageSelection(*pages))
+
+
+def apply_operations(cleaner, operations):
+    """
+    Apply an operation spec to an open PDFCleaner, as one fused CleaningPlan.
+
+    Args:
+        cleaner (PDFCleaner): The document to clean.
+        operations (dict): Operation spec, see normalize_operations().
+    """
+    cleaner.apply_plan(CleaningPlan.from_operations(operations))
+
+
+def preview_operations(cleaner, operations):
+    """
+    Dry run of an operation spec on an open PDFCleaner; nothing is changed.
+
+    Args:
+        cleaner (PDFCleaner): The document to inspect.
+        operations (dict): Operation spec, see normalize_operations().
+    Returns:
+        dict: The preview from PDFCleaner.preview_plan().
+    """
+    return cleaner.preview_plan(CleaningPlan.from_operations(operations))
+
+
+def preview_file(input_pdf_path, operations):
+    """
+    Open a PDF and preview an operation spec on it.
+
+    Args:
+        input_pdf_path (str): Path of the PDF to inspect.
+        operations (dict): Operation spec, see normalize_operations().
+    Returns:
+        dict: The preview from PDFCleaner.preview_plan().
+    """
+    cleaner = PDFCleaner(input_pdf_path)
+    try:
+        return preview_operations(cleaner, operations)
+    finally:
+        cleaner.close()
+
+
+def clean_file(
+    input_pdf_path,
+    output_pdf_path,
+    operations,
+    save_profile=DEFAULT_SAVE_PROFILE,
+    cache=None,
+):
+    """
+    Open a PDF, apply an operation spec and save the result.
+
+    Args:
+        input_pdf_path (str): Path of the PDF to clean.
+        output_pdf_path (str): Path where the cleaned PDF will be saved.
+        operations (dict): Operation spec, see normalize_operations().
+        save_profile (str): Save profile, see PDFCleaner.save().
+        cache (ResultCache): Optional result cache. On a hit the cached output
+                             is copied without opening the input.
+    Returns:
+        dict: The save report from PDFCleaner.save(), plus the cleaner's
+              metrics under "metrics" and whether it came from the cache
+              under "cached".
+    """
+    key = cache.key(input_pdf_path, operations, save_profile) if cache else None
+    if key:
+        report = copy_cached_result(cache, key, output_pdf_path, save_profile)
+        if report:
+            return report
+
+    cleaner = PDFCleaner(input_pdf_path)
+    try:
+        apply_operations(cleaner, operations)
+        report = cleaner.save(output_pdf_path, profile=save_profile)
+        report = dict(report, metrics=cleaner.metrics.to_dict(), cached=False)
+    finally:
+        cleaner.close()
+
+    if key:
+        cache.put(key, output_pdf_path)
+    return report
+
+
+def copy_cached_result(cache, key, output_pdf_path, save_profile):
+    """
+    Copy a cached result to output_pdf_path.
+
+    Args:
+        cache (ResultCache): The cache.
+        key (str): Key from cache.key().
+        output_pdf_path (str): Where to write the PDF.
+        save_profile (str): Save profile the result was saved with.
+    Returns:
+        dict or None: A report shaped like clean_file()'s, or None on a miss.
+    """
+    started = time.perf_counter()
+    cached_path = cache.get(key)
+    if cached_path is None:
+        return None
+    try:
+        shutil.copyfile(cached_path, output_pdf_path)
+    except FileNotFoundError:
+        # Evicted by another process in between.
+        return None
+    return {
+        "profile": save_profile,
+        "path": output_pdf_path,
+        "size": os.path.getsize(output_pdf_path),
+        "seconds": time.perf_counter() - started,
+        "metrics": {"operations": [], "totals": {"seconds": 0.0}},
+        "cached": True,
+    }
+
+
+def clean_bytes(data, operations, save_profile=DEFAULT_SAVE_PROFILE, cache=None):
+    """
+    Clean a PDF held in memory and return the cleaned PDF.
+
+    Args:
+        data (bytes): The PDF to clean.
+        operations (dict): Operation spec, see normalize_operations().
+        save_profile (str): Save profile, see PDFCleaner.save().
+        cache (ResultCache): Optional result cache.
+    Returns:
+        bytes: The cleaned PDF.
+    """
+    key = cache.key(data, operations, save_profile) if cache else None
+    if key:
+        result = cache.get_bytes(key)
+        if result is not None:
+            return result
+
+    cleaner = PDFCleaner(data)
+    try:
+        apply_operations(cleaner, operations)
+        result = cleaner.save(profile=save_profile)
+    finally:
+        cleaner.close()
+
+    if key:
+        cache.put(key, result)
+    return result
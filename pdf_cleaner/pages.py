@@ -0,0 +1,366 @@
+import bisect
+import re
+
+# Keeping few pages is cheaper with Document.select(), which costs about as
+# much per kept page as delete_pages() costs for three deleted pages.
+SELECT_RATIO = 3
+
+_RANGE_RE = re.compile(r"^(-?\d+)(?:\s*(-)\s*(-?\d+)?)?(?:\s*:\s*(odd|even))?$")
+_LAST_RE = re.compile(r"^last\s+(\d+)$")
+
+
+# Which indexes a run covers within its span: the even ones, the odd ones or both.
+_EVEN = 1
+_ODD = 2
+_BOTH = _EVEN | _ODD
+
+
+class PageSet:
+    """
+    Set of 0-based page indexes, stored as sorted, disjoint (start, stop, step) runs.
+
+    A run is range(start, stop, step) with a step of 1 or 2, so "pages
+    1001-9000" or "odd" stays a few numbers from parsing to deletion,
+    however many pages it covers.
+
+    Args:
+        runs (iterable): (start, stop) or (start, stop, step) ranges, in any
+                         order; overlapping and adjacent runs are merged.
+    """
+
+    __slots__ = ("runs", "_starts", "_before", "_length")
+
+    def __init__(self, runs=()):
+        pieces = []
+        for run in runs:
+            start, stop, step = run if len(run) == 3 else (*run, 1)
+            if step in (1, 2):
+                pieces.append((start, stop, step))
+            else:
+                pieces.extend((i, i + 1, 1) for i in range(start, stop, step))
+        self._set_runs(_combine(pieces, (), lambda a, b: a))
+
+    def _set_runs(self, runs):
+        self.runs = tuple(runs)
+        self._starts = [start for start, _, _ in self.runs]
+        # _before[i]: pages in the runs ahead of run i.
+        self._before = [0]
+        for run in self.runs:
+            self._before.append(self._before[-1] + len(range(*run)))
+        self._length = self._before[-1]
+
+    @classmethod
+    def _from_runs(cls, runs):
+        # runs are already sorted, disjoint and merged.
+        page_set = cls.__new__(cls)
+        page_set._set_runs(runs)
+        return page_set
+
+    @classmethod
+    def from_indexes(cls, indexes):
+        return cls((i, i + 1) for i in indexes)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for run in self.runs:
+            yield from range(*run)
+
+    def __reversed__(self):
+        for run in reversed(self.runs):
+            yield from reversed(range(*run))
+
+    def __contains__(self, index):
+        position = bisect.bisect_right(self._starts, index) - 1
+        return position >= 0 and index in range(*self.runs[position])
+
+    def count_before(self, index):
+        """
+        Returns:
+            int: Number of pages in the set that come before index.
+        """
+        position = bisect.bisect_right(self._starts, index) - 1
+        if position < 0:
+            return 0
+        start, stop, step = self.runs[position]
+        return self._before[position] + len(range(start, min(stop, index), step))
+
+    def __eq__(self, other):
+        # The same pages can be split into runs in more than one way.
+        return isinstance(other, PageSet) and len(self) == len(other) and not self - other
+
+    def __hash__(self):
+        if not self.runs:
+            return hash(())
+        return hash((len(self), self.runs[0][0], next(reversed(self))))
+
+    def __or__(self, other):
+        return PageSet._from_runs(_combine(self.runs, other.runs, lambda a, b: a | b))
+
+    def __sub__(self, other):
+        return PageSet._from_runs(_combine(self.runs, other.runs, lambda a, b: a & ~b))
+
+    def __and__(self, other):
+        return PageSet._from_runs(_combine(self.runs, other.runs, lambda a, b: a & b))
+
+    def complement(self, page_count):
+        """
+        Returns:
+            PageSet: The pages of a page_count-page document that are not in this set.
+        """
+        return PageSet._from_runs(
+            _combine(((0, page_count, 1),), self.runs, lambda a, b: a & ~b)
+        )
+
+    def __repr__(self):
+        return f"PageSet({self.to_expression()!r})"
+
+    def to_expression(self):
+        """
+        Returns:
+            str: The set as a 1-based page-range expression, e.g. "1-500,700,801-899:odd".
+        """
+        terms = []
+        for start, stop, step in self.runs:
+            last = range(start, stop, step)[-1]
+            if start == last:
+                terms.append(str(start + 1))
+            elif step == 1:
+                terms.append(f"{start + 1}-{last + 1}")
+            else:
+                terms.append(f"{start + 1}-{last + 1}:{'odd' if start % 2 == 0 else 'even'}")
+        return ",".join(terms)
+
+
+def _combine(a, b, operation):
+    # Sweep two lists of runs and apply operation to the _EVEN/_ODD masks
+    # each covers between consecutive run boundaries. Returns sorted,
+    # disjoint, merged runs.
+    events = []
+    for side, runs in ((0, a), (1, b)):
+        for start, stop, step in runs:
+            if start < stop:
+                bits = _BOTH if step == 1 else (_EVEN if start % 2 == 0 else _ODD)
+                events.append((start, side, bits, 1))
+                events.append((stop, side, bits, -1))
+    events.sort()
+
+    counts = [{_BOTH: 0, _EVEN: 0, _ODD: 0}, {_BOTH: 0, _EVEN: 0, _ODD: 0}]
+    result = []
+    previous = None
+    for position, side, bits, delta in events:
+        if previous is not None and position > previous:
+            masks = [_mask(side_counts) for side_counts in counts]
+            _append_run(result, previous, position, operation(*masks) & _BOTH)
+        counts[side][bits] += delta
+        previous = position
+    return result
+
+
+def _mask(counts):
+    mask = 0
+    for bits, count in counts.items():
+        if count:
+            mask |= bits
+    return mask
+
+
+def _append_run(runs, start, stop, mask):
+    # Add the indexes of [start, stop) that mask covers, merging with the last run.
+    if not mask:
+        return
+    if mask == _BOTH:
+        run = (start, stop, 1)
+    else:
+        first = start + (start % 2 != (0 if mask == _EVEN else 1))
+        if first >= stop:
+            return
+        last = first + (stop - 1 - first) // 2 * 2
+        run = (first, first + 1, 1) if first == last else (first, last + 1, 2)
+    if runs:
+        previous_start, previous_stop, previous_step = runs[-1]
+        previous_last = range(*runs[-1])[-1]
+        if run[2] == 1 and previous_step == 1 and previous_stop == run[0]:
+            runs[-1] = (previous_start, run[1], 1)
+            return
+        single = previous_last == previous_start
+        if (
+            (previous_step == 2 or single)
+            and (run[2] == 2 or run[1] - run[0] == 1)
+            and run[0] == previous_last + 2
+        ):
+            runs[-1] = (previous_start, range(*run)[-1] + 1, 2)
+            return
+    runs.append(run)
+
+
+class PageSelection:
+    """
+    Parsed page-range expression, resolved against a page count with resolve().
+
+    Terms are separated by commas:
+
+        7        page 7
+        1-500    pages 1 to 500
+        10-      page 10 to the last page
+        -1       the last page; -3 is the third page from the end
+        -5--1    the last five pages, same as "last 5"
+        last 5   the last five pages
+        odd      the odd pages; "even" for even pages
+        1-99:odd the odd pages of a range
+        all      every page
+
+    Args:
+        *pages (int, str, range, PageSelection or PageSet): 1-based page
+            numbers, expressions, Python ranges of page numbers, and parsed
+            selections, in any mix, e.g. PageSelection(1, 3, "10-20,-1").
+    Raises:
+        ValueError: If an expression can't be parsed.
+    """
+
+    __slots__ = ("terms",)
+
+    def __init__(self, *pages):
+        terms = []
+        for item in pages:
+            if isinstance(item, PageSelection):
+                terms.extend(item.terms)
+            elif isinstance(item, PageSet):
+                for start, stop, step in item.runs:
+                    last = range(start, stop, step)[-1]
+                    parity = None if step == 1 else "odd" if start % 2 == 0 else "even"
+                    terms.append((start + 1, last + 1, parity))
+            elif isinstance(item, range):
+                if item.step != 1:
+                    raise ValueError("Page ranges must have a step of 1.")
+                if len(item):
+                    terms.append((item.start, item.stop - 1, None))
+            elif isinstance(item, str):
+                # Empty terms, as in "1,3,", are skipped.
+                terms.extend(_parse_term(term) for term in item.split(",") if term.strip())
+            else:
+                page = int(item)
+                terms.append((page, page, None))
+        self.terms = tuple(terms)
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def __eq__(self, other):
+        return isinstance(other, PageSelection) and self.terms == other.terms
+
+    def __hash__(self):
+        return hash(self.terms)
+
+    def __repr__(self):
+        return f"PageSelection({str(self)!r})"
+
+    def __str__(self):
+        return ",".join(_format_term(*term) for term in self.terms)
+
+    def resolve(self, page_count):
+        """
+        Work out which pages of a document the selection covers.
+
+        Pages outside the document are ignored.
+
+        Args:
+            page_count (int): Number of pages in the document.
+        Returns:
+            PageSet: The selected 0-based page indexes.
+        """
+        runs = []
+        for first, last, parity in self.terms:
+            # Negative numbers count from the end; page 0 doesn't exist.
+            start = first - 1 if first > 0 else page_count + first if first < 0 else 0
+            stop = page_count if last is None else last if last > 0 else page_count + last + 1
+            start, stop = max(start, 0), min(stop, page_count)
+            if last == 0 or start >= stop:
+                continue
+            if parity is None:
+                runs.append((start, stop))
+            else:
+                # Odd page numbers are even indexes.
+                offset = 0 if parity == "odd" else 1
+                runs.append((start + (offset - start) % 2, stop, 2))
+        return PageSet(runs)
+
+
+def _parse_term(term):
+    text = term.strip().lower()
+    if text == "all":
+        return (1, None, None)
+    if text in ("odd", "even"):
+        return (1, None, text)
+    match = _LAST_RE.match(text)
+    if match:
+        count = int(match.group(1))
+        return (-count, -1, None) if count else (0, 0, None)
+    match = _RANGE_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid page range: {term.strip()!r}")
+    first, dash, last, parity = match.groups()
+    first = int(first)
+    if dash is None:
+        last = first
+    elif last is not None:
+        last = int(last)
+        if (first > 0) == (last > 0) and first > last:
+            raise ValueError(f"Invalid page range: {term.strip()!r} (it ends before it starts)")
+    return (first, last, parity)
+
+
+def _format_term(first, last, parity):
+    if first == 1 and last is None:
+        return "all" if parity is None else parity
+    if first == last:
+        text = str(first)
+    elif first < 0 and last == -1 and parity is None:
+        return f"last {-first}"
+    elif last is None:
+        text = f"{first}-"
+    else:
+        text = f"{first}-{last}"
+    return f"{text}:{parity}" if parity else text
+
+
+def select_pages(pages, page_count):
+    """
+    Resolve the page arguments of a PDFCleaner method.
+
+    Args:
+        pages (tuple): Page numbers, expressions or selections, see PageSelection.
+        page_count (int): Number of pages in the document.
+    Returns:
+        PageSet: The selected 0-based page indexes.
+    """
+    if len(pages) == 1 and isinstance(pages[0], PageSet):
+        return pages[0] & PageSet([(0, page_count)])
+    return PageSelection(*pages).resolve(page_count)
+
+
+def delete_page_set(doc, pages):
+    """
+    Delete a set of pages with as few PyMuPDF calls as possible.
+
+    Each page deleted by delete_pages() costs time in proportion to the size
+    of the document, so when most pages go, the survivors are kept with
+    select() instead.
+
+    Args:
+        doc (fitz.Document): The document.
+        pages (PageSet): 0-based indexes of the pages to delete.
+    """
+    if not pages:
+        return
+    page_count = doc.page_count
+    survivors = pages.complement(page_count)
+    if len(pages.runs) == 1 and pages.runs[0][2] == 1:
+        start, stop, _ = pages.runs[0]
+        doc.delete_pages(start, min(stop, page_count) - 1)
+    elif survivors and len(survivors) * SELECT_RATIO < len(pages):
+        # select() refuses an empty page list.
+        doc.select(list(survivors))
+    else:
+        doc.delete_pages(list(pages))
@@ -0,0 +1,314 @@
+import hashlib
+import os
+import re
+from concurrent import futures
+
+from .cleaner import PDFCleaner, fitz
+from .operations import (
+    DOCUMENT_OPERATIONS,
+    PAGE_OPERATIONS,
+    apply_operations,
+    normalize_operations,
+)
+from .resources import _dict_entries, _resource_locations
+
+_REFERENCE = re.compile(rb"(\d+) 0 R")
+# Guards the walks of field trees and object references against cycles.
+_MAX_DEPTH = 32
+
+
+def split_pages(page_count, shard_count):
+    """
+    Split a page range into contiguous (start, stop) shards of near-equal size.
+
+    Args:
+        page_count (int): Number of pages.
+        shard_count (int): Desired number of shards.
+    Returns:
+        list: 0-based, half-open (start, stop) ranges covering every page once.
+    """
+    shard_count = max(1, min(shard_count, page_count))
+    size, extra = divmod(page_count, shard_count)
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        stop = start + size + (1 if i < extra else 0)
+        shards.append((start, stop))
+        start = stop
+    return shards
+
+
+def clean_shard(input_pdf_path, start, stop, operations, with_metrics=False, output_path=None):
+    """
+    Apply the page operations to pages [start, stop) of a PDF.
+
+    Args:
+        input_pdf_path (str): Path of the PDF to clean.
+        start (int): First page of the shard, 0-based.
+        stop (int): Page after the last page of the shard.
+        operations (dict): Operation spec; only the page operations are applied.
+        with_metrics (bool): Also return the shard's OperationRecord dicts.
+        output_path (str): Save the shard to this file instead of returning its bytes.
+    Returns:
+        bytes or str: The cleaned shard (or output_path), or (data, records) if with_metrics is True.
+    """
+    cleaner = PDFCleaner(input_pdf_path)
+    try:
+        # select() drops the catalog's AcroForm, and with it every widget
+        # insert_pdf() would copy, so it is put back for the shard's fields.
+        acroform = cleaner.doc.xref_get_key(cleaner.doc.pdf_catalog(), "AcroForm")
+        cleaner.doc.select(range(start, stop))
+        if acroform[0] in ("xref", "dict"):
+            _restore_form(cleaner.doc, acroform[1])
+        apply_operations(
+            cleaner,
+            {name: operations[name] for name in PAGE_OPERATIONS if name in operations},
+        )
+        # Objects only used by pages outside the shard are dropped before the hand-off.
+        if output_path:
+            cleaner.doc.save(output_path, garbage=1)
+            data = output_path
+        else:
+            data = cleaner.doc.tobytes(garbage=1)
+        if not with_metrics:
+            return data
+        records = [record.to_dict() for record in cleaner.metrics.records]
+        for record in records:
+            record.setdefault("details", {})["pages"] = [start + 1, stop]
+        return data, records
+    finally:
+        cleaner.close()
+
+
+def clean_parallel(input_pdf_path, operations, workers=None, shards=None):
+    """
+    Clean one large PDF by splitting its pages across worker processes.
+
+    Text and image removal run on each shard, and the other operations on the
+    stitched document, so the result matches a serial run.
+
+    Args:
+        input_pdf_path (str): Path of the PDF to clean.
+        operations (dict): Operation spec, see normalize_operations().
+        workers (int): Number of worker processes (default: number of CPUs).
+        shards (int): Number of page ranges (default: two per worker).
+    Returns:
+        PDFCleaner: A cleaner holding the result, ready to save().
+    """
+    spec = normalize_operations(operations)
+    workers = workers or os.cpu_count() or 1
+    page_count, metadata, toc, page_labels = read_source_info(input_pdf_path)
+
+    ranges = split_pages(page_count, shards or workers * 2)
+    shard_records = []
+
+    def cleaned_shards(pool):
+        jobs = [
+            pool.submit(clean_shard, input_pdf_path, start, stop, spec, True)
+            for start, stop in ranges
+        ]
+        for future in jobs:
+            data, records = future.result()
+            shard_records.extend(records)
+            yield data
+
+    with futures.ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        doc = stitch_shards(cleaned_shards(pool), metadata, toc, page_labels)
+    return finish_stitched(doc, input_pdf_path, spec, shard_records)
+
+
+def read_source_info(input_pdf_path):
+    """
+    Returns:
+        tuple: (page_count, metadata, toc, page_labels) of a PDF, for stitch_shards().
+    """
+    source = fitz.open(input_pdf_path)
+    try:
+        return (
+            len(source),
+            source.metadata,
+            source.get_toc(simple=False),
+            source.get_page_labels(),
+        )
+    finally:
+        source.close()
+
+
+def stitch_shards(shards, metadata, toc, page_labels=()):
+    """
+    Join cleaned shards into one document, with one copy of the resources they share.
+
+    Args:
+        shards (iterable): PDF bytes or paths of PDF files, in page order.
+        metadata (dict): Document metadata of the source PDF.
+        toc (list): Table of contents of the source PDF, as from get_toc(simple=False).
+        page_labels (list): Page labels of the source PDF, as from get_page_labels().
+    Returns:
+        fitz.Document: The joined document.
+    """
+    doc = fitz.open()
+    for shard in shards:
+        source = fitz.open("pdf", shard) if isinstance(shard, bytes) else fitz.open(shard)
+        with source:
+            doc.insert_pdf(source, join_duplicates=True)
+    merge_duplicate_resources(doc)
+    doc.set_metadata(metadata)
+    if toc:
+        doc.set_toc(toc)
+    if page_labels:
+        doc.set_page_labels(page_labels)
+    return doc
+
+
+def merge_duplicate_resources(doc):
+    """
+    Point every use of a font, XObject or graphics state at one copy of it.
+
+    Copies are found by a digest of the object and everything it refers to.
+
+    Args:
+        doc (fitz.Document): The document.
+    Returns:
+        int: Number of resource entries pointed at another copy.
+    """
+    digests = {}
+    first = {}
+    seen = set()
+    merged = 0
+
+    def merge(owner, depth=0):
+        nonlocal merged
+        for category, location in (_resource_locations(doc, owner, "Resources") or {}).items():
+            if location in seen:
+                continue
+            seen.add(location)
+            xref, path = location
+            data = (
+                doc.xref_get_key(xref, path)[1] if path else doc.xref_object(xref, compressed=True)
+            ).encode("latin-1")
+            parts = []
+            position = 0
+            for _, start, end in _dict_entries(data):
+                found = _REFERENCE.search(data, start, end)
+                if found is None:
+                    continue
+                used = int(found.group(1))
+                kept = first.setdefault(_object_digest(doc, used, digests), used)
+                if kept != used:
+                    parts += [data[position:found.start()], b"%d 0 R" % kept]
+                    position = found.end()
+                if (
+                    category == "XObject"
+                    and depth < _MAX_DEPTH
+                    and doc.xref_get_key(kept, "Subtype")[1] == "/Form"
+                ):
+                    merge(kept, depth + 1)
+            if parts:
+                merged += len(parts) // 2
+                text = (b"".join(parts) + data[position:]).decode("latin-1")
+                if path:
+                    doc.xref_set_key(xref, path, text)
+                else:
+                    doc.update_object(xref, text)
+
+    for xref in _page_xrefs(doc):
+        merge(xref)
+    return merged
+
+
+def _page_xrefs(doc):
+    # Walk the page tree rather than load each page: Document.page_xref()
+    # searches the tree from the top for every page.
+    kind, value = doc.xref_get_key(doc.pdf_catalog(), "Pages")
+    stack = [int(value.split()[0])] if kind == "xref" else []
+    seen = set()
+    while stack:
+        xref = stack.pop()
+        if xref in seen:
+            continue
+        seen.add(xref)
+        kind, value = doc.xref_get_key(xref, "Kids")
+        if kind == "array":
+            stack.extend(int(n) for n in reversed(_REFERENCE.findall(value.encode())))
+        else:
+            yield xref
+
+
+def _object_digest(doc, xref, digests, depth=0):
+    # Digest of an object, with each reference replaced by the digest of
+    # what it points to, so that copies made by different shards match.
+    if xref in digests:
+        return digests[xref]
+    if depth > _MAX_DEPTH:
+        return str(xref).encode()
+    text = doc.xref_object(xref, compressed=True).encode("latin-1")
+    text = _REFERENCE.sub(
+        lambda m: _object_digest(doc, int(m.group(1)), digests, depth + 1), text
+    )
+    digest = hashlib.sha1(text)
+    if doc.xref_is_stream(xref):
+        digest.update(doc.xref_stream_raw(xref) or b"")
+    digests[xref] = digest.hexdigest().encode()
+    return digests[xref]
+
+
+def _restore_form(doc, acroform):
+    # Put the AcroForm back after select(), listing only the fields with a
+    # widget on the remaining pages, and those fields' kids only down to
+    # these widgets, so that nothing holds on to the other pages.
+    widgets = {
+        xref
+        for page in doc
+        for xref, kind, _ in page.annot_xrefs()
+        if kind == fitz.PDF_ANNOT_WIDGET
+    }
+    kept = set()
+    fields = []
+    for xref in sorted(widgets):
+        for _ in range(_MAX_DEPTH):
+            kept.add(xref)
+            kind, value = doc.xref_get_key(xref, "Parent")
+            if kind != "xref":
+                break
+            xref = int(value.split()[0])
+        if xref not in fields:
+            fields.append(xref)
+    for xref in kept:
+        kind, value = doc.xref_get_key(xref, "Kids")
+        if kind == "array":
+            kids = [int(n) for n in _REFERENCE.findall(value.encode())]
+            doc.xref_set_key(xref, "Kids", _array(kid for kid in kids if kid in kept))
+
+    catalog = doc.pdf_catalog()
+    doc.xref_set_key(catalog, "AcroForm", acroform)
+    doc.xref_set_key(catalog, "AcroForm/Fields", _array(fields))
+    kind, value = doc.xref_get_key(catalog, "AcroForm/CO")
+    if kind == "array":
+        order = [int(n) for n in _REFERENCE.findall(value.encode())]
+        doc.xref_set_key(catalog, "AcroForm/CO", _array(x for x in order if x in kept))
+
+
+def _array(xrefs):
+    return "[" + " ".join(f"{xref} 0 R" for xref in xrefs) + "]"
+
+
+def finish_stitched(doc, input_pdf_path, operations, records=()):
+    """
+    Wrap a stitched document and apply the document operations to it.
+
+    Args:
+        doc (fitz.Document): Document from stitch_shards().
+        input_pdf_path (str): Path of the source PDF.
+        operations (dict): Normalized operation spec.
+        records (iterable): OperationRecord dicts of the shards, added to the metrics first.
+    Returns:
+        PDFCleaner: A cleaner holding the result, ready to save().
+    """
+    cleaner = PDFCleaner.from_document(doc, input_pdf_path)
+    for record in records:
+        cleaner.metrics.add(record)
+    apply_operations(
+        cleaner,
+        {name: operations[name] for name in DOCUMENT_OPERATIONS if name in operations},
+    )
+    return cleaner
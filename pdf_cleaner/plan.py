@@ -0,0 +1,217 @@
+from .images import DEFAULT_MAX_DISTANCE, FingerprintMatcher, parse_image_sizes
+from .pages import PageSet, PageSelection
+from .recompress import DEFAULT_JPEG_QUALITY, DEFAULT_TARGET_DPI, RecompressPolicy
+from .redact import RedactionRules
+
+VALID_ANGLES = (0, 90, 180, 270)
+
+
+class CleaningPlan:
+    """
+    Declarative set of cleaning operations, applied with PDFCleaner.apply_plan().
+
+    The builder methods mirror the PDFCleaner methods of the same name. The
+    result is the same as calling those methods one after another in the
+    order remove_texts, redact_texts, remove_images, remove_images_by_fingerprint,
+    recompress_images, rotate_pages, remove_pages, remove_last_page,
+    prune_resources, but the
+    work is fused: the surviving pages are resolved first, text and image work
+    happens in one traversal of those pages only, images are recompressed
+    next, then rotations and deletions are applied and the resources are
+    pruned. Recompression only
+    looks at the surviving pages, so images drawn only on removed pages are
+    left alone.
+
+    Example:
+        plan = CleaningPlan().remove_texts("Draft").remove_images("100x100").remove_pages(2)
+        cleaner.apply_plan(plan)
+    """
+
+    def __init__(self):
+        self.texts = None
+        self.redaction = None
+        self.image_sizes = []
+        self.tolerance = 0
+        self.fingerprints = None
+        self.recompress = None
+        self.rotations = []
+        self.pages_to_remove = PageSelection()
+        self.last_page = False
+        self.prune = False
+
+    def remove_texts(self, *texts):
+        """
+        Remove these texts, or all text if none are given. See PDFCleaner.remove_texts().
+        """
+        self.texts = list(texts)
+        return self
+
+    def redact_texts(
+        self, *terms, patterns=(), regions=(), ignore_case=False, fill=None
+    ):
+        """
+        Remove text found by extraction. See PDFCleaner.redact_texts().
+        """
+        self.redaction = (RedactionRules(terms, patterns, regions, ignore_case), fill)
+        return self
+
+    def remove_images(self, *image_sizes, tolerance=0):
+        """
+        Remove images of these sizes. See PDFCleaner.remove_images().
+        """
+        if not image_sizes:
+            raise ValueError("You must specify at least one image size to remove.")
+        self.image_sizes = parse_image_sizes(*image_sizes)
+        self.tolerance = tolerance
+        return self
+
+    def remove_images_by_fingerprint(
+        self,
+        *fingerprints,
+        samples=(),
+        perceptual=False,
+        max_distance=DEFAULT_MAX_DISTANCE,
+    ):
+        """
+        Remove images by content. See PDFCleaner.remove_images_by_fingerprint().
+        Sample PDFs are read right away.
+        """
+        self.fingerprints = FingerprintMatcher(
+            fingerprints, samples, perceptual, max_distance
+        )
+        return self
+
+    def recompress_images(
+        self,
+        target_dpi=DEFAULT_TARGET_DPI,
+        max_dpi=None,
+        min_bytes=None,
+        format="jpeg",
+        quality=DEFAULT_JPEG_QUALITY,
+        workers=1,
+    ):
+        """
+        Downsample and re-encode images. See PDFCleaner.recompress_images().
+        """
+        self.recompress = (
+            RecompressPolicy(target_dpi, max_dpi, min_bytes, format, quality),
+            workers,
+        )
+        return self
+
+    def rotate_pages(self, *pages, angle=180):
+        """
+        Rotate these pages. Can be called more than once with different angles.
+        See PDFCleaner.rotate_pages().
+        """
+        if not pages:
+            raise ValueError("No pages specified for rotation.")
+        if angle not in VALID_ANGLES:
+            raise ValueError("Angle must be 0, 90, 180, or 270 degrees.")
+        self.rotations.append((PageSelection(*pages), angle))
+        return self
+
+    def remove_pages(self, *pages):
+        """
+        Remove these pages. See PDFCleaner.remove_pages().
+        """
+        self.pages_to_remove = PageSelection(self.pages_to_remove, *pages)
+        return self
+
+    def remove_last_page(self):
+        """
+        Remove the last page left after remove_pages().
+        """
+        self.last_page = True
+        return self
+
+    def prune_resources(self):
+        """
+        Drop unused resources once everything else is done. See PDFCleaner.prune_resources().
+        """
+        self.prune = True
+        return self
+
+    @property
+    def has_image_work(self):
+        return bool(self.image_sizes) or self.fingerprints is not None
+
+    @property
+    def has_page_work(self):
+        return (
+            self.texts is not None or self.redaction is not None or self.has_image_work
+        )
+
+    def resolve(self, page_count):
+        """
+        Work out which pages survive and what happens to each of them.
+
+        Args:
+            page_count (int): Number of pages in the document.
+        Returns:
+            tuple: (survivors, doomed, rotations), where survivors and doomed
+                   are PageSets of 0-based page indexes and rotations maps
+                   surviving page indexes to their final angle.
+        """
+        doomed = self.pages_to_remove.resolve(page_count)
+        survivors = doomed.complement(page_count)
+        if self.last_page and survivors:
+            last_index = next(reversed(survivors))
+            doomed = doomed | PageSet([(last_index, last_index + 1)])
+            survivors = doomed.complement(page_count)
+
+        rotations = {}
+        for pages, angle in self.rotations:
+            for page_index in pages.resolve(page_count) & survivors:
+                rotations[page_index] = angle
+
+        return survivors, doomed, rotations
+
+    @classmethod
+    def from_operations(cls, operations):
+        """
+        Build a plan from an operation spec (see pdf_cleaner.operations).
+
+        Args:
+            operations (dict): The operation spec.
+        Returns:
+            CleaningPlan: The equivalent plan.
+        """
+        from .operations import normalize_operations
+
+        spec = normalize_operations(operations)
+        plan = cls()
+        if "remove_texts" in spec:
+            plan.remove_texts(*spec["remove_texts"]["texts"])
+        if "redact_texts" in spec:
+            options = spec["redact_texts"]
+            plan.redact_texts(
+                *options["terms"],
+                patterns=options["patterns"],
+                regions=options["regions"],
+                ignore_case=options["ignore_case"],
+                fill=options["fill"],
+            )
+        if "remove_images" in spec:
+            options = spec["remove_images"]
+            plan.remove_images(*options["sizes"], tolerance=options["tolerance"])
+        if "remove_images_by_fingerprint" in spec:
+            options = spec["remove_images_by_fingerprint"]
+            plan.remove_images_by_fingerprint(
+                *options["fingerprints"],
+                samples=options["samples"],
+                perceptual=options["perceptual"],
+                max_distance=options["max_distance"],
+            )
+        if "recompress_images" in spec:
+            plan.recompress_images(**spec["recompress_images"])
+        if "rotate_pages" in spec:
+            options = spec["rotate_pages"]
+            plan.rotate_pages(options["pages"], angle=options["angle"])
+        if "remove_pages" in spec:
+            plan.remove_pages(spec["remove_pages"]["pages"])
+        if "remove_last_page" in spec:
+            plan.remove_last_page()
+        if "prune_resources" in spec:
+            plan.prune_resources()
+        return plan
@@ -0,0 +1,297 @@
+import math
+import zlib
+from concurrent import futures
+
+from .lazy import lazy_import
+
+fitz = lazy_import("fitz")
+
+DEFAULT_TARGET_DPI = 150
+# Like Ghostscript, only downsample images above 1.5x the target resolution,
+# where the saving is worth the resampling.
+DOWNSAMPLE_THRESHOLD = 1.5
+DEFAULT_JPEG_QUALITY = 75
+IMAGE_FORMATS = ("jpeg", "flate", "auto")
+
+# Filters whose output is 8-bit samples we can rebuild a pixmap from, or a
+# complete image file MuPDF can decode on its own.
+_SAMPLE_FILTERS = ("", "FlateDecode", "LZWDecode", "RunLengthDecode")
+_FILE_FILTERS = ("DCTDecode", "JPXDecode")
+_COLORSPACES = ("DeviceGray", "DeviceRGB", "DeviceCMYK", "ICCBased")
+
+
+class RecompressPolicy:
+    """
+    Which images recompress_images() rewrites, and how.
+
+    Args:
+        target_dpi (int): Resolution to downsample to.
+        max_dpi (int): Downsample images above this resolution; defaults to
+                       target_dpi * DOWNSAMPLE_THRESHOLD.
+        min_bytes (int): Also re-encode images whose stream is at least this long.
+        format (str): "jpeg", "flate" (lossless), or "auto": JPEG for images
+                      that were JPEG or JPEG 2000 already, Flate for the rest.
+        quality (int): JPEG quality, 1-100.
+    Raises:
+        ValueError: If a setting is out of range.
+    """
+
+    __slots__ = ("target_dpi", "max_dpi", "min_bytes", "format", "quality")
+
+    def __init__(
+        self,
+        target_dpi=DEFAULT_TARGET_DPI,
+        max_dpi=None,
+        min_bytes=None,
+        format="jpeg",
+        quality=DEFAULT_JPEG_QUALITY,
+    ):
+        if target_dpi <= 0:
+            raise ValueError("target_dpi must be positive.")
+        if max_dpi is not None and max_dpi < target_dpi:
+            raise ValueError("max_dpi can't be lower than target_dpi.")
+        if format not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unknown image format {format!r}. Choose from: {', '.join(IMAGE_FORMATS)}."
+            )
+        if not 1 <= quality <= 100:
+            raise ValueError("JPEG quality must be between 1 and 100.")
+        self.target_dpi = target_dpi
+        self.max_dpi = max_dpi if max_dpi is not None else target_dpi * DOWNSAMPLE_THRESHOLD
+        self.min_bytes = min_bytes
+        self.format = format
+        self.quality = quality
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def effective_dpi(doc, page_indexes):
+    """
+    Find the lowest resolution every image is drawn at on some pages.
+
+    Args:
+        doc (fitz.Document): The document.
+        page_indexes (iterable): 0-based indexes of the pages to look at.
+    Returns:
+        tuple: ({xref: dpi}, {xref: [page indexes]}).
+    """
+    # get_image_info() doesn't decode images but doesn't report xrefs either,
+    # so placements are matched to xrefs by pixel size; xrefs sharing a size
+    # all get the lowest resolution among them.
+    dpis = {}
+    pages = {}
+    for page_index in page_indexes:
+        page = doc[page_index]
+        by_size = {}
+        for img in page.get_images(full=True):
+            by_size.setdefault((img[2], img[3]), []).append(img[0])
+            pages.setdefault(img[0], []).append(page_index)
+        if not by_size:
+            continue
+        for info in page.get_image_info():
+            xrefs = by_size.get((info["width"], info["height"]))
+            if not xrefs:
+                continue  # inline image
+            a, b, c, d = info["transform"][:4]
+            shown_width, shown_height = math.hypot(a, b), math.hypot(c, d)
+            if not shown_width or not shown_height:
+                continue
+            dpi = min(info["width"] * 72 / shown_width, info["height"] * 72 / shown_height)
+            for xref in xrefs:
+                dpis[xref] = min(dpis.get(xref, dpi), dpi)
+    return dpis, pages
+
+
+def image_source(doc, img):
+    """
+    Read an image in a form that can be sent to a worker process.
+
+    Args:
+        doc (fitz.Document): The document.
+        img (tuple): Entry of Page.get_images(full=True).
+    Returns:
+        tuple or None: ("file", bytes) for a JPEG or JPEG 2000 stream,
+                       ("samples", bytes, n) for 8-bit samples with n
+                       components, or None for images left alone.
+    """
+    xref, smask, width, height, bpc, colorspace, _, _, filter_name, _ = img
+    if smask or bpc != 8 or colorspace not in _COLORSPACES or width * height <= 1:
+        return None
+    keys = set(doc.xref_get_keys(xref))
+    if keys & {"Mask", "Decode", "ImageMask", "SMaskInData"}:
+        return None
+    if filter_name in _FILE_FILTERS:
+        return ("file", doc.xref_stream_raw(xref))
+    if filter_name in _SAMPLE_FILTERS:
+        samples = doc.xref_stream(xref)
+        n, extra = divmod(len(samples), width * height)
+        if extra or n not in (1, 3, 4):
+            return None
+        return ("samples", samples, n)
+    return None
+
+
+def recompress_image(source, width, height, new_width, new_height, format, quality):
+    """
+    Resample and re-encode one image.
+
+    Args:
+        source (tuple): Image data from image_source().
+        width (int): Width of the image, in pixels.
+        height (int): Height of the image, in pixels.
+        new_width (int): Width to resample to.
+        new_height (int): Height to resample to.
+        format (str): "jpeg", "flate" or "auto", see RecompressPolicy.
+        quality (int): JPEG quality.
+    Returns:
+        tuple: (data, width, height, components, filter name) of the new stream.
+    """
+    if source[0] == "file":
+        pix = fitz.Pixmap(source[1])
+    else:
+        _, samples, n = source
+        colorspace = {1: fitz.csGRAY, 3: fitz.csRGB, 4: fitz.csCMYK}[n]
+        pix = fitz.Pixmap(colorspace, width, height, samples, False)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    if (new_width, new_height) != (pix.width, pix.height):
+        pix = fitz.Pixmap(pix, new_width, new_height, None)
+
+    if format == "auto":
+        format = "jpeg" if source[0] == "file" else "flate"
+    if format == "jpeg":
+        data, filter_name = pix.tobytes("jpeg", jpg_quality=quality), "DCTDecode"
+    else:
+        data, filter_name = zlib.compress(pix.samples, 9), "FlateDecode"
+    return data, pix.width, pix.height, pix.n, filter_name
+
+
+def replace_image_stream(doc, xref, data, width, height, components, filter_name):
+    """
+    Swap a re-encoded stream into an image XObject, keeping its xref.
+
+    Every page and form using the image picks up the new stream.
+    """
+    doc.update_stream(xref, data, compress=False)
+    doc.xref_set_key(xref, "Filter", f"/{filter_name}")
+    doc.xref_set_key(xref, "DecodeParms", "null")
+    doc.xref_set_key(xref, "Width", str(width))
+    doc.xref_set_key(xref, "Height", str(height))
+    doc.xref_set_key(xref, "BitsPerComponent", "8")
+    doc.xref_set_key(xref, "ColorSpace", "/DeviceGray" if components == 1 else "/DeviceRGB")
+
+
+def recompress_images(doc, policy, page_indexes, workers=1, record=None):
+    """
+    Downsample and re-encode the images of some pages, each xref once.
+
+    Args:
+        doc (fitz.Document): The document.
+        policy (RecompressPolicy): Which images to rewrite, and how.
+        page_indexes (iterable): 0-based indexes of the pages whose images are considered.
+        workers (int): Number of worker processes; 1 works in this process.
+        record (OperationRecord): Optional record for the counters.
+    Returns:
+        tuple: (report, pages), where report is {"images": [...], "totals": {...}}
+               and pages is the set of page indexes showing a rewritten image.
+    """
+    page_indexes = list(page_indexes)
+    dpis, pages = effective_dpi(doc, page_indexes)
+
+    # Jobs hold no image data: each stream is read only when its job is
+    # handed to a worker, see _run().
+    jobs = []
+    seen = set()
+    for page_index in page_indexes:
+        for img in doc[page_index].get_images(full=True):
+            xref, width, height = img[0], img[2], img[3]
+            if xref in seen:
+                continue
+            seen.add(xref)
+            dpi = dpis.get(xref)
+            downsample = dpi is not None and dpi > policy.max_dpi
+            size = len(doc.xref_stream_raw(xref))
+            if not downsample and (policy.min_bytes is None or size < policy.min_bytes):
+                continue
+            scale = policy.target_dpi / dpi if downsample else 1
+            new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            jobs.append((img, dpi, size, new_size))
+
+    images = []
+    inspected = 0
+    for job, result in _run(doc, jobs, policy, workers):
+        img, dpi, size, _ = job
+        xref, width, height = img[0], img[2], img[3]
+        inspected += 1
+        data, new_width, new_height, components, filter_name = result
+        if len(data) >= size:
+            continue
+        replace_image_stream(doc, xref, data, new_width, new_height, components, filter_name)
+        images.append(
+            {
+                "xref": xref,
+                "width": width,
+                "height": height,
+                "dpi": round(dpi, 1) if dpi is not None else None,
+                "new_width": new_width,
+                "new_height": new_height,
+                "format": filter_name,
+                "bytes_before": size,
+                "bytes_after": len(data),
+                "bytes_saved": size - len(data),
+            }
+        )
+
+    images.sort(key=lambda image: image["xref"])
+    totals = {
+        "images_inspected": inspected,
+        "images_recompressed": len(images),
+        "bytes_before": sum(image["bytes_before"] for image in images),
+        "bytes_after": sum(image["bytes_after"] for image in images),
+    }
+    totals["bytes_saved"] = totals["bytes_before"] - totals["bytes_after"]
+    if record is not None:
+        record.add("images_inspected", totals["images_inspected"])
+        record.add("images_recompressed", totals["images_recompressed"])
+        record.add("bytes_saved", totals["bytes_saved"])
+    changed_pages = {index for image in images for index in pages.get(image["xref"], ())}
+    return {"images": images, "totals": totals}, changed_pages
+
+
+def _run(doc, jobs, policy, workers):
+    # Yield (job, result) pairs, in any order, skipping the images
+    # image_source() leaves alone. An image is read just before its job is
+    # submitted, so at most workers * 2 images are held at once.
+    def tasks():
+        for job in jobs:
+            img, _, _, (new_width, new_height) = job
+            source = image_source(doc, img)
+            if source is not None:
+                yield job, (
+                    source, img[2], img[3], new_width, new_height, policy.format, policy.quality
+                )
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job, arguments in tasks():
+            yield job, recompress_image(*arguments)
+        return
+
+    # Processes, not threads: PyMuPDF holds the GIL.
+    with futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        queue = tasks()
+        for job, arguments in queue:
+            pending[pool.submit(recompress_image, *arguments)] = job
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+            for job, arguments in queue:
+                pending[pool.submit(recompress_image, *arguments)] = job
+                if len(pending) >= workers * 2:
+                    break
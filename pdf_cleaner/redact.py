@@ -0,0 +1,159 @@
+import bisect
+import re
+
+from .lazy import lazy_import
+from .matcher import MultiPatternMatcher
+
+fitz = lazy_import("fitz")
+
+
+class WordIndex:
+    """
+    The words of one page, grouped into lines for matching.
+
+    Built from the tuples of Page.get_text("words") (x0, y0, x1, y1, word,
+    block, line, word number), so a page is parsed once however many terms,
+    patterns and regions are matched against it.
+
+    Args:
+        words (list): Word tuples, in reading order.
+    """
+
+    __slots__ = ("words", "_lines")
+
+    def __init__(self, words):
+        self.words = words
+        self._lines = {}
+
+    def lines(self, fold_case=False):
+        """
+        Returns:
+            list: (text, encoded text, word indexes, spans, encoded spans) per
+                  line, where text is the words joined by single spaces and the
+                  spans are the (starts, ends) offsets of the words in text and
+                  in its UTF-8 encoding.
+        """
+        lines = self._lines.get(fold_case)
+        if lines is not None:
+            return lines
+
+        groups = {}
+        for i, word in enumerate(self.words):
+            groups.setdefault((word[5], word[6]), []).append(i)
+        lines = []
+        for indexes in groups.values():
+            texts = [self.words[i][4] for i in indexes]
+            if fold_case:
+                texts = [text.lower() for text in texts]
+            encoded = [text.encode("utf-8") for text in texts]
+            lines.append(
+                (
+                    " ".join(texts),
+                    b" ".join(encoded),
+                    indexes,
+                    _spans(len(text) for text in texts),
+                    _spans(len(data) for data in encoded),
+                )
+            )
+        self._lines[fold_case] = lines
+        return lines
+
+    def rect(self, i):
+        return fitz.Rect(self.words[i][:4])
+
+
+class RedactionRules:
+    """
+    What redact_texts() removes: literal terms, regular expressions and page regions.
+
+    Every word a term or pattern match touches is removed whole; matches run
+    within a line, on its words joined by single spaces, so a term like
+    "Top Secret" matches across the words of a line but not across lines.
+    All terms are compiled into one MultiPatternMatcher and all patterns
+    into one alternation, so each line is scanned once per kind whatever the
+    number of terms. A region removes every word its rectangle touches.
+
+    Args:
+        terms (iterable): Literal strings to remove.
+        patterns (iterable): Regular expressions to remove.
+        regions (iterable): (x0, y0, x1, y1) rectangles, in the unrotated page
+                            coordinates of Page.get_text("words"), e.g. a header band.
+        ignore_case (bool): Match terms and patterns regardless of case.
+    Raises:
+        ValueError: If nothing is given, a pattern doesn't compile or a region
+                    isn't four numbers.
+    """
+
+    def __init__(self, terms=(), patterns=(), regions=(), ignore_case=False):
+        self.ignore_case = ignore_case
+        terms = [term.lower() if ignore_case else term for term in terms if term]
+        self.matcher = MultiPatternMatcher(*terms) if terms else None
+        patterns = [pattern for pattern in patterns if pattern]
+        try:
+            self.pattern = (
+                re.compile(
+                    "|".join(f"(?:{pattern})" for pattern in patterns),
+                    re.IGNORECASE if ignore_case else 0,
+                )
+                if patterns
+                else None
+            )
+        except re.error as e:
+            raise ValueError(f"Invalid redaction pattern: {e}") from None
+        self.regions = [_region(region) for region in regions]
+        if self.matcher is None and self.pattern is None and not self.regions:
+            raise ValueError("Nothing to redact: give a term, a pattern or a region.")
+
+    def match(self, index):
+        """
+        Find the words of a page to remove.
+
+        Args:
+            index (WordIndex): The page's words.
+        Returns:
+            list: Sorted indexes into index.words.
+        """
+        found = set()
+        if self.matcher is not None:
+            for _, encoded, indexes, _, spans in index.lines(self.ignore_case):
+                for start, end in self.matcher.finditer(encoded):
+                    found.update(_covered(indexes, spans, start, end))
+        if self.pattern is not None:
+            for text, _, indexes, spans, _ in index.lines(False):
+                for m in self.pattern.finditer(text):
+                    found.update(_covered(indexes, spans, m.start(), m.end()))
+        for region in self.regions:
+            for i, word in enumerate(index.words):
+                x0, y0, x1, y1 = word[:4]
+                if x0 < region[2] and x1 > region[0] and y0 < region[3] and y1 > region[1]:
+                    found.add(i)
+        return sorted(found)
+
+
+def _spans(lengths):
+    # (starts, ends) of each word in the words joined by single spaces.
+    starts = []
+    ends = []
+    position = 0
+    for length in lengths:
+        starts.append(position)
+        ends.append(position + length)
+        position += length + 1
+    return starts, ends
+
+
+def _covered(indexes, spans, start, end):
+    # Words of a line overlapping the match [start, end). An empty match
+    # covers nothing.
+    starts, ends = spans
+    first = max(bisect.bisect_right(starts, start) - 1, 0)
+    last = bisect.bisect_left(starts, end)
+    return [indexes[k] for k in range(first, last) if ends[k] > start and start < end]
+
+
+def _region(region):
+    try:
+        x0, y0, x1, y1 = (float(value) for value in region)
+    except (TypeError, ValueError):
+        raise ValueError(f"A region must be four numbers, got {region!r}.") from None
+    return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
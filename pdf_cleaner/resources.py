@@ -0,0 +1,252 @@
+from .content import RESOURCE_OPERATORS, decode_name, tokenize, used_resource_names
+
+# Resource categories that are pruned; their names are only ever used by
+# the operators in RESOURCE_OPERATORS.
+PRUNED_CATEGORIES = tuple(RESOURCE_OPERATORS.values())
+# Guards the /Parent walk of inherited page resources against cycles.
+_MAX_TREE_DEPTH = 64
+
+
+class ResourcePruner:
+    """
+    Drop the fonts, XObjects and graphics states that no content stream uses.
+
+    Resource dictionaries are identified by where they live: an indirect
+    dictionary by its xref, a direct one by its owner's xref and key path. A
+    dictionary shared by many pages or forms is therefore pruned once, to
+    the union of the names its users need. Each content stream and each
+    Form XObject with its own resources is scanned once, whoever uses it.
+
+    Dictionaries are only pruned when every object holding them was scanned.
+    Those held by anything else (annotation appearances, Type 3 fonts,
+    patterns, the AcroForm default resources) are left alone.
+
+    Args:
+        doc (fitz.Document): The document.
+        record (OperationRecord): Optional record for the resource_streams_scanned,
+                                  forms_scanned, fonts_removed, xobjects_removed
+                                  and extgstates_removed counters.
+    """
+
+    def __init__(self, doc, record=None):
+        self.doc = doc
+        self.record = record
+        self.used = {}  # resource dictionary -> names used
+        self.scanned = set()  # resource dictionaries of scanned pages and forms
+        self.holders = set()  # xrefs of the pages and forms whose resources were scanned
+        self._stream_names = {}
+        self._contexts = {}
+        self._forms = set()
+
+    def run(self):
+        """
+        Scan every page, then remove the unused resources.
+
+        Returns:
+            dict: Number of entries removed per category, e.g.
+                  {"Font": 12, "XObject": 0, "ExtGState": 3}.
+        """
+        for page in self.doc:
+            owner = self._resource_owner(page.xref)
+            context = (self._context(owner, "Resources") if owner else None) or {}
+            names = self._content_names(page.get_contents())
+            self._use(names, context)
+        return self.prune()
+
+    def prune(self):
+        """
+        Remove the names nothing uses from the scanned, unshared dictionaries.
+
+        Returns:
+            dict: Number of entries removed per category.
+        """
+        pinned = self._pinned()
+        removed = dict.fromkeys(PRUNED_CATEGORIES, 0)
+        for category, location in sorted(self.scanned):
+            if location in pinned:
+                continue
+            used = self.used.get(location, ())
+            data = self._read(location)
+            entries = _dict_entries(data)
+            kept = [entry for entry in entries if decode_name(entry[0]) in used]
+            if len(kept) < len(entries):
+                # Setting a key to null would leave "/F1 null" behind, so the
+                # dictionary is written again from the entries that stay.
+                body = b"".join(data[start:end] for _, start, end in kept)
+                self._write(location, b"<<" + body + b">>")
+                removed[category] += len(entries) - len(kept)
+        if self.record is not None:
+            for category, count in removed.items():
+                self.record.add(f"{category.lower()}s_removed", count)
+        return removed
+
+    def _use(self, names, context):
+        # Credit the names to the context's dictionaries, then follow the
+        # forms drawn with Do.
+        for category, found in names.items():
+            location = context.get(category)
+            if location is not None and found:
+                self.used.setdefault(location, set()).update(found)
+        xobjects = context.get("XObject")
+        if xobjects is None:
+            return
+        for name in names["XObject"]:
+            xref = self._lookup(xobjects, name)
+            if xref and self.doc.xref_get_key(xref, "Subtype")[1] == "/Form":
+                self._scan_form(xref, context)
+
+    def _scan_form(self, xref, parent_context):
+        context = self._context(xref, "Resources")
+        # A form without resources uses its parent's, so it is scanned per parent.
+        key = xref if context is not None else (xref, tuple(sorted(parent_context.items())))
+        if key in self._forms:
+            return
+        self._forms.add(key)
+        if self.record is not None:
+            self.record.add("forms_scanned")
+        self._use(
+            self._content_names([xref]),
+            context if context is not None else parent_context,
+        )
+
+    def _content_names(self, xrefs):
+        names = {category: set() for category in PRUNED_CATEGORIES}
+        for xref in xrefs:
+            found = self._stream_names.get(xref)
+            if found is None:
+                found = self._stream_names[xref] = used_resource_names(
+                    self.doc.xref_stream(xref) or b""
+                )
+                if self.record is not None:
+                    self.record.add("resource_streams_scanned")
+            for category, values in found.items():
+                names[category] |= values
+        return names
+
+    def _resource_owner(self, page_xref):
+        # Pages may inherit their resources from an ancestor in the page tree.
+        xref = page_xref
+        for _ in range(_MAX_TREE_DEPTH):
+            if self.doc.xref_get_key(xref, "Resources")[0] != "null":
+                return xref
+            kind, value = self.doc.xref_get_key(xref, "Parent")
+            if kind != "xref":
+                return None
+            xref = int(value.split()[0])
+        return None
+
+    def _context(self, owner, key):
+        # Map each category to the location of its dictionary, as
+        # (xref, path): path is "" for an indirect dictionary, otherwise the
+        # key path of the direct dictionary inside xref. None if owner has
+        # no resources.
+        if (owner, key) in self._contexts:
+            return self._contexts[owner, key]
+        context = self._contexts[owner, key] = _resource_locations(self.doc, owner, key)
+        if context is None:
+            return None
+        self.holders.add(owner)
+        for category, location in context.items():
+            self.scanned.add((category, location))
+        return context
+
+    def _pinned(self):
+        # Dictionaries also held by objects that were not scanned.
+        pinned = set()
+        catalog = self.doc.pdf_catalog()
+        pinned.update((_resource_locations(self.doc, catalog, "AcroForm/DR") or {}).values())
+        for xref in range(1, self.doc.xref_length()):
+            if xref in self.holders:
+                continue
+            try:
+                kind = self.doc.xref_get_key(xref, "Resources")[0]
+            except RuntimeError:
+                continue  # free or broken entry
+            if kind != "null":
+                pinned.update((_resource_locations(self.doc, xref, "Resources") or {}).values())
+        return pinned
+
+    def _read(self, location):
+        xref, path = location
+        if not path:
+            text = self.doc.xref_object(xref, compressed=True)
+        else:
+            text = self.doc.xref_get_key(xref, path)[1]
+        return text.encode("latin-1")
+
+    def _lookup(self, location, name):
+        xref, path = location
+        kind, value = self.doc.xref_get_key(xref, f"{path}/{name}" if path else name)
+        return int(value.split()[0]) if kind == "xref" else None
+
+    def _write(self, location, data):
+        xref, path = location
+        if not path:
+            self.doc.update_object(xref, data.decode("latin-1"))
+        else:
+            self.doc.xref_set_key(xref, path, data.decode("latin-1"))
+
+
+def prune_unused_resources(doc, record=None):
+    """
+    Remove unused fonts, XObjects and graphics states from page and form resources.
+
+    See ResourcePruner. The removed objects stay in the file until it is
+    saved with garbage collection (the "balanced" and "smallest" profiles).
+
+    Args:
+        doc (fitz.Document): The document.
+        record (OperationRecord): Optional record for the counters.
+    Returns:
+        dict: Number of entries removed per category.
+    """
+    return ResourcePruner(doc, record).run()
+
+
+def _resource_locations(doc, owner, key):
+    kind, value = doc.xref_get_key(owner, key)
+    if kind == "xref":
+        owner, key = int(value.split()[0]), ""
+    elif kind != "dict":
+        return None
+    locations = {}
+    for category in PRUNED_CATEGORIES:
+        path = f"{key}/{category}" if key else category
+        kind, value = doc.xref_get_key(owner, path)
+        if kind == "xref":
+            locations[category] = (int(value.split()[0]), "")
+        elif kind == "dict":
+            locations[category] = (owner, path)
+    return locations
+
+
+def _dict_entries(data):
+    # The entries of a dictionary printed by PyMuPDF, as (key, start, end)
+    # spans running from the key to the end of its value. A value is one
+    # token, an "n g R" reference, or a nested dictionary or array.
+    items = []  # (name or None, start, end) of each depth-1 object
+    depth = 0
+    nested_start = None
+    for token in tokenize(data):
+        kind = token.kind
+        if kind in ("dict_start", "array_start"):
+            depth += 1
+            if depth == 2:
+                nested_start = token.start
+        elif kind in ("dict_end", "array_end"):
+            depth -= 1
+            if depth == 1:
+                items.append((None, nested_start, token.end))
+        elif depth == 1:
+            if kind == "keyword" and data[token.start:token.end] == b"R" and len(items) >= 2:
+                start = items[-2][1]
+                del items[-2:]
+                items.append((None, start, token.end))
+            else:
+                name = data[token.start + 1:token.end] if kind == "name" else None
+                items.append((name, token.start, token.end))
+    return [
+        (key[0], key[1], value[2])
+        for key, value in zip(items[0::2], items[1::2])
+        if key[0] is not None
+    ]
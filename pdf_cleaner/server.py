@@ -0,0 +1,247 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, urlsplit
+
+from .cleaner import DEFAULT_SAVE_PROFILE, SAVE_PROFILES
+from .operations import clean_bytes, normalize_operations
+
+MAX_HEADER_SIZE = 64 * 1024
+RESPONSE_CHUNK_SIZE = 256 * 1024
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def _warm_worker():
+    # Pay for the PyMuPDF import once per worker process, not once per request.
+    import fitz
+
+    fitz.open().close()
+
+
+class CleaningServer:
+    """
+    Local HTTP server that cleans PDFs on a pool of pre-warmed worker processes.
+
+    Endpoints:
+        POST /clean   Body: the PDF. The operation spec (see pdf_cleaner.operations)
+                      comes from the X-Operations header or the "operations" query
+                      parameter, as JSON. An optional "profile" query parameter picks
+                      the save profile. Responds with the cleaned PDF.
+        GET /health   Responds with the current load as JSON.
+
+    Requests beyond the number of workers wait in a queue of max_queue slots.
+    When the queue is full, new requests get 503 with a Retry-After header.
+    If a worker process dies, the pool is replaced and the requests it was
+    running get 503 as well.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+        workers (int): Number of worker processes (default: number of CPUs).
+        max_queue (int): Requests allowed to wait for a free worker.
+        max_body (int): Largest accepted request body, in bytes.
+        save_profile (str): Default save profile.
+        cache (ResultCache): Optional result cache shared by the workers.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8080,
+        workers=None,
+        max_queue=16,
+        max_body=100 * 1024 * 1024,
+        save_profile=DEFAULT_SAVE_PROFILE,
+        cache=None,
+    ):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.max_body = max_body
+        self.save_profile = save_profile
+        self.cache = cache
+        self.pending = 0
+        self.pool = None
+        self._slots = None
+
+    async def start(self):
+        self.pool = self._new_pool()
+        # Start every worker now so the first requests don't pay for it.
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self.pool, os.getpid) for _ in range(self.workers))
+        )
+        self._slots = asyncio.Semaphore(self.workers)
+        return await asyncio.start_server(
+            self.handle_connection, self.host, self.port, limit=MAX_HEADER_SIZE
+        )
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+
+    def _replace_pool(self, broken):
+        # Every request running on a broken pool fails with it; only the
+        # first one to notice swaps in a new pool.
+        if self.pool is broken:
+            self.pool = self._new_pool()
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    async def serve_forever(self):
+        server = await self.start()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            status, body, headers = await self.handle_request(reader, writer)
+        except HTTPError as e:
+            status, headers = e.status, e.headers
+            body = json.dumps({"error": e.message}).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            # A bug must not leave the client without a response.
+            status, headers = 500, {"Content-Type": "application/json"}
+            body = json.dumps({"error": f"Internal error: {e}"}).encode("utf-8")
+
+        try:
+            await self.write_response(writer, status, body, headers)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request headers too large.") from None
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.") from None
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+
+        if url.path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "Use GET.")
+            body = json.dumps(
+                {
+                    "workers": self.workers,
+                    "pending": self.pending,
+                    "max_queue": self.max_queue,
+                }
+            ).encode("utf-8")
+            return 200, body, {"Content-Type": "application/json"}
+
+        if url.path != "/clean":
+            raise HTTPError(404, "Not found.")
+        if method != "POST":
+            raise HTTPError(405, "Use POST.")
+
+        # Back-pressure: refuse before reading the body when everything is busy.
+        if self.pending >= self.workers + self.max_queue:
+            raise HTTPError(503, "Server busy, retry later.", {"Retry-After": "1"})
+
+        length = headers.get("content-length")
+        if length is None or not length.isdigit():
+            raise HTTPError(411, "Content-Length is required.")
+        length = int(length)
+        if length > self.max_body:
+            raise HTTPError(413, f"Request body exceeds {self.max_body} bytes.")
+        if length == 0:
+            raise HTTPError(400, "Request body is empty.")
+
+        raw_operations = headers.get("x-operations") or query.get("operations", [""])[0]
+        try:
+            operations = normalize_operations(json.loads(raw_operations or "{}"))
+        except (ValueError, TypeError) as e:
+            raise HTTPError(400, f"Invalid operations: {e}") from None
+        profile = query.get("profile", [self.save_profile])[0]
+        if profile not in SAVE_PROFILES:
+            raise HTTPError(400, f"Unknown save profile {profile!r}.")
+
+        self.pending += 1
+        try:
+            if headers.get("expect", "").lower() == "100-continue":
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                await writer.drain()
+            data = await reader.readexactly(length)
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                pool = self.pool
+                try:
+                    result = await loop.run_in_executor(
+                        pool, clean_bytes, data, operations, profile, self.cache
+                    )
+                except BrokenProcessPool:
+                    self._replace_pool(pool)
+                    raise HTTPError(
+                        503, "A worker process died, retry later.", {"Retry-After": "1"}
+                    ) from None
+                except Exception as e:
+                    raise HTTPError(422, f"Could not clean the PDF: {e}") from None
+        finally:
+            self.pending -= 1
+
+        return 200, result, {"Content-Type": "application/pdf"}
+
+    async def write_response(self, writer, status, body, headers):
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+        headers = dict(headers, **{"Content-Length": str(len(body)), "Connection": "close"})
+        head.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+
+        view = memoryview(body)
+        for start in range(0, len(view), RESPONSE_CHUNK_SIZE):
+            writer.write(view[start:start + RESPONSE_CHUNK_SIZE])
+            await writer.drain()
+        await writer.drain()
+
+
+def serve(**kwargs):
+    """
+    Run a CleaningServer until interrupted. Takes the CleaningServer arguments.
+    """
+    server = CleaningServer(**kwargs)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
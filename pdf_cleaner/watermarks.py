@@ -0,0 +1,137 @@
+import random
+import re
+from collections import Counter
+
+from .content import iter_text_runs
+from .images import image_fingerprint
+
+DEFAULT_MIN_FRACTION = 0.5
+DEFAULT_SAMPLE_PAGES = 200
+DEFAULT_MIN_LENGTH = 4
+
+_DIGITS_RE = re.compile(r"\d")
+_LETTER_RE = re.compile(r"[^\W\d_]")
+
+
+def sample_page_indexes(page_count, sample_pages=DEFAULT_SAMPLE_PAGES, seed=0):
+    """
+    Pick a sample of pages that covers the whole document.
+
+    The pages are split into sample_pages equal strata and one page is picked
+    at random from each, so the sample is spread out like an evenly spaced one
+    but doesn't fall in step with patterns such as "a photo every 3rd page".
+
+    Args:
+        page_count (int): Number of pages.
+        sample_pages (int): Largest number of pages to pick; 0 or None picks every page.
+        seed (int): Seed for the random picks, so results are repeatable.
+    Returns:
+        list: Sorted 0-based page indexes.
+    """
+    if not sample_pages or page_count <= sample_pages:
+        return list(range(page_count))
+    rng = random.Random(seed)
+    return [
+        rng.randrange(i * page_count // sample_pages, (i + 1) * page_count // sample_pages)
+        for i in range(sample_pages)
+    ]
+
+
+class WatermarkIndex:
+    """
+    Frequency index of the images and text runs found on a set of pages.
+
+    Every image xref is fingerprinted once, so separate copies of the same
+    logo count together, and every content stream is scanned once, however
+    many pages share it. Counts are numbers of pages, not occurrences.
+
+    Args:
+        doc (fitz.Document): The document being analysed.
+        min_length (int): Ignore text runs shorter than this many characters.
+    """
+
+    def __init__(self, doc, min_length=DEFAULT_MIN_LENGTH):
+        self.doc = doc
+        self.min_length = min_length
+        self.pages = 0
+        self.image_pages = Counter()
+        self.text_pages = Counter()
+        self.images = {}
+        self._fingerprints = {}
+        self._stream_runs = {}
+
+    def add_page(self, page):
+        self.pages += 1
+
+        fingerprints = set()
+        for img in page.get_images(full=True):
+            xref = img[0]
+            if img[2] * img[3] <= 1:
+                # Blanked images (see blank_image()) and other invisible placeholders.
+                continue
+            fingerprint = self._fingerprints.get(xref)
+            if fingerprint is None:
+                fingerprint = self._fingerprints[xref] = image_fingerprint(self.doc, xref)
+                image = self.images.setdefault(
+                    fingerprint, {"width": img[2], "height": img[3], "xrefs": []}
+                )
+                image["xrefs"].append(xref)
+            fingerprints.add(fingerprint)
+        self.image_pages.update(fingerprints)
+
+        texts = set()
+        for xref in page.get_contents():
+            runs = self._stream_runs.get(xref)
+            if runs is None:
+                runs = self._stream_runs[xref] = self._runs(self.doc.xref_stream(xref))
+            texts.update(runs)
+        self.text_pages.update(texts)
+
+    def _runs(self, stream):
+        # Candidate terms of one content stream: each text run, plus the part
+        # before its first digit so that "Confidential page 12" recurs as
+        # "Confidential page" across pages.
+        runs = set()
+        for raw in iter_text_runs(stream):
+            try:
+                text = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                # remove_texts() could not express this run as a term.
+                continue
+            for candidate in (text, _DIGITS_RE.split(text, 1)[0]):
+                candidate = candidate.strip()
+                if len(candidate) >= self.min_length and _LETTER_RE.search(candidate):
+                    runs.add(candidate)
+        return runs
+
+    def report(self, min_fraction=DEFAULT_MIN_FRACTION):
+        """
+        List the watermark candidates and the operations that remove them.
+
+        Args:
+            min_fraction (float): Flag what appears on at least this fraction of the pages.
+        Returns:
+            dict: {"images": [...], "texts": [...], "operations": {...}}, where
+                  images and texts are sorted by how many pages they appear on,
+                  and operations is an operation spec (see pdf_cleaner.operations).
+        """
+        threshold = max(1, min_fraction * self.pages)
+        images = [
+            dict(self.images[fingerprint], fingerprint=fingerprint, fraction=count / self.pages)
+            for fingerprint, count in self.image_pages.most_common()
+            if count >= threshold
+        ]
+        texts = [
+            {"text": text, "fraction": count / self.pages}
+            for text, count in self.text_pages.most_common()
+            if count >= threshold
+        ]
+
+        operations = {}
+        if texts:
+            operations["remove_texts"] = {"texts": [t["text"] for t in texts]}
+        if images:
+            operations["remove_images_by_fingerprint"] = {
+                "fingerprints": [image["fingerprint"] for image in images]
+            }
+        return {"images": images, "texts": texts, "operations": operations}
@@ -0,0 +1,60 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from pdf_cleaner import PDFCleaner  # noqa: E402
+
+
+def _split_pdf(path, first, second, pages=1):
+    # Every page's content is split into two streams at the given bytes.
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_font(fontname="helv")
+        contents = []
+        for stream in (first, second):
+            xref = doc.get_new_xref()
+            doc.update_object(xref, "<<>>")
+            doc.update_stream(xref, stream)
+            contents.append(xref)
+        doc.xref_set_key(
+            page.xref, "Contents", "[" + " ".join(f"{x} 0 R" for x in contents) + "]"
+        )
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def test_remove_texts_in_stream_split_after_bt(tmp_path):
+    path = _split_pdf(
+        tmp_path / "split.pdf", b"BT", b"/helv 12 Tf 72 720 Td (Secret Note) Tj ET"
+    )
+    cleaner = PDFCleaner(path)
+    try:
+        cleaner.remove_texts("Secret")
+        assert cleaner.doc[0].get_text().strip() == "Note"
+    finally:
+        cleaner.close()
+
+
+def test_remove_texts_tj_split_across_segments(tmp_path):
+    path = _split_pdf(
+        tmp_path / "tj.pdf", b"BT /helv 12 Tf 72 720 Td", b"[(Sec) -10 (ret) (!)] TJ ET"
+    )
+    cleaner = PDFCleaner(path)
+    try:
+        cleaner.remove_texts("Secret")
+        assert cleaner.doc[0].get_text().strip() == "!"
+    finally:
+        cleaner.close()
+
+
+@pytest.mark.parametrize("pages", ["all", "1-10", "-10-"])
+def test_remove_every_page(tmp_path, pages):
+    path = _split_pdf(tmp_path / "ten.pdf", b"BT", b"/helv 12 Tf (x) Tj ET", pages=10)
+    cleaner = PDFCleaner(path)
+    try:
+        cleaner.remove_pages(pages)
+        assert len(cleaner.doc) == 0
+    finally:
+        cleaner.close()
@@ -0,0 +1,117 @@
+from pdf_cleaner.content import (
+    decode_string,
+    encode_string,
+    iter_text_runs,
+    remove_text_runs,
+    strip_text_objects,
+    tokenize,
+)
+from pdf_cleaner.matcher import MultiPatternMatcher
+
+
+def _kinds(data, operators=None):
+    return [(token.kind, data[token.start:token.end]) for token in tokenize(data, operators)]
+
+
+def test_tokenize_nested_string_is_one_token():
+    data = b"BT (a (nested) Tj string) Tj ET"
+    assert _kinds(data) == [
+        ("keyword", b"BT"),
+        ("string", b"(a (nested) Tj string)"),
+        ("keyword", b"Tj"),
+        ("keyword", b"ET"),
+    ]
+
+
+def test_tokenize_escaped_parenthesis():
+    data = rb"(a \) Tj) Tj"
+    assert _kinds(data, (b"Tj",)) == [("string", rb"(a \) Tj)"), ("keyword", b"Tj")]
+
+
+def test_tokenize_inline_image_hides_operators():
+    data = b"q BI /W 2 /H 1 /BPC 8 /CS /G ID \x00Tj ET\xff EI Q BT (x) Tj ET"
+    tokens = _kinds(data, (b"Tj", b"BT", b"ET"))
+    assert tokens[0][0] == "inline_image"
+    assert tokens[0][1].endswith(b"EI")
+    assert tokens[1:] == [
+        ("keyword", b"BT"),
+        ("string", b"(x)"),
+        ("keyword", b"Tj"),
+        ("keyword", b"ET"),
+    ]
+
+
+def test_tokenize_skips_operator_inside_names_and_keywords():
+    data = b"/TjName gs BT (x) Tj ET"
+    assert [t for t in _kinds(data, (b"Tj",)) if t[0] == "keyword"] == [("keyword", b"Tj")]
+
+
+def test_decode_string_escapes():
+    assert decode_string(rb"(a\(b\)c\\d)") == b"a(b)c\\d"
+    assert decode_string(rb"(\101\102\7)") == b"AB\x07"
+    assert decode_string(b"(line\\\ncontinued)") == b"linecontinued"
+    assert decode_string(b"(a\r\nb)") == b"a\nb"
+
+
+def test_decode_string_hex():
+    assert decode_string(b"<48 65 6C6C 6F>") == b"Hello"
+    # An odd number of digits is padded with a zero.
+    assert decode_string(b"<414>") == b"A@"
+
+
+def test_encode_string_round_trip():
+    value = b"a(b)c\\d\re"
+    assert decode_string(encode_string(value)) == value
+    assert encode_string(value, hex_form=True) == b"<" + value.hex().encode() + b">"
+
+
+def test_iter_text_runs_joins_tj_segments():
+    data = b"BT [(Sec) -20 (ret) 15 <20576F7264>] TJ (plain) ' ET"
+    assert list(iter_text_runs(data)) == [b"Secret Word", b"plain"]
+
+
+def test_remove_text_runs_across_tj_segments():
+    data = b"BT [(Top Se) -20 (cret) 15 (!)] TJ ET"
+    new_data, count = remove_text_runs(data, MultiPatternMatcher("Secret"))
+    assert count == 1
+    assert list(iter_text_runs(new_data)) == [b"Top !"]
+    assert b"-20" in new_data and b"15" in new_data
+
+
+def test_remove_text_runs_hex_string_stays_hex():
+    data = b"BT <536563726574204E6F7465> Tj ET"
+    new_data, count = remove_text_runs(data, MultiPatternMatcher("Secret"))
+    assert count == 1
+    assert new_data == b"BT <204e6f7465> Tj ET"
+
+
+def test_remove_text_runs_escaped_string():
+    data = rb"BT (\(Secret\)) Tj ET"
+    new_data, count = remove_text_runs(data, MultiPatternMatcher("Secret"))
+    assert count == 1
+    assert decode_string(new_data[3:-6]) == b"()"
+
+
+def test_remove_text_runs_stream_without_bt():
+    # The second half of a page whose content is split right after BT.
+    data = b"/F1 12 Tf 72 720 Td (Secret) Tj ET"
+    new_data, count = remove_text_runs(data, MultiPatternMatcher("Secret"))
+    assert count == 1
+    assert new_data == b"/F1 12 Tf 72 720 Td () Tj ET"
+
+
+def test_remove_text_runs_leaves_inline_image_data():
+    data = b"BI /W 6 /H 1 /BPC 8 /CS /G ID Secret EI BT (Secret) Tj ET"
+    new_data, count = remove_text_runs(data, MultiPatternMatcher("Secret"))
+    assert count == 1
+    assert new_data == b"BI /W 6 /H 1 /BPC 8 /CS /G ID Secret EI BT () Tj ET"
+
+
+def test_remove_text_runs_no_match_returns_same_bytes():
+    data = b"BT (nothing here) Tj ET"
+    assert remove_text_runs(data, MultiPatternMatcher("Secret")) == (data, 0)
+
+
+def test_strip_text_objects():
+    data = b"q 1 0 0 1 0 0 cm BT (a) Tj ET 0 0 m BT (b) Tj ET Q"
+    assert strip_text_objects(data) == (b"q 1 0 0 1 0 0 cm  0 0 m  Q", 2)
@@ -0,0 +1,44 @@
+from pdf_cleaner.matcher import MultiPatternMatcher
+
+
+def test_longest_term_wins_at_same_position():
+    matcher = MultiPatternMatcher("Draft", "Draft copy", "Dr")
+    data = b"Draft copy of a Draft by Dr No"
+    assert [data[s:e] for s, e in matcher.finditer(data)] == [
+        b"Draft copy",
+        b"Draft",
+        b"Dr",
+    ]
+
+
+def test_terms_with_shared_prefixes_and_regex_characters():
+    matcher = MultiPatternMatcher("a.b", "a*b", "a", "(x)")
+    data = b"a.b axb a*b (x) aa"
+    assert [data[s:e] for s, e in matcher.finditer(data)] == [
+        b"a.b",
+        b"a",
+        b"a*b",
+        b"(x)",
+        b"a",
+        b"a",
+    ]
+
+
+def test_str_and_bytes_terms_and_duplicates():
+    matcher = MultiPatternMatcher("Secret", b"Secret", "", "Geheim")
+    assert matcher.terms == [b"Secret", b"Geheim"]
+    assert matcher.subn(b"Secret and Geheim") == (b" and ", 2)
+
+
+def test_empty_matcher():
+    matcher = MultiPatternMatcher()
+    assert not matcher
+    assert list(matcher.finditer(b"anything")) == []
+    assert matcher.subn(b"anything") == (b"anything", 0)
+
+
+def test_many_terms():
+    terms = [f"TERM-{i:05d}" for i in range(2000)]
+    matcher = MultiPatternMatcher(*terms)
+    data = b" ".join(term.encode() for term in terms[::7])
+    assert matcher.subn(data, b"X")[1] == len(terms[::7])
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from pdf_cleaner.pages import PageSelection, PageSet, delete_page_set
+
+
+def _document(page_count):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for number in range(1, page_count + 1):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {number}")
+    return doc
+
+
+def _page_numbers(doc):
+    return [int(page.get_text().split()[1]) for page in doc]
+
+
+def test_resolve_ranges_and_negative_numbers():
+    assert list(PageSelection("1-3,-1", 2).resolve(10)) == [0, 1, 2, 9]
+    assert list(PageSelection("last 3").resolve(10)) == [7, 8, 9]
+    assert list(PageSelection("8-").resolve(10)) == [7, 8, 9]
+    # Pages past the end are ignored.
+    assert list(PageSelection("9-20", 40).resolve(10)) == [8, 9]
+
+
+def test_resolve_empty_selection():
+    assert not PageSelection().resolve(10)
+    assert not PageSelection("20-30").resolve(10)
+    assert not PageSelection("1-10").resolve(0)
+
+
+def test_odd_and_even_are_single_runs():
+    odd = PageSelection("odd").resolve(100000)
+    even = PageSelection("even").resolve(100000)
+    assert odd.runs == ((0, 99999, 2),)
+    assert even.runs == ((1, 100000, 2),)
+    assert len(odd) == len(even) == 50000
+    assert (odd | even).runs == ((0, 100000, 1),)
+    assert not odd & even
+    assert odd.complement(100000) == even
+
+
+def test_odd_and_even_within_ranges():
+    assert list(PageSelection("2-9:odd").resolve(20)) == [2, 4, 6, 8]
+    assert list(PageSelection("2-9:even").resolve(20)) == [1, 3, 5, 7]
+    assert PageSelection("2-9:odd").resolve(20).to_expression() == "3-9:odd"
+
+
+def test_page_set_round_trips_through_selection():
+    pages = PageSet([(0, 5), (6, 20, 2), (30, 31)])
+    assert PageSelection(pages).resolve(40) == pages
+    assert PageSelection(pages.to_expression()).resolve(40) == pages
+
+
+def test_page_set_matches_python_sets():
+    rng = random.Random(0)
+
+    def random_runs(page_count):
+        runs = []
+        for _ in range(rng.randint(0, 5)):
+            start = rng.randint(0, page_count)
+            stop = rng.randint(start, page_count)
+            runs.append((start, stop, rng.choice((1, 2, 3))))
+        return runs
+
+    for _ in range(2000):
+        page_count = rng.randint(1, 40)
+        runs_a, runs_b = random_runs(page_count), random_runs(page_count)
+        a, b = PageSet(runs_a), PageSet(runs_b)
+        set_a = {i for run in runs_a for i in range(*run)}
+        set_b = {i for run in runs_b for i in range(*run)}
+
+        assert list(a) == sorted(set_a)
+        assert list(reversed(a)) == sorted(set_a, reverse=True)
+        assert len(a) == len(set_a)
+        assert set(a | b) == set_a | set_b
+        assert set(a & b) == set_a & set_b
+        assert set(a - b) == set_a - set_b
+        assert set(a.complement(page_count)) == set(range(page_count)) - set_a
+        assert (a == b) == (set_a == set_b)
+        for index in range(page_count + 1):
+            assert (index in a) == (index in set_a)
+            assert a.count_before(index) == sum(1 for i in set_a if i < index)
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("all", []),
+        ("1-10", []),
+        ("1", list(range(2, 11))),
+        ("2-10", [1]),
+        ("odd", [2, 4, 6, 8, 10]),
+        ("even", [1, 3, 5, 7, 9]),
+        ("1,3,10", [2, 4, 5, 6, 7, 8, 9]),
+    ],
+)
+def test_delete_page_set(expression, expected):
+    doc = _document(10)
+    delete_page_set(doc, PageSelection(expression).resolve(10))
+    assert _page_numbers(doc) == expected
+
+
+def test_delete_page_set_empty():
+    doc = _document(3)
+    delete_page_set(doc, PageSet())
+    assert _page_numbers(doc) == [1, 2, 3]